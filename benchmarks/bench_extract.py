@@ -0,0 +1,62 @@
+"""
+Measures peak memory and time of PDF upload extraction as documents grow.
+
+For each --pages size a text-only PDF is generated and extracted into a
+throwaway doc store in a fresh interpreter, the way /api/upload does it
+(pdf_parser.iter_pages streamed into doc_store.save_pages). Peak RSS
+should stay flat as the page count grows. The exit status is 1 if the
+largest document's peak exceeds --budget-mb.
+
+Usage:
+    python benchmarks/bench_extract.py
+    python benchmarks/bench_extract.py --pages 100 1000 2000 --budget-mb 150
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadgen import build_pdf
+
+CHILD = """
+import resource, sys, time
+from modules.pdf_parser import iter_pages
+from modules.doc_store import save_pages
+start = time.perf_counter()
+_, pages = save_pages(iter_pages(sys.argv[1]), custom_id="BENCH_EXTRACT")
+print(pages, time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def extract(pdf_path, env):
+    """Returns (pages, seconds, peak RSS in MB) for one extraction in a new interpreter."""
+    out = subprocess.run([sys.executable, "-c", CHILD, pdf_path], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    pages, seconds, rss_kb = out.stdout.split()
+    return int(pages), float(seconds), int(rss_kb) / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 250, 1000], help="document sizes to extract")
+    parser.add_argument("--budget-mb", type=float, default=150, help="peak RSS budget for the largest document")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_extract_")
+    env = dict(os.environ, DATA_DIR=os.path.join(tmp, "data"), TEMP_AUDIO_DIR=os.path.join(tmp, "audio"))
+    try:
+        print(f"{'pages':>6}{'PDF KB':>9}{'seconds':>9}{'ms/page':>9}{'peak MB':>9}")
+        for n in sorted(args.pages):
+            pdf_path = os.path.join(tmp, f"doc_{n}.pdf")
+            with open(pdf_path, "wb") as f:
+                f.write(build_pdf(n))
+            pages, seconds, peak = extract(pdf_path, env)
+            print(f"{pages:>6}{os.path.getsize(pdf_path) / 1024:>9.0f}{seconds:>9.1f}{1000 * seconds / pages:>9.1f}{peak:>9.0f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 1 if peak > args.budget_mb else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
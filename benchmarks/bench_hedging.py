@@ -0,0 +1,105 @@
+"""
+Measures Gemini call tail latency with and without hedged requests.
+
+Runs the same workload through modules.llm_router.ModelRouter twice, with
+hedging off and on. Each request's latency is drawn from a log-normal
+distribution around --median seconds, and a --stragglers fraction of
+requests is --tail times slower, the way a few Gemini calls stall
+behind a slow backend. With hedging, a call still unanswered after the
+model's recent p90 sends one duplicate and takes the first answer.
+Reports p50/p90/p99/max call latency, the extra requests sent, and hedges
+won (the duplicate answered first) and lost. Runs offline.
+
+Usage:
+    python benchmarks/bench_hedging.py
+    python benchmarks/bench_hedging.py --calls 500 --stragglers 0.1 --tail 10
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Simulated latencies are scaled down, so hedge as soon as the p90 allows
+os.environ.setdefault("GEMINI_HEDGE_MIN_DELAY", "0")
+
+from modules import metrics
+from modules.llm_router import ModelRouter
+
+MODEL = "bench-model"
+
+def simulated_send(median, sigma, stragglers, tail, counter):
+    lock = threading.Lock()
+
+    def send(model, prompt, timeout):
+        with lock:
+            counter[0] += 1
+        latency = median * random.lognormvariate(0, sigma)
+        if random.random() < stragglers:
+            latency *= tail
+        time.sleep(min(latency, timeout))
+        return f"answer to {prompt}"
+    return send
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def run(args, hedge):
+    random.seed(args.seed)
+    sent = [0]
+    router = ModelRouter(simulated_send(args.median, args.sigma, args.stragglers, args.tail, sent),
+                         models={"fast": MODEL, "standard": MODEL}, deadline=args.deadline, hedge=hedge,
+                         workers=2 * args.concurrency)
+    # Warm the latency window so hedging starts with the first measured call
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(lambda i: router.call(MODEL, f"warm-up {i}"), range(args.warmup)))
+    sent[0] = 0
+    won = metrics.GEMINI_HEDGES.value(model=MODEL, outcome="won")
+    lost = metrics.GEMINI_HEDGES.value(model=MODEL, outcome="lost")
+
+    def timed(i):
+        start = time.perf_counter()
+        router.call(MODEL, f"call {i}")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = list(pool.map(timed, range(args.calls)))
+    return {
+        "p50": statistics.median(latencies),
+        "p90": percentile(latencies, 0.9),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies),
+        "extra": sent[0] / args.calls - 1,
+        "won": metrics.GEMINI_HEDGES.value(model=MODEL, outcome="won") - won,
+        "lost": metrics.GEMINI_HEDGES.value(model=MODEL, outcome="lost") - lost,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300, help="measured calls per mode")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured calls that fill the latency window first")
+    parser.add_argument("--concurrency", type=int, default=8, help="calls in flight at once")
+    parser.add_argument("--median", type=float, default=0.2, help="median simulated request seconds")
+    parser.add_argument("--sigma", type=float, default=0.3, help="log-normal spread of request latency")
+    parser.add_argument("--stragglers", type=float, default=0.05, help="fraction of requests that stall")
+    parser.add_argument("--tail", type=float, default=8.0, help="how many times slower a stalled request is")
+    parser.add_argument("--deadline", type=float, default=30.0, help="per-call deadline in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.calls} calls, {args.concurrency} in flight, median {args.median}s, "
+          f"{args.stragglers:.0%} stragglers x{args.tail:g}")
+    print(f"{'hedging':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'extra req':>11}{'won':>6}{'lost':>6}")
+    for hedge in (False, True):
+        r = run(args, hedge)
+        print(f"{'on' if hedge else 'off':>8}{1000 * r['p50']:>9.0f}{1000 * r['p90']:>9.0f}{1000 * r['p99']:>9.0f}"
+              f"{1000 * r['max']:>9.0f}{r['extra']:>10.0%} {r['won']:>6}{r['lost']:>6}")
+
+if __name__ == "__main__":
+    main()
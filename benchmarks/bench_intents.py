@@ -0,0 +1,126 @@
+"""
+Accuracy and throughput benchmark for IntentRecognizer.
+
+Compares the compiled single-pass matcher (with and without its LRU, and with
+the local fallback classifier) against the previous loop-over-patterns
+recognizer on the labeled corpus in intent_corpus.jsonl.
+
+Usage:
+    python benchmarks/bench_intents.py [--rounds 200]
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.intent_recognizer import IntentRecognizer
+from modules.intent_classifier import load_default_classifier
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_corpus.jsonl")
+
+class LegacyIntentRecognizer:
+    """The pre-compilation recognizer: re.search per raw pattern, in dict order."""
+
+    def __init__(self):
+        self.intents = {
+            "SUMMARIZE": [r"summarize", r"summary of", r"what is the summary"],
+            "EXPLAIN": [r"explain", r"what is", r"what does", r"define", r"describe", r"tell me about", r"meaning of"],
+            "TRANSLATE": [r"translate", r"translation", r"change language", r"speak in", r"convert to"],
+            "EXPLAIN_LINE": [r"explain line (\d+)", r"explain sentence (\d+)", r"detail line (\d+)"],
+            "QUIZ": [r"quiz", r"question", r"test me", r"ask me"],
+            "NAVIGATE_NEXT": [r"next page", r"go to next", r"next"],
+            "NAVIGATE_PREV": [r"previous page", r"go to previous", r"back", r"previous"],
+            "NAVIGATE_PAGE": [r"go to page (\d+)", r"read page (\d+)", r"page (\d+)"],
+            "READ_PARAGRAPH": [r"read paragraph (\d+)", r"paragraph (\d+)"],
+            "REPEAT": [r"repeat", r"say again", r"repeat that"],
+            "STOP": [r"stop", r"exit", r"quit", r"end session"],
+            "HELP": [r"help", r"what can you do", r"capabilities", r"commands"]
+        }
+
+    def recognize_intent(self, command_text):
+        command_text_lower = command_text.lower().strip()
+        for intent, patterns in self.intents.items():
+            for pattern in patterns:
+                match = re.search(pattern, command_text_lower)
+                if match:
+                    entities = {}
+                    if intent == "NAVIGATE_PAGE":
+                        entities["target_page"] = int(match.group(1)) - 1
+                    elif intent == "EXPLAIN_LINE":
+                        entities["target_line"] = int(match.group(1)) - 1
+                    elif intent == "READ_PARAGRAPH":
+                        entities["target_paragraph"] = int(match.group(1)) - 1
+                    elif intent == "TRANSLATE":
+                        lang_match = re.search(r"(?:to|in|into)\s+(\w+)", command_text_lower)
+                        entities["target_language"] = lang_match.group(1).capitalize() if lang_match else "English"
+                    elif intent == "QUIZ":
+                        if "hard" in command_text_lower:
+                            entities["difficulty"] = "hard"
+                        elif "easy" in command_text_lower:
+                            entities["difficulty"] = "easy"
+                        else:
+                            entities["difficulty"] = "medium"
+                    return {"intent": intent, "entities": entities}
+        return {"intent": "UNKNOWN", "entities": {}}
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def evaluate(recognizer, corpus):
+    intent_ok = 0
+    exact_ok = 0
+    errors = []
+    for row in corpus:
+        got = recognizer.recognize_intent(row["text"])
+        if got["intent"] == row["intent"]:
+            intent_ok += 1
+            expected = row.get("entities")
+            if expected is None or all(got["entities"].get(k) == v for k, v in expected.items()):
+                exact_ok += 1
+        else:
+            errors.append((row["text"], row["intent"], got["intent"]))
+    return intent_ok / len(corpus), exact_ok / len(corpus), errors
+
+def throughput(recognizer, corpus, rounds):
+    texts = [row["text"] for row in corpus]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for t in texts:
+            recognizer.recognize_intent(t)
+    elapsed = time.perf_counter() - start
+    return rounds * len(texts) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200, help="passes over the corpus for throughput")
+    parser.add_argument("--show-errors", action="store_true")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)  # Recognizers log every call
+
+    corpus = load_corpus()
+    candidates = [
+        ("legacy", LegacyIntentRecognizer()),
+        ("compiled (no cache)", IntentRecognizer(cache_size=0)),
+        ("compiled + LRU", IntentRecognizer()),
+    ]
+    classifier = load_default_classifier()
+    if classifier is not None:
+        candidates.append(("compiled + classifier", IntentRecognizer(cache_size=0, classifier=classifier)))
+    print(f"corpus: {len(corpus)} utterances, {args.rounds} rounds")
+    print(f"{'recognizer':<22}{'intent acc':>12}{'exact acc':>12}{'utt/s':>14}")
+    for name, recognizer in candidates:
+        intent_acc, exact_acc, errors = evaluate(recognizer, corpus)
+        rate = throughput(recognizer, corpus, args.rounds)
+        print(f"{name:<22}{intent_acc:>12.1%}{exact_acc:>12.1%}{rate:>14,.0f}")
+        if args.show_errors:
+            for text, expected, got in errors:
+                print(f"    {text!r}: expected {expected}, got {got}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Measures navigation latency while other users saturate the server with LLM requests.
+
+Starts the production server (serve.py, WEB_THREADS request threads) twice:
+once with the LLM lane disabled (LLM_WORKERS=0, every Gemini call holds a
+request thread until it finishes) and once with admission control. Each
+time, --llm-clients users loop "summarize this page" while one user pages
+back and forth. Reports navigation p50/p95 and how many LLM requests were
+answered or refused with a 503 "busy" reply. Gemini and gTTS are local
+stand-ins, so this runs offline.
+
+Usage:
+    python benchmarks/bench_lanes.py
+    python benchmarks/bench_lanes.py --llm-clients 32 --threads 8 --seconds 10
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+TMP = tempfile.mkdtemp(prefix="bench_lanes_")
+# Point the data dirs at a throwaway location before config.py is imported
+os.environ.update(DATA_DIR=os.path.join(TMP, "data"), TEMP_AUDIO_DIR=os.path.join(TMP, "audio"), DB_BACKEND="sqlite")
+os.environ.pop("DB_PATH", None)
+
+from modules.document import Document
+from modules.doc_store import save as save_doc
+
+DOC_ID = "BENCH_LANES"
+
+def _post(base, body):
+    req = urllib.request.Request(f"{base}/api/assistant/action", data=json.dumps(body).encode(),
+                                 headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+def _wait_ready(base, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            urllib.request.urlopen(f"{base}/api/stats", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+def run(label, env, args):
+    base = f"http://127.0.0.1:{args.port}"
+    proc = subprocess.Popen([sys.executable, "serve.py"], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    stop = threading.Event()
+    llm = {"ok": 0, "busy": 0, "other": 0}
+    nav = []
+    lock = threading.Lock()
+
+    def llm_user(i):
+        while not stop.is_set():
+            status, _ = _post(base, {"doc_id": DOC_ID, "page": 0, "user_utterance": "summarize this page", "session_id": f"llm-{i}"})
+            with lock:
+                llm["ok" if status == 200 else "busy" if status == 503 else "other"] += 1
+            if status == 503:
+                time.sleep(0.5)  # What the client does with Retry-After
+
+    def nav_user():
+        page = 0
+        while not stop.is_set():
+            utterance = "next page" if page == 0 else "previous page"
+            status, elapsed = _post(base, {"doc_id": DOC_ID, "page": page, "user_utterance": utterance, "session_id": "nav"})
+            nav.append(elapsed)
+            page = 1 - page
+            time.sleep(0.05)
+
+    try:
+        _wait_ready(base, proc)
+        threads = [threading.Thread(target=llm_user, args=(i,)) for i in range(args.llm_clients)]
+        threads.append(threading.Thread(target=nav_user))
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    nav.sort()
+    pct = lambda q: 1000 * nav[min(len(nav) - 1, int(q * len(nav)))] if nav else 0.0
+    print(f"{label:<22}{len(nav):>6}{pct(0.5):>9.0f}{pct(0.95):>9.0f}{llm['ok']:>8}{llm['busy']:>8}{llm['other']:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--llm-clients", type=int, default=24)
+    parser.add_argument("--threads", type=int, default=8, help="server request threads (WEB_THREADS)")
+    parser.add_argument("--llm-workers", type=int, default=4)
+    parser.add_argument("--llm-queue", type=int, default=2)
+    parser.add_argument("--gemini-latency", type=float, default=1.0)
+    parser.add_argument("--seconds", type=float, default=8)
+    parser.add_argument("--port", type=int, default=5056)
+    args = parser.parse_args()
+
+    save_doc(Document.from_structure({0: ["First page text."], 1: ["Second page text."]}), custom_id=DOC_ID)
+    env = dict(os.environ, GEMINI_STUB_LATENCY=str(args.gemini_latency), TTS_STUB_LATENCY="0.05",
+               WEB_HOST="127.0.0.1", WEB_PORT=str(args.port), WEB_THREADS=str(args.threads),
+               LLM_QUEUE=str(args.llm_queue), LLM_PER_CLIENT="1")
+    print(f"{args.llm_clients} LLM clients, {args.threads} server threads, Gemini stub {args.gemini_latency}s, {args.seconds}s per run")
+    print(f"{'mode':<22}{'nav n':>6}{'p50 ms':>9}{'p95 ms':>9}{'llm ok':>8}{'busy':>8}{'other':>7}")
+    try:
+        run("no lanes", dict(env, LLM_WORKERS="0"), args)
+        run(f"lanes ({args.llm_workers}+{args.llm_queue} slots)", dict(env, LLM_WORKERS=str(args.llm_workers)), args)
+    finally:
+        shutil.rmtree(TMP, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
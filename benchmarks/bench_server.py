@@ -0,0 +1,131 @@
+"""
+Compares request throughput of the Flask dev server, waitress and gunicorn.
+
+Gemini and gTTS are replaced by local stand-ins (GEMINI_STUB_LATENCY /
+TTS_STUB_LATENCY) so the numbers measure the server, not the network, and
+the database is a throwaway SQLite file. Each server is started as a
+subprocess, hit by --concurrency clients sending a mix of voice commands,
+then stopped with SIGTERM to exercise graceful shutdown.
+
+Usage:
+    python benchmarks/bench_server.py
+    python benchmarks/bench_server.py --servers dev gunicorn --concurrency 32 --requests 400
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import DOCS_DIR, TEMP_AUDIO_DIR
+from modules.document import Document
+from modules.doc_store import save as save_doc
+
+DOC_ID = "BENCH_SERVER"
+# (utterance, weight): LLM-backed commands dominate real sessions; navigation is cheap
+COMMANDS = [("summarize this page", 4), ("explain this page", 3), ("next page", 2), ("read this page", 1)]
+
+def _server_cmd(name, port):
+    if name == "dev":
+        return [sys.executable, "-c", f"from web_app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    if name == "waitress":
+        return [sys.executable, "serve.py"]
+    if name == "gunicorn":
+        return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "web_app:app"]
+    raise ValueError(name)
+
+def _wait_ready(base, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            urllib.request.urlopen(f"{base}/api/stats", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+def _post(base, utterance):
+    body = json.dumps({"doc_id": DOC_ID, "page": 0, "user_utterance": utterance}).encode()
+    req = urllib.request.Request(f"{base}/api/assistant/action", data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        resp.read()
+    return time.perf_counter() - start
+
+def run_load(base, concurrency, total):
+    schedule = [u for u, w in COMMANDS for _ in range(w)]
+    utterances = [schedule[i % len(schedule)] for i in range(total)]
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for fut in [pool.submit(_post, base, u) for u in utterances]:
+            try:
+                latencies.append(fut.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    pct = lambda q: 1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+    return {"rps": len(latencies) / elapsed, "p50_ms": pct(0.50), "p95_ms": pct(0.95), "errors": errors}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--servers", nargs="+", default=["dev", "waitress", "gunicorn"], choices=["dev", "waitress", "gunicorn"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--gemini-latency", type=float, default=0.5, help="seconds per stubbed Gemini call")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="seconds per stubbed gTTS call")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+
+    save_doc(Document.from_structure({0: [f"Paragraph {i} of the benchmark page. " * 8 for i in range(6)]}), custom_id=DOC_ID)
+    tmp = tempfile.mkdtemp(prefix="bench_server_")
+    env = dict(os.environ,
+               GEMINI_STUB_LATENCY=str(args.gemini_latency), TTS_STUB_LATENCY=str(args.tts_latency),
+               DB_BACKEND="sqlite", DB_PATH=os.path.join(tmp, "bench.db"),
+               WEB_HOST="127.0.0.1", WEB_PORT=str(args.port),
+               WEB_WORKERS=str(args.workers), WEB_THREADS=str(args.threads))
+    base = f"http://127.0.0.1:{args.port}"
+    audio_before = set(os.listdir(TEMP_AUDIO_DIR))
+    print(f"{args.requests} requests, {args.concurrency} clients, Gemini stub {args.gemini_latency}s, TTS stub {args.tts_latency}s")
+    print(f"{'server':<10}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}{'shutdown':>10}")
+    try:
+        for name in args.servers:
+            proc = subprocess.Popen(_server_cmd(name, args.port), cwd=ROOT, env=env,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                _wait_ready(base, proc)
+                _post(base, "next page")  # warm-up: lazy service init
+                stats = run_load(base, args.concurrency, args.requests)
+            finally:
+                proc.send_signal(signal.SIGTERM)
+                try:
+                    code = proc.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    code = "killed"
+            print(f"{name:<10}{stats['rps']:>8.1f}{stats['p50_ms']:>9.0f}{stats['p95_ms']:>9.0f}{stats['errors']:>8}{str(code):>10}")
+    finally:
+        path = os.path.join(DOCS_DIR, f"{DOC_ID}.json")
+        if os.path.exists(path):
+            os.remove(path)
+        # Stub TTS writes empty placeholder files; remove the ones this run created
+        for name in set(os.listdir(TEMP_AUDIO_DIR)) - audio_before:
+            fpath = os.path.join(TEMP_AUDIO_DIR, name)
+            if os.path.getsize(fpath) == 0:
+                os.remove(fpath)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Transcribes WAV fixtures with a speech-to-text backend and reports real-time factor.
+
+No microphone is needed. Files must be 16-bit mono PCM WAV.
+
+Usage:
+    python benchmarks/bench_stt.py --backend vosk --model path/to/vosk-model clip1.wav clip2.wav
+    python benchmarks/bench_stt.py --backend google clip1.wav
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import VOSK_MODEL_PATH
+from modules.stt import create_stt_backend, transcribe_wav
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("wavs", nargs="+", help="16-bit mono WAV files")
+    parser.add_argument("--backend", default="vosk", choices=["vosk", "google"])
+    parser.add_argument("--model", default=VOSK_MODEL_PATH, help="Vosk model directory (defaults to VOSK_MODEL_PATH)")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="streaming chunk size")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    backend = create_stt_backend(args.backend, args.model)
+    total_audio = total_decode = 0.0
+    print(f"{'file':<32}{'audio s':>9}{'decode s':>10}{'RTF':>7}{'final ms':>10}  transcript")
+    for path in args.wavs:
+        text, stats = transcribe_wav(backend, path, chunk_ms=args.chunk_ms)
+        total_audio += stats["audio_seconds"]
+        total_decode += stats["decode_seconds"]
+        rtf = f"{stats['rtf']:.2f}" if stats["rtf"] is not None else "-"  # None for a zero-length recording
+        print(f"{os.path.basename(path)[:31]:<32}{stats['audio_seconds']:>9.2f}{stats['decode_seconds']:>10.3f}"
+              f"{rtf:>7}{1000 * stats['finalize_seconds']:>10.0f}  {text or ''}")
+    if total_audio:
+        print(f"overall RTF: {total_decode / total_audio:.3f} over {total_audio:.1f}s of audio")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measures TTS synthesis time against text length, serial vs parallel requests.
+
+gTTS sends one HTTP request per ~100 characters of text. For each text
+length this synthesizes the same text twice: once with the requests sent
+one after another, and once with them sent concurrently on
+TTS_SEGMENT_WORKERS threads over a pooled session (modules.tts_parallel).
+The parallel output is checked to play for as long as the serial one.
+
+By default gTTS's HTTP requests are simulated offline. Each takes --rtt
+seconds (plus up to --jitter) and returns silent MP3 frames, so only the
+request scheduling is measured. With --live the real service is called,
+and "serial" is plain gTTS(...).save(), which also opens a new connection
+per request.
+
+Usage:
+    python benchmarks/bench_tts.py
+    python benchmarks/bench_tts.py --rtt 0.4 --sentences 1 3 9 18 27
+    python benchmarks/bench_tts.py --live --runs 3
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+TMP = tempfile.mkdtemp(prefix="bench_tts_")
+os.environ.update(DATA_DIR=os.path.join(TMP, "data"), TEMP_AUDIO_DIR=os.path.join(TMP, "audio"))
+
+from modules import tts_parallel, audio_codec
+from config import TTS_LANGUAGE, TTS_SEGMENT_WORKERS
+
+SENTENCES = [
+    "The cell membrane controls what enters and leaves the cell.",
+    "It is built from a double layer of phospholipids with proteins embedded in it.",
+    "Small uncharged molecules such as oxygen diffuse straight through the bilayer.",
+    "Ions and larger molecules need channel or carrier proteins to cross.",
+    "Active transport moves substances against their concentration gradient, which costs energy.",
+    "That energy comes from ATP produced during cellular respiration.",
+    "The sodium potassium pump is the best known example of active transport.",
+    "Cells also take in large particles by wrapping them in membrane, a process called endocytosis.",
+    "Together these mechanisms keep the inside of the cell stable while the outside changes.",
+]
+# MPEG-2 Layer III, 32 kbps, 24 kHz, mono: a 96-byte frame of silence (24 ms)
+SILENT_FRAME = bytes([0xFF, 0xF3, 0x44, 0xC4]) + bytes(92)
+
+def text_of(n):
+    return " ".join(SENTENCES[i % len(SENTENCES)] for i in range(n))
+
+def simulated_fetch(rtt, jitter):
+    def fetch(request):
+        time.sleep(rtt + random.uniform(0, jitter))
+        return SILENT_FRAME * 40
+    return fetch
+
+def synthesize_serial(text, path, live):
+    if live:
+        from gtts import gTTS
+        gTTS(text=text, lang=TTS_LANGUAGE).save(path)
+    else:
+        tts_parallel.synthesize(text, path, parallel=False)
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sentences", type=int, nargs="+", default=[1, 3, 9, 18], help="text lengths, in sentences")
+    parser.add_argument("--runs", type=int, default=3, help="runs per length and mode (median reported)")
+    parser.add_argument("--rtt", type=float, default=0.3, help="simulated seconds per gTTS request")
+    parser.add_argument("--jitter", type=float, default=0.1, help="extra random seconds per simulated request")
+    parser.add_argument("--live", action="store_true", help="call the real gTTS service")
+    args = parser.parse_args()
+
+    if not args.live:
+        tts_parallel.fetch = simulated_fetch(args.rtt, args.jitter)
+    source = "live gTTS" if args.live else f"simulated gTTS ({args.rtt}s + up to {args.jitter}s per request)"
+    print(f"{source}, TTS_SEGMENT_WORKERS={TTS_SEGMENT_WORKERS}, median of {args.runs} runs")
+    print(f"{'sentences':>9}{'chars':>7}{'requests':>10}{'serial s':>10}{'parallel s':>12}{'speedup':>9}{'audio s':>9}")
+    try:
+        for n in args.sentences:
+            text = text_of(n)
+            serial_path = os.path.join(TMP, "serial.mp3")
+            parallel_path = os.path.join(TMP, "parallel.mp3")
+            serial = statistics.median(timed(synthesize_serial, text, serial_path, args.live) for _ in range(args.runs))
+            parallel = statistics.median(timed(tts_parallel.synthesize, text, parallel_path) for _ in range(args.runs))
+            with open(serial_path, "rb") as f:
+                serial_audio = audio_codec.mp3_duration(f.read())
+            with open(parallel_path, "rb") as f:
+                parallel_audio = audio_codec.mp3_duration(f.read())
+            if abs(serial_audio - parallel_audio) > 0.1:
+                print(f"warning: audio length differs (serial {serial_audio:.2f}s, parallel {parallel_audio:.2f}s)")
+            requests = len(tts_parallel.prepare_requests(text))
+            print(f"{n:>9}{len(text):>7}{requests:>10}{serial:>10.2f}{parallel:>12.2f}{serial / parallel:>8.1f}x{parallel_audio:>9.1f}")
+    finally:
+        shutil.rmtree(TMP, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
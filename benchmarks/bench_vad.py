@@ -0,0 +1,53 @@
+"""
+Runs the VAD endpointer (and optionally the wake-word gate and an STT backend)
+over recorded WAV files, printing each detected utterance.
+
+Useful for tuning endpointing on real recordings without a microphone.
+Files must be 16-bit mono PCM WAV.
+
+Usage:
+    python benchmarks/bench_vad.py session.wav
+    python benchmarks/bench_vad.py --backend vosk --model path/to/model --wake "wake,hey tutor" session.wav
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import VOSK_MODEL_PATH
+from modules.stt import create_stt_backend
+from modules.vad import segment_wav, WakeWordGate
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("wavs", nargs="+", help="16-bit mono WAV files")
+    parser.add_argument("--backend", choices=["vosk", "google"], help="transcribe each utterance with this backend")
+    parser.add_argument("--model", default=VOSK_MODEL_PATH, help="Vosk model directory")
+    parser.add_argument("--wake", default="", help="comma-separated wake phrases to spot (requires --backend vosk)")
+    args = parser.parse_args()
+    if args.wake and args.backend != "vosk":
+        parser.error("--wake needs --backend vosk (the wake-word gate only runs on a streaming backend)")
+    logging.basicConfig(level=logging.WARNING)
+
+    backend = create_stt_backend(args.backend, args.model) if args.backend else None
+    wake_words = [w for w in args.wake.split(",") if w.strip()]
+    gate = WakeWordGate(backend, wake_words) if backend and wake_words else None
+
+    for path in args.wavs:
+        start = time.perf_counter()
+        utterances, sample_rate = segment_wav(path)
+        vad_ms = 1000 * (time.perf_counter() - start)
+        print(f"{path}: {len(utterances)} utterance(s), VAD took {vad_ms:.1f} ms")
+        for u in utterances:
+            line = f"  {u.start:7.2f}s - {u.end:7.2f}s ({u.duration:5.2f}s)"
+            if gate:
+                line += "  wake" if gate.detect(u.pcm, sample_rate) else "  ----"
+            if backend:
+                line += f"  {backend.transcribe(u.pcm, sample_rate) or ''}"
+            print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Replays scripted voice sessions against the web app and reports latency per intent.
+
+Each simulated user uploads a generated PDF, then speaks a fixed script of
+commands (navigate, summarize, quiz, translate, repeat, ...) and fetches
+the audio for every reply like the browser does. Gemini and gTTS are
+replaced by local stand-ins with configurable latency, and uploads, parsed
+documents, audio and an SQLite database live in a throwaway directory, so
+the run is fully offline and leaves the real data untouched.
+
+By default requests go through Flask's test client in this process. Pass
+--url to drive a running server instead (start it with the same
+GEMINI_STUB_LATENCY / TTS_STUB_LATENCY settings).
+
+Results are printed as JSON with sorted keys and fixed rounding. Save one
+run with --out, then pass it as --baseline to a later run to flag p95
+regressions. The exit status is 1 if any intent regressed.
+
+Usage:
+    python benchmarks/loadgen.py --sessions 20 --concurrency 8
+    python benchmarks/loadgen.py --out baseline.json
+    python benchmarks/loadgen.py --baseline baseline.json --tolerance 0.2
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# One user's session after the upload; utterances go through intent recognition like speech would
+SCRIPT = [
+    "next page",
+    "summarize this page",
+    "go to page 3",
+    "read this page",
+    "quiz me",
+    "translate this page to hindi",
+    "repeat that",
+    "explain this page",
+    "previous page",
+    "stop",
+]
+
+def build_pdf(pages, words_per_page=180):
+    """Builds a small text-only PDF (Helvetica, one text block per page) without extra libraries."""
+    vocab = ("the cell membrane controls what enters and leaves while energy from respiration "
+             "drives transport proteins across the lipid bilayer in every living organism").split()
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for p in range(pages):
+        words = [vocab[(p * 7 + i) % len(vocab)] for i in range(words_per_page)]
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        text = "".join(f"({line}) Tj T* " for line in [f"Page {p + 1}"] + lines)
+        stream = f"BT /F1 11 Tf 14 TL 50 780 Td {text}ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+class InProcessClient:
+    """Flask test client; one per thread since test clients keep cookie state."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def _client(self):
+        if not hasattr(self.local, "client"):
+            self.local.client = self.app.test_client()
+        return self.local.client
+
+    def upload(self, name, pdf_bytes):
+        resp = self._client().post("/api/upload", data={"pdf": (io.BytesIO(pdf_bytes), name)},
+                                   content_type="multipart/form-data")
+        return resp.status_code, resp.get_json(silent=True) or {}
+
+    def action(self, body):
+        resp = self._client().post("/api/assistant/action", json=body)
+        return resp.status_code, resp.get_json(silent=True) or {}
+
+    def get(self, path):
+        resp = self._client().get(path)
+        resp.get_data()
+        resp.close()
+        return resp.status_code
+
+    def delete(self, path):
+        return self._client().delete(path).status_code
+
+class HttpClient:
+    def __init__(self, base):
+        self.base = base.rstrip("/")
+
+    def _send(self, req):
+        try:
+            with urllib.request.urlopen(req, timeout=120) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def upload(self, name, pdf_bytes):
+        boundary = uuid.uuid4().hex
+        body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"pdf\"; filename=\"{name}\"\r\n"
+                f"Content-Type: application/pdf\r\n\r\n").encode() + pdf_bytes + f"\r\n--{boundary}--\r\n".encode()
+        req = urllib.request.Request(f"{self.base}/api/upload", data=body,
+                                     headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+        status, raw = self._send(req)
+        return status, json.loads(raw or b"{}")
+
+    def action(self, body):
+        req = urllib.request.Request(f"{self.base}/api/assistant/action", data=json.dumps(body).encode(),
+                                     headers={"Content-Type": "application/json"})
+        status, raw = self._send(req)
+        return status, json.loads(raw or b"{}")
+
+    def get(self, path):
+        return self._send(urllib.request.Request(f"{self.base}{path}"))[0]
+
+    def delete(self, path):
+        return self._send(urllib.request.Request(f"{self.base}{path}", method="DELETE"))[0]
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, ok):
+        with self.lock:
+            self.samples.setdefault(name, []).append(seconds)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+def run_session(client, recorder, pdf_bytes, think, fetch_audio, uploaded):
+    def timed(name, fn):
+        start = time.perf_counter()
+        status, body = fn()
+        recorder.record(name, time.perf_counter() - start, status < 400)
+        return status, body
+
+    status, info = timed("UPLOAD", lambda: client.upload(f"loadgen_{uuid.uuid4().hex[:8]}.pdf", pdf_bytes))
+    if status >= 400 or "pdf_id" not in info:
+        return
+    doc_id = info["pdf_id"]
+    uploaded.append(doc_id)
+    page = 0
+    for utterance in SCRIPT:
+        if think:
+            time.sleep(think)
+        start = time.perf_counter()
+        status, res = client.action({"doc_id": doc_id, "page": page, "user_utterance": utterance, "include_page_text": True})
+        recorder.record(res.get("intent", "HTTP_ERROR"), time.perf_counter() - start, status < 400)
+        page = res.get("new_page", page)
+        if fetch_audio and res.get("audio_url"):
+            timed("AUDIO", lambda: (client.get(res["audio_url"]), None))
+
+def _pct(sorted_values, q):
+    # Nearest-rank percentile
+    idx = max(0, min(len(sorted_values) - 1, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[idx]
+
+def summarize(recorder, elapsed, config):
+    intents = {}
+    all_values = []
+    for name, values in recorder.samples.items():
+        values = sorted(values)
+        all_values.extend(values)
+        intents[name] = {
+            "count": len(values),
+            "errors": recorder.errors.get(name, 0),
+            "mean_ms": round(1000 * sum(values) / len(values), 1),
+            "p50_ms": round(1000 * _pct(values, 0.50), 1),
+            "p95_ms": round(1000 * _pct(values, 0.95), 1),
+            "p99_ms": round(1000 * _pct(values, 0.99), 1),
+        }
+    all_values.sort()
+    total = {
+        "requests": len(all_values),
+        "errors": sum(recorder.errors.values()),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(all_values) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(1000 * _pct(all_values, 0.50), 1) if all_values else 0.0,
+        "p95_ms": round(1000 * _pct(all_values, 0.95), 1) if all_values else 0.0,
+        "p99_ms": round(1000 * _pct(all_values, 0.99), 1) if all_values else 0.0,
+    }
+    return {"schema": 1, "config": config, "total": total, "intents": intents}
+
+def compare(result, baseline, tolerance):
+    """Returns intents whose p95 grew by more than tolerance (fraction) versus the baseline."""
+    regressions = []
+    for name, stats in sorted(result["intents"].items()):
+        base = baseline.get("intents", {}).get(name)
+        if not base or not base["p95_ms"]:
+            continue
+        change = (stats["p95_ms"] - base["p95_ms"]) / base["p95_ms"]
+        if change > tolerance:
+            regressions.append({"intent": name, "baseline_p95_ms": base["p95_ms"], "p95_ms": stats["p95_ms"], "change": round(change, 3)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=16, help="number of simulated users")
+    parser.add_argument("--concurrency", type=int, default=8, help="users active at once")
+    parser.add_argument("--pages", type=int, default=6, help="pages in the generated PDF")
+    parser.add_argument("--gemini-latency", type=float, default=0.3, help="seconds per stubbed Gemini call")
+    parser.add_argument("--tts-latency", type=float, default=0.1, help="seconds per stubbed gTTS call")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause between a user's commands")
+    parser.add_argument("--no-audio", action="store_true", help="don't fetch reply audio")
+    parser.add_argument("--url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--out", help="also write the JSON result to this file")
+    parser.add_argument("--baseline", help="earlier result to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth vs baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    config = {
+        "sessions": args.sessions, "concurrency": args.concurrency, "pages": args.pages,
+        "gemini_latency_s": args.gemini_latency, "tts_latency_s": args.tts_latency,
+        "think_ms": args.think_ms, "fetch_audio": not args.no_audio, "target": "http" if args.url else "in-process",
+    }
+    if args.url:
+        client = HttpClient(args.url)
+    else:
+        # Must be set before config.py is imported by web_app
+        tmp = tempfile.mkdtemp(prefix="loadgen_")
+        os.environ.update(GEMINI_STUB_LATENCY=str(args.gemini_latency), TTS_STUB_LATENCY=str(args.tts_latency),
+                          DB_BACKEND="sqlite", DATA_DIR=os.path.join(tmp, "data"), TEMP_AUDIO_DIR=os.path.join(tmp, "audio"))
+        os.environ.pop("DB_PATH", None)
+        import logging
+        logging.disable(logging.INFO)
+        from web_app import app, warm_up, shutdown_services
+        warm_up()  # What serve.py / gunicorn do at startup, so the first requests aren't charged for it
+        client = InProcessClient(app)
+
+    pdf_bytes = build_pdf(args.pages)
+    recorder = Recorder()
+    uploaded = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(run_session, client, recorder, pdf_bytes, args.think_ms / 1000, not args.no_audio, uploaded)
+                   for _ in range(args.sessions)]
+        for fut in futures:
+            fut.result()
+    elapsed = time.perf_counter() - start
+
+    for doc_id in uploaded:
+        client.delete(f"/api/library/{doc_id}")
+    if not args.url:
+        shutdown_services()  # Flush buffered chat messages before their database is deleted
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    result = summarize(recorder, elapsed, config)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            result["regressions"] = compare(result, json.load(f), args.tolerance)
+    output = json.dumps(result, indent=2, sort_keys=True)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return 1 if result.get("regressions") else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
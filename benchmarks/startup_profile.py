@@ -0,0 +1,101 @@
+"""
+Measures cold-start import time of the web and CLI entry points against a budget.
+
+Each entry point is imported in a fresh interpreter --runs times and the
+median import time (interpreter start-up excluded) is compared with its
+budget. With --importtime the import also runs under `python -X importtime`
+and the slowest modules it pulls in directly are listed, which is where to
+look when the budget is blown. Data directories point at a throwaway
+location and GEMINI_API_KEY is not needed. The exit status is 1 if any
+entry point is over budget.
+
+Usage:
+    python benchmarks/startup_profile.py
+    python benchmarks/startup_profile.py --importtime --top 15
+    python benchmarks/startup_profile.py --web-budget-ms 400 --cli-budget-ms 300
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry point -> module whose import is timed (what `python web_app.py` / `python main.py` load before doing any work)
+TARGETS = {"web": "web_app", "cli": "main"}
+
+def _env(tmp):
+    env = dict(os.environ, DATA_DIR=os.path.join(tmp, "data"), TEMP_AUDIO_DIR=os.path.join(tmp, "audio"), DB_BACKEND="sqlite")
+    env.pop("DB_PATH", None)
+    return env
+
+def time_import(module, env):
+    """Returns (import seconds, whole-process seconds) for one cold import in a new interpreter."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    total = time.perf_counter() - start
+    return float(out.stdout.strip().splitlines()[-1]), total
+
+def import_profile(module, env):
+    """Returns [(cumulative_us, self_us, name)] for the modules `module` imports directly, slowest first."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, raw = line[len("import time:"):].split("|", 2)
+        depth = (len(raw) - len(raw.lstrip()) - 1) // 2
+        rows.append((depth, int(cumulative_us), int(self_us), raw.strip()))
+    # -X importtime prints children before their parent, so the entry point's direct imports
+    # are the depth-1 rows between the previous top-level module and the entry point itself
+    end = max(i for i, row in enumerate(rows) if row[0] == 0 and row[3] == module)
+    children = []
+    for depth, cumulative_us, self_us, name in reversed(rows[:end]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((cumulative_us, self_us, name))
+    return sorted(children, reverse=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="cold imports per entry point")
+    parser.add_argument("--web-budget-ms", type=float, default=500, help="median `import web_app` budget")
+    parser.add_argument("--cli-budget-ms", type=float, default=400, help="median `import main` budget")
+    parser.add_argument("--importtime", action="store_true", help="list the slowest direct imports of each entry point")
+    parser.add_argument("--top", type=int, default=10, help="modules listed per entry point with --importtime")
+    args = parser.parse_args()
+
+    budgets = {"web": args.web_budget_ms, "cli": args.cli_budget_ms}
+    tmp = tempfile.mkdtemp(prefix="startup_profile_")
+    env = _env(tmp)
+    over = []
+    try:
+        print(f"{'entry':<6}{'module':<10}{'median ms':>11}{'min ms':>9}{'process ms':>12}{'budget ms':>11}  status")
+        for name, module in TARGETS.items():
+            samples = [time_import(module, env) for _ in range(args.runs)]
+            median = 1000 * statistics.median(s[0] for s in samples)
+            fastest = 1000 * min(s[0] for s in samples)
+            process = 1000 * statistics.median(s[1] for s in samples)
+            ok = median <= budgets[name]
+            if not ok:
+                over.append(name)
+            print(f"{name:<6}{module:<10}{median:>11.0f}{fastest:>9.0f}{process:>12.0f}{budgets[name]:>11.0f}  {'ok' if ok else 'OVER BUDGET'}")
+        if args.importtime:
+            for name, module in TARGETS.items():
+                print(f"\nSlowest direct imports of {module} ({name}):")
+                print(f"{'cumulative ms':>14}{'self ms':>9}  module")
+                for cumulative_us, self_us, child in import_profile(module, env)[:args.top]:
+                    print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>9.1f}  {child}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 1 if over else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
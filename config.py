@@ -5,33 +5,112 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # --- API Keys ---
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable not set. Please set it before running the application.")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")  # Checked when the Gemini client is first created, not at import
 
 # --- File Paths ---
 SAMPLE_PDFS_DIR = os.path.join(os.path.dirname(__file__), "data", "sample_pdfs")
 LOGS_DIR = os.path.join(os.path.dirname(__file__), "logs")
-TEMP_AUDIO_DIR = os.path.join(os.path.dirname(__file__), "temp_audio")
-UPLOADS_DIR = os.path.join(os.path.dirname(__file__), "data", "uploads")
-DB_PATH = os.path.join(os.path.dirname(__file__), "data", "app.db")
-DOCS_DIR = os.path.join(os.path.dirname(__file__), "data", "docs")
+TEMP_AUDIO_DIR = os.getenv("TEMP_AUDIO_DIR", os.path.join(os.path.dirname(__file__), "temp_audio"))
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(__file__), "data"))  # Uploads, parsed docs and the SQLite DB
+UPLOADS_DIR = os.path.join(DATA_DIR, "uploads")
+DB_PATH = os.getenv("DB_PATH", os.path.join(DATA_DIR, "app.db"))
+DOCS_DIR = os.path.join(DATA_DIR, "docs")
+DB_BACKEND = os.getenv("DB_BACKEND", "mongo").lower()  # "mongo" or "sqlite" (embedded, uses DB_PATH)
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "ai_voice_tutor")
+MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", 50))  # Chat messages buffered per batched insert (1 = write-through)
+MESSAGE_FLUSH_INTERVAL = float(os.getenv("MESSAGE_FLUSH_INTERVAL", 1.0))  # Max seconds a message stays buffered
+MESSAGE_BUFFER_MAX = int(os.getenv("MESSAGE_BUFFER_MAX", 10000))  # Unwritten messages kept for retry while the database is down (oldest dropped beyond)
 
 # Ensure directories exist
 os.makedirs(LOGS_DIR, exist_ok=True)
 os.makedirs(TEMP_AUDIO_DIR, exist_ok=True)
 os.makedirs(UPLOADS_DIR, exist_ok=True)
-os.makedirs(os.path.join(os.path.dirname(__file__), "data"), exist_ok=True)
+os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(DOCS_DIR, exist_ok=True)
 
+# --- Storage Settings ---
+STORAGE_GC_INTERVAL = int(os.getenv("STORAGE_GC_INTERVAL", 600))  # Seconds between background storage sweeps (0 disables)
+AUDIO_TTL = int(os.getenv("AUDIO_TTL", 24 * 3600))  # Seconds generated audio (with its speed/compact variants) is kept
+AUDIO_MAX_BYTES = int(os.getenv("AUDIO_MAX_MB", 512)) * 1024 * 1024  # Oldest audio is removed first beyond this
+AUDIO_KEEP_RECENT = int(os.getenv("AUDIO_KEEP_RECENT", 600))  # Audio younger than this is never removed (replies still playing)
+ORPHAN_GRACE = int(os.getenv("ORPHAN_GRACE", 3600))  # Seconds before a file missing its counterpart counts as orphaned (uploads still extracting)
+PROJECT_QUOTA_BYTES = int(os.getenv("PROJECT_QUOTA_MB", 1024)) * 1024 * 1024  # Uploaded PDFs + parsed text per project (0 = unlimited)
+
 # --- Audio Settings ---
 TTS_LANGUAGE = 'en'  # Language for text-to-speech
 STT_TIMEOUT = 10  # Timeout for speech recognition in seconds
-TTS_SPEED = 1.0  # Speech speed multiplier (1.0 is normal)
+STT_PHRASE_LIMIT = 15  # Max seconds of a single spoken command
+STT_BACKEND = os.getenv("STT_BACKEND", "google").lower()  # "google" (online) or "vosk" (offline, streaming)
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH")  # Unpacked Vosk model directory, e.g. vosk-model-small-en-us-0.15
+WAKE_WORDS = [w for w in os.getenv("WAKE_WORDS", "").split(",") if w.strip()]  # CLI wake phrases, e.g. "wake,hey tutor" (empty = always listening; needs STT_BACKEND=vosk)
+WAKE_WINDOW = 15  # Seconds the CLI keeps listening for commands after the last one before requiring the wake word again
+TTS_SPEED = float(os.getenv("TTS_SPEED", 1.0))  # Default playback speed for new sessions (1.0 is normal)
+SPEED_MIN = 0.5  # Playback speeds are clamped to this range and rounded to 0.05
+SPEED_MAX = 3.0
+SPEED_STEP = 0.25  # How much "speak faster" / "speak slower" changes the speed
+READ_LOOKAHEAD = int(os.getenv("READ_LOOKAHEAD", 3))  # Sentences read-aloud synthesizes ahead of the playback position
+READ_CLI_PAGES = int(os.getenv("READ_CLI_PAGES", 2))  # Pages the CLI reads per "continue reading" before it listens for the next command
+READ_SENTENCE_CHARS = 300  # Read-aloud splits longer sentences (e.g. unpunctuated PDF text) at word boundaries
+READ_STREAMS = int(os.getenv("READ_STREAMS", 4))  # Concurrent read-aloud streams per process; each holds a request thread
+FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg")  # Decodes/encodes MP3 for pitch-preserving speed variants; without it browsers change the rate
+AUDIO_COMPACT = os.getenv("AUDIO_COMPACT", "1") == "1"  # Serve smaller Opus/WebM or low-bitrate MP3 to clients that ask for it (needs ffmpeg)
+OPUS_BITRATE = os.getenv("OPUS_BITRATE", "16k")  # Mono speech; Opus stays clear at 16 kbps
+COMPACT_MP3_BITRATE = os.getenv("COMPACT_MP3_BITRATE", "24k")  # For clients without Opus that send Save-Data
+REPEAT_SLOW_RATE = 0.75  # Playback rate for "say it slower"
+REPEAT_FAST_RATE = 1.25  # Playback rate for "say it faster"
+TTS_PREFETCH_WORKERS = int(os.getenv("TTS_PREFETCH_WORKERS", 4))  # Background threads synthesizing replies before the client asks
+TTS_SEGMENT_WORKERS = int(os.getenv("TTS_SEGMENT_WORKERS", 6))  # Concurrent gTTS requests per process for long texts (1 = one after another)
+TTS_PARALLEL_MIN_CHARS = 200  # Texts at least this long are split at sentences and their gTTS requests sent in parallel
+TTS_REQUEST_TIMEOUT = 15  # Seconds per gTTS HTTP request
+
+# --- Session Settings ---
+SESSION_TTL = int(os.getenv("SESSION_TTL", 1800))  # Seconds a web dialogue session (last reply, quiz) is kept after its last use
+SESSION_MAX = int(os.getenv("SESSION_MAX", 10000))  # Max web sessions kept in memory per process
+
+MEMORY_TURNS = 4  # Recent conversation turns sent to Gemini verbatim
+MEMORY_TURN_CHARS = 600  # Per-message cap for those turns
+MEMORY_SUMMARY_CHARS = 600  # Budget for the rolling summary of older turns
+MEMORY_REBUILD_MESSAGES = 200  # Stored messages replayed to rebuild a chat's memory after a restart
+
+# --- Intent Settings ---
+INTENT_CACHE_SIZE = 1024  # Recently recognized utterances kept in the intent LRU
+INTENT_CLASSIFIER_ENABLED = os.getenv("INTENT_CLASSIFIER_ENABLED", "1") == "1"  # Local fallback for paraphrased commands
+INTENT_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("INTENT_CLASSIFIER_MIN_CONFIDENCE", 0.6))
+
+# --- Server Settings ---
+WEB_HOST = os.getenv("WEB_HOST", "127.0.0.1")
+WEB_PORT = int(os.getenv("WEB_PORT", 5000))
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", 2))  # gunicorn worker processes
+WEB_THREADS = int(os.getenv("WEB_THREADS", 8))  # Request threads per worker (Gemini/TTS calls mostly wait on the network)
+WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", 120))  # Seconds before a stuck worker is restarted
+WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30))  # Seconds in-flight requests get to finish on shutdown
+# Admission control for Gemini work: LLM_WORKERS calls run at once, LLM_QUEUE more may wait, the rest get a
+# fast "busy" reply. Keep LLM_WORKERS + LLM_QUEUE below WEB_THREADS so instant commands always find a thread.
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", 4))  # 0 disables the lane (calls run inline, no admission control)
+LLM_QUEUE = int(os.getenv("LLM_QUEUE", 2))
+LLM_PER_CLIENT = int(os.getenv("LLM_PER_CLIENT", 2))  # Max queued/running LLM requests per session
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 90))  # Seconds a request waits for its LLM result
+# Gemini model tiers: intents in GEMINI_FAST_INTENTS use the fast tier when their context is short, the rest use the standard one
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
+GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-flash-lite-latest")
+GEMINI_FAST_INTENTS = set(filter(None, os.getenv("GEMINI_FAST_INTENTS", "TRANSLATE").split(",")))
+GEMINI_FAST_MAX_CHARS = int(os.getenv("GEMINI_FAST_MAX_CHARS", 1500))  # Longer contexts go to the standard tier
+GEMINI_DEADLINE = float(os.getenv("GEMINI_DEADLINE", 30))  # Seconds before a Gemini call is abandoned (retries included); keep below LLM_TIMEOUT
+# Hedging: a call still unanswered after its model's recent p90 latency gets a duplicate request; the first answer wins
+GEMINI_HEDGE = os.getenv("GEMINI_HEDGE", "1") == "1"
+GEMINI_HEDGE_MIN_DELAY = float(os.getenv("GEMINI_HEDGE_MIN_DELAY", 1.0))  # Never hedge sooner than this many seconds
+GEMINI_HEDGE_MIN_SAMPLES = int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", 10))  # Answers per model needed before hedging starts
+GEMINI_LATENCY_WINDOW = int(os.getenv("GEMINI_LATENCY_WINDOW", 100))  # Recent answers per model behind the p90
+# Local stand-ins for load testing without network access: set to a latency in seconds to fake Gemini / gTTS
+GEMINI_STUB_LATENCY = float(os.getenv("GEMINI_STUB_LATENCY")) if os.getenv("GEMINI_STUB_LATENCY") else None
+TTS_STUB_LATENCY = float(os.getenv("TTS_STUB_LATENCY")) if os.getenv("TTS_STUB_LATENCY") else None
+# Heavy modules and clients load on first use; with warm-up on, a background thread loads them right after startup
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1") == "1"
 
 # --- PDF Settings ---
 CHUNK_SIZE = 800  # Number of characters per text chunk for Gemini context
+PAGE_RANGE_MAX = int(os.getenv("PAGE_RANGE_MAX", 20))  # Max pages returned by one /api/doc/<id>/pages request
+DOC_CACHE_MAX_BYTES = int(os.getenv("DOC_CACHE_MAX_BYTES", 64 * 1024 * 1024))  # In-process parsed document cache budget
 TESSERACT_CMD = os.getenv("TESSERACT_CMD")
 POPPLER_PATH = os.getenv("POPPLER_PATH")
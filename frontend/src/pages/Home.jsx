@@ -95,10 +95,10 @@ const Home = () => {
                                 <li className="recent-item" style={{ justifyContent: 'center', color: '#888' }}>No recent files found.</li>
                             ) : (
                                 recentDocs.map((doc) => (
-                                    <li key={doc.id} className="recent-item" onClick={() => navigate('/tutor', { state: { docId: doc.id, filename: doc.filename, page_count: '?', autoStart: true } })}>
+                                    <li key={doc.id} className="recent-item" onClick={() => navigate('/tutor', { state: { docId: doc.id, filename: doc.title || doc.filename, page_count: '?', autoStart: true } })}>
                                         <div className="file-icon"><FileText size={20} /></div>
                                         <div className="file-info">
-                                            <span className="file-name">{doc.filename}</span>
+                                            <span className="file-name">{doc.title || doc.filename}</span>
                                             <span className="file-date">PDF Document</span>
                                         </div>
                                         <button
@@ -5,8 +5,9 @@ import VoiceBar from '../components/VoiceBar';
 import ContextCard from '../components/ContextCard';
 import TranscriptPanel from '../components/TranscriptPanel';
 import ActionToast from '../components/ActionToast';
-import { getPageContent, sendAction, getAudioUrl } from '../utils/api';
+import { getPages, sendAction, getAudioUrl } from '../utils/api';
 import { VoiceManager, playAudioCallback, playChime as playChimeLocal } from '../utils/voice';
+import { ReadAloudPlayer } from '../utils/readAloud';
 import './Tutor.css';
 
 const voiceManager = new VoiceManager();
@@ -31,12 +32,24 @@ const Tutor = () => {
 
     const [showTranslate, setShowTranslate] = useState(false);
 
+    // Page texts fetched ahead in one range request, so paging forward needs no round trip
+    const pageCacheRef = React.useRef({});
+    const PAGE_WINDOW = 3;
+    // Server-side chat holding this conversation's memory; sent back so follow-ups keep context
+    const chatIdRef = React.useRef(null);
+    // Playback speed chosen by voice ("speed 1.5"); sent back so every server worker honours it
+    const speedRef = React.useRef(null);
+    // Continuous read-aloud; readPosRef ("page:sentence") lets "continue reading" resume where listening stopped
+    const readerRef = React.useRef(null);
+    const readPosRef = React.useRef(null);
+
     // Initial Load
     useEffect(() => {
         if (!docId) {
             navigate('/');
             return;
         }
+        pageCacheRef.current = {};
         loadPage(0);
 
         // Auto-start Wake Mode if requested
@@ -62,11 +75,20 @@ const Tutor = () => {
     }, [docId]);
 
     const loadPage = async (pageNum) => {
+        const cached = pageCacheRef.current[pageNum];
+        if (cached !== undefined) {
+            setPageText(cached);
+            setPage(pageNum);
+            return;
+        }
         setPageText(null);
         try {
-            const data = await getPageContent(docId, pageNum);
-            setPageText(data.text || "");
-            setPage(data.page);
+            const data = await getPages(docId, pageNum, pageNum + PAGE_WINDOW - 1);
+            const cache = {};
+            data.pages.forEach(p => { cache[p.page] = p.text || ""; });
+            pageCacheRef.current = cache;
+            setPageText(cache[pageNum] ?? "");
+            setPage(pageNum);
         } catch (e) {
             setToast({ message: "Failed to load page", type: "error" });
             setPageText("");
@@ -94,6 +116,7 @@ const Tutor = () => {
                 currentAudio.pause();
                 setCurrentAudio(null);
             }
+            stopReading();
             startListening();
         } else if (voiceState === 'LISTENING') {
             stopListening();
@@ -194,7 +217,7 @@ const Tutor = () => {
         }
 
         try {
-            const res = await sendAction(docId, page, null, text);
+            const res = await sendAction(docId, page, null, text, { chat_id: chatIdRef.current, speed: speedRef.current, read_position: readPosRef.current });
             processResponse(res);
         } catch (e) {
             setToast({ message: "Action failed", type: "error" });
@@ -214,9 +237,10 @@ const Tutor = () => {
             currentAudio.pause();
             setCurrentAudio(null);
         }
+        stopReading();
         setVoiceState('PROCESSING');
         try {
-            const res = await sendAction(docId, page, intent, null, entities);
+            const res = await sendAction(docId, page, intent, null, { ...entities, chat_id: chatIdRef.current, speed: speedRef.current, read_position: readPosRef.current });
             processResponse(res);
         } catch (e) {
             setToast({ message: "Action failed", type: "error" });
@@ -232,8 +256,18 @@ const Tutor = () => {
             return;
         }
 
+        if (res.chat_id) chatIdRef.current = res.chat_id;
+        if (res.speed) speedRef.current = res.speed;
+
         if (res.new_page !== undefined && res.new_page !== page) {
-            loadPage(res.new_page);
+            if (res.page_text !== undefined) {
+                // Server inlined the new page's text; no extra fetch needed
+                pageCacheRef.current[res.new_page] = res.page_text;
+                setPageText(res.page_text);
+                setPage(res.new_page);
+            } else {
+                loadPage(res.new_page);
+            }
         }
         if (res.text_response) {
             addMessage('Assistant', res.text_response);
@@ -259,7 +293,7 @@ const Tutor = () => {
             navigate('/tutor', {
                 state: {
                     docId: newId,
-                    filename: newId + ".pdf", // Approximate
+                    filename: res.payload.filename || newId + ".pdf",
                     autoStart: true // Keep listening!
                 }
             });
@@ -269,15 +303,69 @@ const Tutor = () => {
             return;
         }
 
-        if (res.audio_url) {
-            playResponse(res.audio_url);
+        if (res.type === 'read_stream' && res.payload?.stream_url) {
+            startReading(res.payload.stream_url);
+        } else if (res.audio_url) {
+            playResponse(res.audio_url, res.playback_rate);
         } else {
             if (isContinuousMode) setTimeout(() => startListening(), 500);
             else startWakeListening(); // Go back to waiting for "Start"
         }
     };
 
-    const playResponse = (url) => {
+    const stopReading = () => {
+        if (readerRef.current) {
+            readerRef.current.stop();
+            readerRef.current = null;
+        }
+    };
+
+    const startReading = (streamUrl) => {
+        setVoiceState('SPEAKING');
+        voiceManager.stop();
+
+        const finish = () => {
+            readerRef.current = null;
+            voiceManager.stop();
+            if (isContinuousModeRef.current) setTimeout(() => startListening(), 300);
+            else setVoiceState('IDLE');
+        };
+        const reader = new ReadAloudPlayer({
+            // The page on screen follows the voice
+            onPage: (p, text) => {
+                pageCacheRef.current[p] = text;
+                setPageText(text);
+                setPage(p);
+            },
+            onSentence: () => { readPosRef.current = reader.position; },
+            onEnd: finish,
+            onError: () => {
+                setToast({ message: "Reading aloud is unavailable right now", type: "error" });
+                finish();
+            }
+        });
+        readerRef.current = reader;
+        reader.start(streamUrl);
+
+        // Barge-in: "stop" ends reading; "continue reading" later resumes from readPosRef
+        voiceManager.start(
+            (text) => {
+                const t = text.toLowerCase();
+                if (t.includes("stop") || t.includes("quiet") || t.includes("wait")) {
+                    stopReading();
+                    voiceManager.stop();
+                    setIsContinuousMode(false);
+                    setVoiceState('IDLE');
+                    addMessage('User', "Stop (Barge-in)");
+                }
+            },
+            (err) => { },
+            () => { },
+            true
+        );
+    };
+
+    const playResponse = (url, playbackRate) => {
         setVoiceState('SPEAKING');
 
         // Stop any existing listening to prevent interference during playback setup
@@ -286,6 +374,8 @@ const Tutor = () => {
         try {
             const fullUrl = getAudioUrl(url);
             const audio = new Audio(fullUrl);
+            // Set only when the server can't time-stretch; browsers also keep the pitch when changing the rate
+            if (playbackRate) audio.playbackRate = playbackRate;
             setCurrentAudio(audio);
 
             // Barge-in Listener: Listens JUST for "Stop" or "Wait"
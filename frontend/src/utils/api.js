@@ -29,10 +29,14 @@ export async function sendAction(docId, page, intent, userUtterance, entities =
             page,
             intent,
             user_utterance: userUtterance,
+            include_page_text: true, // navigation replies carry the new page's text
             ...entities
         }),
     });
 
+    // 503 carries a spoken "busy" reply; play it like any other response
+    if (response.status === 503) return response.json();
+
     if (!response.ok) {
         const err = await response.json();
         throw new Error(err.error || "Action failed");
@@ -41,10 +45,15 @@ export async function sendAction(docId, page, intent, userUtterance, entities =
     return response.json();
 }
 
+// Opus/WebM replies are about half the size of the MP3s. Media requests send Accept: */*
+// (and read-aloud streams text/event-stream), so browsers that can play Opus ask for it explicitly.
+const COMPACT_FORMAT = typeof Audio !== "undefined" && new Audio().canPlayType('audio/webm; codecs="opus"') ? "opus" : null;
+
 export function getAudioUrl(filename) {
     if (!filename) return null;
-    if (filename.startsWith("/")) return `${API_BASE}${filename}`;
-    return `${API_BASE}/audio/${filename}`;
+    const url = filename.startsWith("/") ? `${API_BASE}${filename}` : `${API_BASE}/audio/${filename}`;
+    if (!COMPACT_FORMAT || !(url.startsWith(`${API_BASE}/audio/`) || /^[^?]*\/read(\?|$)/.test(url))) return url;
+    return `${url}${url.includes("?") ? "&" : "?"}format=${COMPACT_FORMAT}`;
 }
 
 export async function getTTS(text) {
@@ -60,6 +69,14 @@ export async function getPageContent(docId, pageNum) {
     return response.json();
 }
 
+// Fetches pages first..last (inclusive) in one request. Responses carry an ETag,
+// so the browser revalidates repeat fetches with a cheap 304.
+export async function getPages(docId, first, last) {
+    const response = await fetch(`${API_BASE}/api/doc/${docId}/pages?pages=${first}..${last}`);
+    if (!response.ok) throw new Error("Failed to load pages");
+    return response.json();
+}
+
 export async function getLibrary() {
     const response = await fetch(`${API_BASE}/api/library`);
     if (!response.ok) {
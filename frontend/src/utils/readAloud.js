@@ -0,0 +1,113 @@
+import { getAudioUrl } from './api';
+
+const _decodeBase64 = (b64) => {
+    const bin = atob(b64);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return bytes.buffer;
+};
+
+// Plays a read-aloud stream (GET /api/doc/<id>/read, Server-Sent Events).
+// Sentences are decoded as they arrive and scheduled back to back on one
+// AudioContext clock, so there is no gap between sentences or pages. Page and
+// sentence callbacks fire when that audio actually starts playing, not when it
+// arrives (the server sends a few sentences ahead). EventSource reconnects by
+// itself after a dropped connection and the server resumes after the last
+// sentence received.
+export class ReadAloudPlayer {
+    constructor({ onPage, onSentence, onEnd, onError } = {}) {
+        this.callbacks = { onPage, onSentence, onEnd, onError };
+        this.source = null;
+        this.ctx = null;
+        this.timers = [];
+        this.position = null; // "page:sentence" of the last sentence that started playing
+    }
+
+    get active() {
+        return this.source !== null;
+    }
+
+    start(url) {
+        this.stop();
+        const ctx = new (window.AudioContext || window.webkitAudioContext)();
+        const source = new EventSource(getAudioUrl(url));
+        this.ctx = ctx;
+        this.source = source;
+        let rate = 1;
+        let nextTime = 0;
+        let shownPage = null;
+        const pages = {};
+        // decodeAudioData is async; chaining keeps sentences in order
+        let chain = Promise.resolve();
+        const at = (time, fn) => {
+            const delay = Math.max(0, (time - ctx.currentTime) * 1000);
+            this.timers.push(setTimeout(() => { if (this.ctx === ctx) fn(); }, delay));
+        };
+
+        source.addEventListener('start', (e) => {
+            // Set only when the server can't time-stretch; unlike <audio>, this also shifts the pitch
+            rate = JSON.parse(e.data).playback_rate || 1;
+        });
+        source.addEventListener('page', (e) => {
+            const data = JSON.parse(e.data);
+            pages[data.page] = data.text;
+        });
+        source.addEventListener('sentence', (e) => {
+            const data = JSON.parse(e.data);
+            const pageText = pages[data.page];
+            chain = chain.then(async () => {
+                let buffer = null;
+                if (data.audio) {
+                    try {
+                        buffer = await ctx.decodeAudioData(_decodeBase64(data.audio));
+                    } catch (err) {
+                        console.error("Read-aloud decode failed", err);
+                    }
+                }
+                if (this.ctx !== ctx) return;
+                const startAt = Math.max(nextTime, ctx.currentTime + 0.05);
+                if (buffer) {
+                    const node = ctx.createBufferSource();
+                    node.buffer = buffer;
+                    node.playbackRate.value = rate;
+                    node.connect(ctx.destination);
+                    node.start(startAt);
+                    nextTime = startAt + buffer.duration / rate;
+                } else {
+                    nextTime = startAt + (data.duration || 0); // Keep the page/sentence timing without audio
+                }
+                at(startAt, () => {
+                    if (data.page !== shownPage) {
+                        shownPage = data.page;
+                        if (this.callbacks.onPage) this.callbacks.onPage(data.page, pageText ?? "");
+                    }
+                    this.position = `${data.page}:${data.sentence}`;
+                    if (this.callbacks.onSentence) this.callbacks.onSentence(data);
+                });
+            });
+        });
+        source.addEventListener('end', () => {
+            source.close(); // Otherwise EventSource reconnects
+            chain = chain.then(() => at(nextTime, () => {
+                this.stop();
+                if (this.callbacks.onEnd) this.callbacks.onEnd();
+            }));
+        });
+        source.onerror = () => {
+            // A dropped connection is retried by EventSource; a refused one (e.g. 503 busy) closes it
+            if (source.readyState === EventSource.CLOSED && this.source === source) {
+                this.stop();
+                if (this.callbacks.onError) this.callbacks.onError();
+            }
+        };
+    }
+
+    stop() {
+        if (this.source) this.source.close();
+        this.timers.forEach(clearTimeout);
+        this.timers = [];
+        if (this.ctx) this.ctx.close();
+        this.source = null;
+        this.ctx = null;
+    }
+}
@@ -0,0 +1,36 @@
+"""
+Gunicorn settings for running the web app in production (Linux/macOS):
+
+    gunicorn -c gunicorn.conf.py web_app:app
+
+Sizing comes from config.py (WEB_WORKERS processes x WEB_THREADS threads).
+"""
+import logging
+from config import WEB_HOST, WEB_PORT, WEB_WORKERS, WEB_THREADS, WEB_TIMEOUT, WEB_GRACEFUL_TIMEOUT, STARTUP_WARMUP
+
+bind = f"{WEB_HOST}:{WEB_PORT}"
+workers = WEB_WORKERS
+threads = WEB_THREADS
+worker_class = "gthread"
+timeout = WEB_TIMEOUT
+graceful_timeout = WEB_GRACEFUL_TIMEOUT
+# Import web_app once in the master; when_ready trains the intent classifier and loads heavy
+# modules there so workers share them copy-on-write. Per-process clients are created after
+# fork in post_worker_init
+preload_app = True
+
+def when_ready(server):
+    if STARTUP_WARMUP:
+        from web_app import warm_up
+        # No threads or network clients in the master: they would not survive the fork
+        warm_up(services=False)
+
+def post_worker_init(worker):
+    from web_app import init_services
+    init_services()
+
+def worker_exit(server, worker):
+    # SIGTERM/SIGINT: gunicorn stops accepting, lets in-flight requests finish, then exits the worker here
+    from web_app import shutdown_services
+    shutdown_services()
+    logging.getLogger(__name__).info(f"Worker {worker.pid} exited cleanly.")
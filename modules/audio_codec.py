@@ -0,0 +1,130 @@
+import os
+import uuid
+import shutil
+import logging
+import subprocess
+import numpy as np
+from config import FFMPEG_PATH, OPUS_BITRATE, COMPACT_MP3_BITRATE
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 24000  # gTTS output rate; decoding at it avoids resampling
+
+# MPEG audio Layer III header tables, by version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+_BITRATES_KBPS = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_BITRATES_KBPS[0] = _BITRATES_KBPS[2]
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+class CodecError(RuntimeError):
+    """Raised when ffmpeg is missing or can't decode/encode a file."""
+
+def ffmpeg_binary():
+    """Returns the ffmpeg executable (FFMPEG_PATH or on PATH), or None if it isn't installed."""
+    return shutil.which(FFMPEG_PATH)
+
+def available() -> bool:
+    return ffmpeg_binary() is not None
+
+def _ffmpeg(args, input_bytes=None) -> bytes:
+    binary = ffmpeg_binary()
+    if binary is None:
+        raise CodecError(f"ffmpeg not found (FFMPEG_PATH={FFMPEG_PATH})")
+    proc = subprocess.run([binary, "-hide_banner", "-loglevel", "error", "-y", *args],
+                          input=input_bytes, capture_output=True)
+    if proc.returncode != 0:
+        raise CodecError(proc.stderr.decode(errors="replace").strip() or f"ffmpeg exited with code {proc.returncode}")
+    return proc.stdout
+
+def decode(path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decodes an audio file (MP3, WAV, ...) to mono 16-bit samples at sample_rate."""
+    pcm = _ffmpeg(["-i", path, "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-"])
+    return np.frombuffer(pcm, dtype="<i2")
+
+def encode_mp3(samples: np.ndarray, sample_rate: int, path: str, bitrate: str = "48k"):
+    """Encodes mono 16-bit samples to an MP3 at path (atomically; readers never see a partial file)."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        _ffmpeg(["-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-i", "-", "-f", "mp3", "-b:a", bitrate, tmp_path],
+                np.asarray(samples, dtype="<i2").tobytes())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+# Compact formats: name -> (MIME type, file suffix replacing ".mp3", ffmpeg output options)
+COMPACT_FORMATS = {
+    # Complexity 3 of 10: speech comes out the same size at about half the default's encode time
+    "opus": ("audio/webm", ".webm", ["-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip",
+                                     "-compression_level", "3", "-f", "webm"]),
+    "mp3-low": ("audio/mpeg", "_lo.mp3", ["-c:a", "libmp3lame", "-b:a", COMPACT_MP3_BITRATE, "-f", "mp3"]),
+}
+
+def compact_name(fname: str, fmt: str) -> str:
+    """Cache filename of fname (an MP3) in compact format fmt, e.g. resp_<hex>.webm."""
+    return fname[:-4] + COMPACT_FORMATS[fmt][1]
+
+def transcode(src_path: str, dst_path: str, fmt: str):
+    """Re-encodes audio at src_path as mono compact format fmt at dst_path (atomically)."""
+    tmp_path = f"{dst_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        _ffmpeg(["-i", src_path, "-vn", "-map_metadata", "-1", "-ac", "1", *COMPACT_FORMATS[fmt][2], tmp_path])
+        os.replace(tmp_path, dst_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _id3v2_size(data: bytes, offset: int = 0) -> int:
+    """Length of an ID3v2 tag starting at offset (0 if there is none)."""
+    if data[offset:offset + 3] != b"ID3" or len(data) < offset + 10:
+        return 0
+    size = 0
+    for b in data[offset + 6:offset + 10]:  # Syncsafe integer: 7 bits per byte
+        size = (size << 7) | (b & 0x7F)
+    footer = 10 if data[offset + 5] & 0x10 else 0
+    return 10 + size + footer
+
+def mp3_frames(data: bytes):
+    """
+    Yields (offset, length, samples, sample_rate) for each MPEG Layer III frame
+    in data, skipping ID3v2 tags and any junk between frames. Pure Python; no
+    decoding, so it is cheap enough to run per request.
+    """
+    i = _id3v2_size(data)
+    n = len(data)
+    while i + 4 <= n:
+        b1, b2 = data[i + 1], data[i + 2]
+        version, layer = (b1 >> 3) & 3, (b1 >> 1) & 3
+        bitrate_idx, rate_idx = b2 >> 4, (b2 >> 2) & 3
+        if data[i] != 0xFF or (b1 & 0xE0) != 0xE0 or version == 1 or layer != 1 or bitrate_idx in (0, 15) or rate_idx == 3:
+            tag = _id3v2_size(data, i)
+            i += tag or 1  # Resync
+            continue
+        sample_rate = _SAMPLE_RATES[version][rate_idx]
+        bitrate = _BITRATES_KBPS[version][bitrate_idx] * 1000
+        per_frame = 1152 if version == 3 else 576
+        length = (per_frame // 8) * bitrate // sample_rate + ((b2 >> 1) & 1)
+        if i + length > n:
+            break  # Truncated last frame
+        yield i, length, per_frame, sample_rate
+        i += length
+
+def mp3_duration(data: bytes) -> float:
+    """Playing time of MP3 data in seconds, from its frame headers (0.0 if it has no frames)."""
+    return sum(samples / rate for _, _, samples, rate in mp3_frames(data))
+
+def _is_info_frame(frame: bytes) -> bool:
+    # Xing/Info (LAME) header frames hold the stream's frame count; a joined stream must not keep them
+    return b"Xing" in frame[:64] or b"Info" in frame[:64]
+
+def join_mp3(parts) -> bytes:
+    """Concatenates MP3 byte strings into one stream of their audio frames, dropping tags and header frames."""
+    out = bytearray()
+    for data in parts:
+        for offset, length, _, _ in mp3_frames(data):
+            frame = data[offset:offset + length]
+            if not _is_info_frame(frame):
+                out += frame
+    return bytes(out)
@@ -1,10 +1,18 @@
-import pygame
 import logging
 import os
 from config import TEMP_AUDIO_DIR
 
 logger = logging.getLogger(__name__)
 
+pygame = None  # Imported by the first AudioHandler; loading pygame's SDL bindings is slow
+
+def _load_pygame():
+    global pygame
+    if pygame is None:
+        import pygame as _pygame
+        pygame = _pygame
+    return pygame
+
 class AudioHandler:
     """
     Handles low-level audio operations like playing audio files.
@@ -13,7 +21,7 @@ class AudioHandler:
 
     def __init__(self):
         # Initialize pygame mixer for audio playback
-        pygame.mixer.init()
+        _load_pygame().mixer.init()
         logger.info("AudioHandler initialized with pygame mixer.")
 
     def play_audio_file(self, filepath):
@@ -0,0 +1,102 @@
+import re
+import math
+import threading
+from collections import Counter, deque
+from typing import Iterable, Optional
+from config import MEMORY_TURNS, MEMORY_SUMMARY_CHARS, MEMORY_TURN_CHARS
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset(
+    "a an the and or but if of to in on at for with by from is are was were be been it this that these those "
+    "i you he she we they me my your what which who how why can could would should do does did please".split()
+)
+
+def _terms(text):
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS and len(w) > 2]
+
+def _clip(text, limit):
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+def _first_sentence(text, limit):
+    return _clip(_SENTENCE_END_RE.split(" ".join((text or "").split()), 1)[0], limit)
+
+class ConversationMemory:
+    """
+    Bounded multi-turn context for one chat.
+
+    The last ``max_turns`` turns are kept verbatim (each clipped to
+    ``turn_chars``). Older turns are folded into an extractive summary: their
+    first sentences are appended, and when the summary exceeds
+    ``summary_chars`` the least useful sentence is dropped. Usefulness is
+    scored by how often a sentence's words recur in the conversation, plus
+    recency. render() is therefore bounded no matter how long the chat runs.
+    Safe to share between concurrent requests of one session.
+    """
+
+    def __init__(self, max_turns: int = MEMORY_TURNS, summary_chars: int = MEMORY_SUMMARY_CHARS,
+                 turn_chars: int = MEMORY_TURN_CHARS):
+        self.max_turns = max_turns
+        self.summary_chars = summary_chars
+        self.turn_chars = turn_chars
+        self.turns = deque()
+        self.summary = []  # Extractive summary sentences, oldest first
+        self._term_counts = Counter()
+        self._lock = threading.Lock()
+
+    def add_turn(self, user_text: str, assistant_text: str):
+        with self._lock:
+            self._term_counts.update(_terms(f"{user_text} {assistant_text}"))
+            self.turns.append((_clip(user_text, self.turn_chars), _clip(assistant_text, self.turn_chars)))
+            while len(self.turns) > self.max_turns:
+                self._fold(self.turns.popleft())
+
+    def _fold(self, turn):
+        user_text, assistant_text = turn
+        limit = self.summary_chars // 2
+        if user_text:
+            self.summary.append(f"User asked: {_first_sentence(user_text, limit)}")
+        if assistant_text:
+            self.summary.append(f"Tutor said: {_first_sentence(assistant_text, limit)}")
+        self._compact()
+
+    def _score(self, index, sentence):
+        terms = set(_terms(sentence))
+        topical = sum(math.log1p(self._term_counts[t]) for t in terms) / (1 + len(terms))
+        recency = (index + 1) / len(self.summary)
+        return topical + recency
+
+    def _compact(self):
+        while len(self.summary) > 1 and sum(len(s) + 1 for s in self.summary) > self.summary_chars:
+            # Never drop the newest sentence; it was just added for a reason
+            worst = min(range(len(self.summary) - 1), key=lambda i: self._score(i, self.summary[i]))
+            del self.summary[worst]
+
+    def render(self) -> str:
+        """Returns the context block for a prompt ("" for a new chat)."""
+        lines = []
+        with self._lock:
+            if self.summary:
+                lines.append("Earlier in this conversation: " + " ".join(self.summary))
+            for user_text, assistant_text in self.turns:
+                lines.append(f"User: {user_text}")
+                lines.append(f"Tutor: {assistant_text}")
+        return "\n".join(lines)
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[dict], **kwargs) -> "ConversationMemory":
+        """Rebuilds memory from stored chat messages (oldest first), e.g. after a restart."""
+        memory = cls(**kwargs)
+        pending_user: Optional[str] = None
+        for msg in messages:
+            if msg.get("role") == "user":
+                if pending_user is not None:
+                    memory.add_turn(pending_user, "")
+                pending_user = msg.get("text", "")
+            elif msg.get("role") == "assistant":
+                memory.add_turn(pending_user or "", msg.get("text", ""))
+                pending_user = None
+        if pending_user is not None:
+            memory.add_turn(pending_user, "")
+        return memory
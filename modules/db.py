@@ -1,108 +1,210 @@
-from pymongo import MongoClient
-from bson.objectid import ObjectId
-from datetime import datetime
-from config import MONGO_URI, MONGO_DB_NAME
 import os
-
-_client = MongoClient(MONGO_URI)
-
-def _db():
-    return _client[MONGO_DB_NAME]
-
-def _oid(val):
-    try:
-        return ObjectId(val)
-    except Exception:
-        return None
+import ntpath
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from modules import doc_store
+from config import DB_BACKEND, DB_PATH, MONGO_URI, MONGO_DB_NAME, MESSAGE_BATCH_SIZE, MESSAGE_FLUSH_INTERVAL, MESSAGE_BUFFER_MAX
+
+logger = logging.getLogger(__name__)
+
+# The backend is created on first use so importing this module never opens a connection
+_backend = None
+_backend_lock = threading.Lock()
+
+def _create_backend(kind):
+    if kind == "sqlite":
+        from modules.db_sqlite import SQLiteBackend
+        return SQLiteBackend(DB_PATH)
+    if kind == "mongo":
+        from modules.db_mongo import MongoBackend
+        return MongoBackend(MONGO_URI, MONGO_DB_NAME)
+    raise ValueError(f"Unknown DB_BACKEND '{kind}'. Expected 'mongo' or 'sqlite'.")
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create_backend(DB_BACKEND)
+    return _backend
+
+def close_db():
+    """Flushes buffered messages and closes the active backend (worker shutdown)."""
+    global _backend
+    flush_messages()
+    with _backend_lock:
+        if _backend is not None:
+            _backend.close()
+        _backend = None
+
+def _reset_backend_after_fork():
+    # Mongo sockets and SQLite handles inherited through fork() must not be used by the
+    # child; release the child's copies (see DatabaseBackend.after_fork) and reopen lazily
+    global _backend, _backend_lock
+    inherited, _backend = _backend, None
+    _backend_lock = threading.Lock()
+    if inherited is not None:
+        try:
+            inherited.after_fork()
+        except Exception as e:
+            logger.warning(f"Could not release the database handles inherited through fork: {e}")
+
+def set_backend(backend):
+    """Replaces the active backend (e.g. an SQLiteBackend on a temp file). Pass None to reset."""
+    global _backend
+    with _backend_lock:
+        if _backend is not None and _backend is not backend:
+            _backend.close()
+        _backend = backend
+
+class _MessageWriter:
+    """
+    Write-behind buffer for chat messages.
+
+    Messages are queued in memory and written with one batched insert once
+    MESSAGE_BATCH_SIZE messages are pending or MESSAGE_FLUSH_INTERVAL seconds
+    have passed, whichever comes first. Reads call flush() first so a chat's
+    history always includes its own pending messages. A batch that fails to
+    write goes back to the front of the queue and is retried on the next flush;
+    beyond max_pending buffered messages the oldest are dropped.
+    """
+
+    def __init__(self, batch_size, interval, max_pending):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self._failing = False
+        self._pending = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        # Threads do not survive fork(), so a worker process starts its own flusher
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="db-message-writer", daemon=True)
+            self._thread.start()
+
+    def _after_fork(self):
+        # Messages queued by the parent are the parent's to write; the child starts empty
+        self._pending = []
+        self._failing = False
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def add(self, message):
+        with self._cond:
+            self._pending.append(message)
+            self._ensure_thread()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._pending) >= self.batch_size, timeout=self.interval)
+            self.flush()
+            if self._failing:
+                time.sleep(self.interval)  # The re-queued batch would otherwise be retried in a tight loop
+
+    def flush(self):
+        # _flush_lock keeps batches in insertion order when flush() races the background thread
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                get_backend().add_messages(batch)
+            except Exception as e:
+                # An ordered Mongo insert_many reports how many went in before the error; don't write those twice
+                written = (getattr(e, "details", None) or {}).get("nInserted", 0)
+                with self._cond:
+                    self._pending[:0] = batch[written:]
+                    dropped = len(self._pending) - self.max_pending
+                    if dropped > 0:
+                        del self._pending[:dropped]
+                self._failing = True
+                logger.error(f"Failed to write {len(batch) - written} chat messages, will retry: {e}")
+                if dropped > 0:
+                    logger.error(f"Message buffer full; dropped the {dropped} oldest unwritten chat messages.")
+                return written
+            self._failing = False
+            return len(batch)
+
+_writer = _MessageWriter(MESSAGE_BATCH_SIZE, MESSAGE_FLUSH_INTERVAL, MESSAGE_BUFFER_MAX)
+atexit.register(_writer.flush)
+if hasattr(os, "register_at_fork"):  # POSIX only; Windows servers never fork
+    os.register_at_fork(after_in_child=_reset_backend_after_fork)
+    os.register_at_fork(after_in_child=_writer._after_fork)
+
+def flush_messages():
+    """Writes any buffered chat messages now. Returns the number written."""
+    return _writer.flush()
 
 def init_db():
-    db = _db()
-    db.projects.create_index("name")
-    db.pdfs.create_index("project_id")
-    db.chats.create_index("project_id")
-    db.messages.create_index("chat_id")
+    get_backend().init_db()
 
 def list_projects():
-    db = _db()
-    docs = db.projects.find({}, projection={"name": 1}).sort("_id", -1)
-    return [{"id": str(d["_id"]), "name": d.get("name", "")} for d in docs]
+    return get_backend().list_projects()
 
 def create_project(name):
-    db = _db()
-    db.projects.insert_one({"name": name, "created_at": datetime.utcnow()})
+    return get_backend().create_project(name)
 
 def get_project(pid):
-    db = _db()
-    oid = _oid(pid)
-    if not oid:
-        return None
-    d = db.projects.find_one({"_id": oid}, projection={"name": 1})
-    if not d:
-        return None
-    return {"id": str(d["_id"]), "name": d.get("name", "")}
+    return get_backend().get_project(pid)
 
 def ensure_default_project():
-    db = _db()
-    d = db.projects.find_one({"name": "Default"})
-    if not d:
-        res = db.projects.insert_one({"name": "Default", "created_at": datetime.utcnow()})
-        return str(res.inserted_id)
-    return str(d["_id"])
-
-def list_project_pdfs(project_id):
-    db = _db()
-    docs = db.pdfs.find({"project_id": str(project_id)}, projection={"filename": 1}).sort("_id", -1)
-    return [{"id": str(d["_id"]), "filename": d.get("filename", "")} for d in docs]
+    return get_backend().ensure_default_project()
+
+def list_project_pdfs(project_id, limit=None, before=None):
+    return get_backend().list_project_pdfs(project_id, limit=limit, before=before)
+
+def list_pdfs():
+    return get_backend().list_pdfs()
 
 def add_pdf(project_id, filename, path):
-    db = _db()
-    db.pdfs.insert_one({
-        "project_id": str(project_id),
-        "filename": filename,
-        "path": path,
-        "uploaded_at": datetime.utcnow()
-    })
+    return get_backend().add_pdf(project_id, filename, path)
 
 def get_pdf(pdf_id):
-    db = _db()
-    oid = _oid(pdf_id)
-    if not oid:
-        return None
-    d = db.pdfs.find_one({"_id": oid})
-    if not d:
-        return None
-    return {"id": str(d["_id"]), "project_id": d.get("project_id"), "filename": d.get("filename"), "path": d.get("path")}
+    return get_backend().get_pdf(pdf_id)
 
 def delete_pdf(pdf_id):
-    db = _db()
+    """Deletes a PDF record with its uploaded file and the parsed text stored under the file's name."""
     pdf = get_pdf(pdf_id)
     if not pdf:
         return False
-    if pdf.get("path") and os.path.exists(pdf["path"]):
-        try:
-            os.remove(pdf["path"])
-        except Exception:
-            pass
-    db.pdfs.delete_one({"_id": ObjectId(pdf_id)})
+    if pdf.get("path"):
+        if os.path.exists(pdf["path"]):
+            try:
+                os.remove(pdf["path"])
+            except Exception:
+                pass
+        doc_store.delete(os.path.splitext(ntpath.basename(pdf["path"]))[0])  # PDF_1.pdf -> docs/PDF_1.json
+    get_backend().delete_pdf(pdf_id)
     return True
 
 def create_chat(project_id, title):
-    db = _db()
-    res = db.chats.insert_one({
-        "project_id": str(project_id),
-        "title": title,
-        "created_at": datetime.utcnow()
-    })
-    return str(res.inserted_id)
+    return get_backend().create_chat(project_id, title)
+
+def list_chats(project_id, limit=None, before=None):
+    return get_backend().list_chats(project_id, limit=limit, before=before)
 
-def list_chats(project_id):
-    db = _db()
-    docs = db.chats.find({"project_id": str(project_id)}, projection={"title": 1}).sort("_id", -1)
-    return [{"id": str(d["_id"]), "title": d.get("title", "")} for d in docs]
+def get_chat(chat_id):
+    return get_backend().get_chat(chat_id)
 
 def add_message(chat_id, role, text, audio=None):
-    db = _db()
-    db.messages.insert_one({
+    if MESSAGE_BATCH_SIZE <= 1:
+        get_backend().add_message(chat_id, role, text, audio)
+        return
+    _writer.add({
         "chat_id": str(chat_id),
         "role": role,
         "text": text,
@@ -110,7 +212,12 @@ def add_message(chat_id, role, text, audio=None):
         "created_at": datetime.utcnow()
     })
 
-def list_messages(chat_id):
-    db = _db()
-    docs = db.messages.find({"chat_id": str(chat_id)}, projection={"role": 1, "text": 1, "audio": 1}).sort("_id", 1)
-    return [{"role": d.get("role", ""), "text": d.get("text", ""), "audio": d.get("audio")} for d in docs]
+def list_messages(chat_id, limit=None, before=None):
+    """
+    Returns a chat's messages in chronological order.
+
+    With ``limit`` only the newest ``limit`` messages are returned; pass the
+    ``id`` of the first message as ``before`` to fetch the page preceding it.
+    """
+    flush_messages()
+    return get_backend().list_messages(chat_id, limit=limit, before=before)
@@ -0,0 +1,94 @@
+from abc import ABC, abstractmethod
+
+class DatabaseBackend(ABC):
+    """
+    Interface implemented by every persistence backend used by modules/db.py.
+
+    IDs are always exchanged as strings so callers never depend on the
+    backend's native key type (ObjectId, integer rowid, ...).
+    Lookups with an ID the backend cannot parse return None/False rather than raising.
+
+    Listing methods use keyset pagination: ``limit`` caps the number of rows and
+    ``before`` is the id of the oldest row from the previous page. Rows are
+    fetched newest-first through the (parent, id) index, so any page costs the
+    same no matter how long the history is.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def init_db(self):
+        ...
+
+    def close(self):
+        """Closes every connection the backend has opened."""
+
+    def after_fork(self):
+        """
+        Called in a forked child before it drops the backend it inherited.
+        Releases the child's copies of the parent's handles without disturbing the
+        parent; backends whose cleanup talks to a server leave this a no-op.
+        """
+
+    # --- Projects ---
+    @abstractmethod
+    def list_projects(self):
+        ...
+
+    @abstractmethod
+    def create_project(self, name):
+        ...
+
+    @abstractmethod
+    def get_project(self, pid):
+        ...
+
+    @abstractmethod
+    def ensure_default_project(self):
+        ...
+
+    # --- PDFs ---
+    @abstractmethod
+    def list_project_pdfs(self, project_id, limit=None, before=None):
+        ...
+
+    @abstractmethod
+    def list_pdfs(self):
+        """Returns every PDF record (id, project_id, filename, path) across all projects."""
+
+    @abstractmethod
+    def add_pdf(self, project_id, filename, path):
+        ...
+
+    @abstractmethod
+    def get_pdf(self, pdf_id):
+        ...
+
+    @abstractmethod
+    def delete_pdf(self, pdf_id):
+        """Removes the PDF record only; file cleanup is handled by modules/db.py."""
+
+    # --- Chats ---
+    @abstractmethod
+    def create_chat(self, project_id, title):
+        ...
+
+    @abstractmethod
+    def list_chats(self, project_id, limit=None, before=None):
+        ...
+
+    @abstractmethod
+    def get_chat(self, chat_id):
+        """Returns {"id", "project_id", "title"} or None."""
+
+    @abstractmethod
+    def add_message(self, chat_id, role, text, audio=None):
+        ...
+
+    @abstractmethod
+    def add_messages(self, messages):
+        """Inserts a batch of message dicts (chat_id, role, text, audio, created_at) in order."""
+
+    @abstractmethod
+    def list_messages(self, chat_id, limit=None, before=None):
+        """Returns the newest ``limit`` messages older than ``before``, in chronological order."""
@@ -0,0 +1,139 @@
+from pymongo import MongoClient
+from bson.objectid import ObjectId
+from datetime import datetime
+from modules.db_backend import DatabaseBackend
+
+def _oid(val):
+    try:
+        return ObjectId(val)
+    except Exception:
+        return None
+
+def _page(collection, query, projection, limit, before):
+    """Newest-first keyset page over _id."""
+    if before is not None:
+        oid = _oid(before)
+        if not oid:
+            return []
+        query = dict(query, _id={"$lt": oid})
+    cursor = collection.find(query, projection=projection).sort("_id", -1)
+    if limit:
+        cursor = cursor.limit(int(limit))
+    return list(cursor)
+
+class MongoBackend(DatabaseBackend):
+    name = "mongo"
+
+    def __init__(self, uri, db_name):
+        # MongoClient connects lazily; the first query blocks until a server is selected
+        self._client = MongoClient(uri)
+        self._db_name = db_name
+
+    def _db(self):
+        return self._client[self._db_name]
+
+    def init_db(self):
+        db = self._db()
+        db.projects.create_index("name")
+        db.pdfs.create_index([("project_id", 1), ("_id", -1)])
+        db.chats.create_index([("project_id", 1), ("_id", -1)])
+        db.messages.create_index([("chat_id", 1), ("_id", -1)])
+
+    def close(self):
+        self._client.close()
+
+    def list_projects(self):
+        docs = self._db().projects.find({}, projection={"name": 1}).sort("_id", -1)
+        return [{"id": str(d["_id"]), "name": d.get("name", "")} for d in docs]
+
+    def create_project(self, name):
+        res = self._db().projects.insert_one({"name": name, "created_at": datetime.utcnow()})
+        return str(res.inserted_id)
+
+    def get_project(self, pid):
+        oid = _oid(pid)
+        if not oid:
+            return None
+        d = self._db().projects.find_one({"_id": oid}, projection={"name": 1})
+        if not d:
+            return None
+        return {"id": str(d["_id"]), "name": d.get("name", "")}
+
+    def ensure_default_project(self):
+        db = self._db()
+        d = db.projects.find_one({"name": "Default"})
+        if not d:
+            res = db.projects.insert_one({"name": "Default", "created_at": datetime.utcnow()})
+            return str(res.inserted_id)
+        return str(d["_id"])
+
+    def list_project_pdfs(self, project_id, limit=None, before=None):
+        docs = _page(self._db().pdfs, {"project_id": str(project_id)}, {"filename": 1}, limit, before)
+        return [{"id": str(d["_id"]), "filename": d.get("filename", "")} for d in docs]
+
+    def list_pdfs(self):
+        docs = self._db().pdfs.find({}, projection={"project_id": 1, "filename": 1, "path": 1})
+        return [{"id": str(d["_id"]), "project_id": d.get("project_id"), "filename": d.get("filename"), "path": d.get("path")} for d in docs]
+
+    def add_pdf(self, project_id, filename, path):
+        res = self._db().pdfs.insert_one({
+            "project_id": str(project_id),
+            "filename": filename,
+            "path": path,
+            "uploaded_at": datetime.utcnow()
+        })
+        return str(res.inserted_id)
+
+    def get_pdf(self, pdf_id):
+        oid = _oid(pdf_id)
+        if not oid:
+            return None
+        d = self._db().pdfs.find_one({"_id": oid})
+        if not d:
+            return None
+        return {"id": str(d["_id"]), "project_id": d.get("project_id"), "filename": d.get("filename"), "path": d.get("path")}
+
+    def delete_pdf(self, pdf_id):
+        oid = _oid(pdf_id)
+        if not oid:
+            return False
+        return self._db().pdfs.delete_one({"_id": oid}).deleted_count > 0
+
+    def create_chat(self, project_id, title):
+        res = self._db().chats.insert_one({
+            "project_id": str(project_id),
+            "title": title,
+            "created_at": datetime.utcnow()
+        })
+        return str(res.inserted_id)
+
+    def list_chats(self, project_id, limit=None, before=None):
+        docs = _page(self._db().chats, {"project_id": str(project_id)}, {"title": 1}, limit, before)
+        return [{"id": str(d["_id"]), "title": d.get("title", "")} for d in docs]
+
+    def get_chat(self, chat_id):
+        oid = _oid(chat_id)
+        if not oid:
+            return None
+        d = self._db().chats.find_one({"_id": oid})
+        if not d:
+            return None
+        return {"id": str(d["_id"]), "project_id": d.get("project_id"), "title": d.get("title", "")}
+
+    def add_message(self, chat_id, role, text, audio=None):
+        self._db().messages.insert_one({
+            "chat_id": str(chat_id),
+            "role": role,
+            "text": text,
+            "audio": audio,
+            "created_at": datetime.utcnow()
+        })
+
+    def add_messages(self, messages):
+        if messages:
+            self._db().messages.insert_many([dict(m, chat_id=str(m["chat_id"])) for m in messages], ordered=True)
+
+    def list_messages(self, chat_id, limit=None, before=None):
+        docs = _page(self._db().messages, {"chat_id": str(chat_id)}, {"role": 1, "text": 1, "audio": 1}, limit, before)
+        docs.reverse()
+        return [{"id": str(d["_id"]), "role": d.get("role", ""), "text": d.get("text", ""), "audio": d.get("audio")} for d in docs]
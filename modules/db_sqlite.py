@@ -0,0 +1,194 @@
+import sqlite3
+import threading
+import weakref
+from datetime import datetime
+from modules.db_backend import DatabaseBackend
+
+# Column layout matches the original data/app.db so existing databases keep working
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE IF NOT EXISTS pdfs (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, filename TEXT, path TEXT, uploaded_at TEXT DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE IF NOT EXISTS chats (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, title TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id INTEGER, role TEXT, text TEXT, audio TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP);
+CREATE INDEX IF NOT EXISTS idx_projects_name ON projects (name);
+CREATE INDEX IF NOT EXISTS idx_pdfs_project ON pdfs (project_id, id);
+CREATE INDEX IF NOT EXISTS idx_chats_project ON chats (project_id, id);
+CREATE INDEX IF NOT EXISTS idx_messages_chat ON messages (chat_id, id);
+"""
+
+def _rowid(val):
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return None
+
+def _now():
+    return datetime.utcnow().isoformat(sep=" ", timespec="seconds")
+
+def _keyset(where, params, limit, before):
+    """Appends a newest-first keyset clause (id < before ... LIMIT n) to a WHERE clause."""
+    params = list(params)
+    if before is not None:
+        where += " AND id < ?"
+        params.append(_rowid(before))
+    sql = f"{where} ORDER BY id DESC"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return sql, params
+
+class _Connection(sqlite3.Connection):
+    """sqlite3.Connection that can be weakly referenced (the base type can't)."""
+
+class SQLiteBackend(DatabaseBackend):
+    """Embedded single-file backend; one connection per thread, WAL journal for concurrent readers."""
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self._path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        # Every thread's connection, so close() reaches them all; a thread's connection closes when it exits
+        self._conns = weakref.WeakSet()
+        self._conns_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=10, check_same_thread=False, factory=_Connection)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.add(conn)
+        return conn
+
+    def _write(self, sql, params=()):
+        conn = self._conn()
+        with self._write_lock, conn:
+            return conn.execute(sql, params)
+
+    def _query(self, sql, params=()):
+        return self._conn().execute(sql, params).fetchall()
+
+    def init_db(self):
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._conns_lock:
+            conns, self._conns = list(self._conns), weakref.WeakSet()
+            self._local = threading.local()  # Threads still running open a new connection on next use
+        for conn in conns:
+            conn.close()
+
+    def after_fork(self):
+        # Closing the child's descriptors leaves the parent's connections and file locks alone
+        self._conns_lock = threading.Lock()
+        self.close()
+
+    def list_projects(self):
+        rows = self._query("SELECT id, name FROM projects ORDER BY id DESC")
+        return [{"id": str(r["id"]), "name": r["name"] or ""} for r in rows]
+
+    def create_project(self, name):
+        cur = self._write("INSERT INTO projects (name, created_at) VALUES (?, ?)", (name, _now()))
+        return str(cur.lastrowid)
+
+    def get_project(self, pid):
+        rid = _rowid(pid)
+        if rid is None:
+            return None
+        rows = self._query("SELECT id, name FROM projects WHERE id = ?", (rid,))
+        if not rows:
+            return None
+        return {"id": str(rows[0]["id"]), "name": rows[0]["name"] or ""}
+
+    def ensure_default_project(self):
+        conn = self._conn()
+        with self._write_lock, conn:
+            row = conn.execute("SELECT id FROM projects WHERE name = 'Default' ORDER BY id LIMIT 1").fetchone()
+            if row:
+                return str(row["id"])
+            cur = conn.execute("INSERT INTO projects (name, created_at) VALUES ('Default', ?)", (_now(),))
+            return str(cur.lastrowid)
+
+    def list_project_pdfs(self, project_id, limit=None, before=None):
+        sql, params = _keyset("SELECT id, filename FROM pdfs WHERE project_id = ?", (str(project_id),), limit, before)
+        rows = self._query(sql, params)
+        return [{"id": str(r["id"]), "filename": r["filename"] or ""} for r in rows]
+
+    def list_pdfs(self):
+        rows = self._query("SELECT id, project_id, filename, path FROM pdfs")
+        return [{"id": str(r["id"]), "project_id": str(r["project_id"]), "filename": r["filename"], "path": r["path"]} for r in rows]
+
+    def add_pdf(self, project_id, filename, path):
+        cur = self._write(
+            "INSERT INTO pdfs (project_id, filename, path, uploaded_at) VALUES (?, ?, ?, ?)",
+            (str(project_id), filename, path, _now()),
+        )
+        return str(cur.lastrowid)
+
+    def get_pdf(self, pdf_id):
+        rid = _rowid(pdf_id)
+        if rid is None:
+            return None
+        rows = self._query("SELECT id, project_id, filename, path FROM pdfs WHERE id = ?", (rid,))
+        if not rows:
+            return None
+        r = rows[0]
+        return {"id": str(r["id"]), "project_id": str(r["project_id"]), "filename": r["filename"], "path": r["path"]}
+
+    def delete_pdf(self, pdf_id):
+        rid = _rowid(pdf_id)
+        if rid is None:
+            return False
+        return self._write("DELETE FROM pdfs WHERE id = ?", (rid,)).rowcount > 0
+
+    def create_chat(self, project_id, title):
+        cur = self._write(
+            "INSERT INTO chats (project_id, title, created_at) VALUES (?, ?, ?)",
+            (str(project_id), title, _now()),
+        )
+        return str(cur.lastrowid)
+
+    def list_chats(self, project_id, limit=None, before=None):
+        sql, params = _keyset("SELECT id, title FROM chats WHERE project_id = ?", (str(project_id),), limit, before)
+        rows = self._query(sql, params)
+        return [{"id": str(r["id"]), "title": r["title"] or ""} for r in rows]
+
+    def get_chat(self, chat_id):
+        rid = _rowid(chat_id)
+        if rid is None:
+            return None
+        rows = self._query("SELECT id, project_id, title FROM chats WHERE id = ?", (rid,))
+        if not rows:
+            return None
+        return {"id": str(rows[0]["id"]), "project_id": str(rows[0]["project_id"]), "title": rows[0]["title"] or ""}
+
+    def add_message(self, chat_id, role, text, audio=None):
+        self._write(
+            "INSERT INTO messages (chat_id, role, text, audio, created_at) VALUES (?, ?, ?, ?, ?)",
+            (str(chat_id), role, text, audio, _now()),
+        )
+
+    def add_messages(self, messages):
+        if not messages:
+            return
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.executemany(
+                "INSERT INTO messages (chat_id, role, text, audio, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(str(m["chat_id"]), m["role"], m["text"], m.get("audio"), m["created_at"].isoformat(sep=" ", timespec="seconds"))
+                 for m in messages],
+            )
+
+    def list_messages(self, chat_id, limit=None, before=None):
+        sql, params = _keyset("SELECT id, role, text, audio FROM messages WHERE chat_id = ?", (str(chat_id),), limit, before)
+        rows = self._query(sql, params)
+        rows.reverse()
+        return [{"id": str(r["id"]), "role": r["role"] or "", "text": r["text"] or "", "audio": r["audio"]} for r in rows]
@@ -1,9 +1,13 @@
 import logging
+import threading
 from modules.speech_processor import SpeechProcessor
-from modules.intent_recognizer import IntentRecognizer
+from modules.intent_recognizer import IntentRecognizer, PAGE_INTENTS
+from modules.intent_classifier import load_default_classifier
 from modules.gemini_client import GeminiClient
 from modules.text_processor import get_text_chunk
-from config import TEMP_AUDIO_DIR
+from modules.document import Document
+from modules.tts_tokens import normalize_speed
+from config import TEMP_AUDIO_DIR, INTENT_CLASSIFIER_ENABLED, STARTUP_WARMUP, SPEED_STEP, READ_CLI_PAGES
 import os
 import json
 
@@ -12,16 +16,39 @@ logger = logging.getLogger(__name__)
 class DialogueManager:
     def __init__(self, doc_structure):
         self.sp = SpeechProcessor()
-        self.ir = IntentRecognizer()
-        self.gc = GeminiClient()
-        self.doc_structure = doc_structure
+        # The classifier and Gemini client are built on first use (or by _warm_up() while the welcome plays)
+        self.ir = IntentRecognizer(classifier=load_default_classifier(lazy=True) if INTENT_CLASSIFIER_ENABLED else None)
+        self._gc = None
+        self._gc_lock = threading.Lock()
+        self.document = Document.coerce(doc_structure)
         self.current_page = 0
         self.current_chunk = 0
         self.last_response = ""
+        self.read_next_page = None  # Where "continue reading" picks up after the last window read aloud
         self.session_active = True
 
+    @property
+    def gc(self):
+        if self._gc is None:
+            with self._gc_lock:
+                if self._gc is None:
+                    self._gc = GeminiClient()
+        return self._gc
+
+    def _warm_up(self):
+        try:
+            if self.ir.classifier is not None:
+                self.ir.classifier.warm()
+            self.gc  # The property creates the client
+            logger.info("Warm-up finished.")
+        except Exception as e:
+            # Retried (and reported to the user) when the first command needs it
+            logger.error(f"Warm-up failed: {e}")
+
     def start_conversation(self):
         """Starts the main interaction loop."""
+        if STARTUP_WARMUP:
+            threading.Thread(target=self._warm_up, name="warm-up", daemon=True).start()
         welcome_msg = "Welcome to the AI Voice Tutor. I have loaded your document. You can ask me to summarize, explain, translate, give a quiz, or navigate pages. What would you like to do?"
         self.sp.speak_text(welcome_msg)
         logger.info("Dialogue manager started.")
@@ -60,9 +87,15 @@ class DialogueManager:
             self.sp.speak_text("Stopping the session. Goodbye.")
             return
 
+        # "Summarize page 3": the action applies to the named page, which becomes the current one
+        target_page = entities.get("target_page")
+        if intent in PAGE_INTENTS and target_page is not None and self.document.has_page(target_page):
+            self.current_page = target_page
+            self.current_chunk = 0
+
         # --- Navigation ---
         if intent == "NAVIGATE_NEXT":
-            if self.current_page < len(self.doc_structure) - 1:
+            if self.current_page < len(self.document) - 1:
                 self.current_page += 1
                 self.current_chunk = 0 # Reset chunk index on new page
                 msg = f"Moved to page {self.current_page + 1}. Current chunk index reset to 0."
@@ -81,7 +114,7 @@ class DialogueManager:
                 self.sp.speak_text("You are on the first page.")
         elif intent == "NAVIGATE_PAGE":
             target_page = entities.get("target_page")
-            if target_page is not None and 0 <= target_page < len(self.doc_structure):
+            if target_page is not None and self.document.has_page(target_page):
                 self.current_page = target_page
                 self.current_chunk = 0 # Reset chunk index on new page
                 msg = f"Navigated to page {self.current_page + 1}. Current chunk index reset to 0."
@@ -94,7 +127,7 @@ class DialogueManager:
             target_para = entities.get("target_paragraph")
             # Assuming chunks map roughly to paragraphs or sections
             if target_para is not None:
-                chunks = self.doc_structure.get(self.current_page, [])
+                chunks = self.document.chunks(self.current_page) or ()
                 if 0 <= target_para < len(chunks):
                     self.current_chunk = target_para
                     text_to_read = chunks[self.current_chunk]
@@ -104,9 +137,35 @@ class DialogueManager:
             else:
                 self.sp.speak_text("Please specify which paragraph to read.")
 
+        elif intent == "READ_PAGE":
+            text_to_read = self.document.page_text(self.current_page)
+            if text_to_read and text_to_read.strip():
+                self.sp.speak_text(text_to_read)
+            else:
+                self.sp.speak_text("There is no readable text on this page.")
+
+        elif intent == "READ_ALOUD":
+            # Reads READ_CLI_PAGES pages, then hands the microphone back so the listener can stop or ask something.
+            # The current page follows along; "continue reading" right after picks up at the next unread page.
+            start = self.current_page
+            if target_page is None and self.read_next_page == self.current_page + 1:
+                start = self.read_next_page
+            end = min(start + max(1, READ_CLI_PAGES), len(self.document))
+            for page in range(start, end):
+                self.current_page = page
+                text_to_read = self.document.page_text(page)
+                if text_to_read and text_to_read.strip():
+                    self.sp.speak_text(f"Page {page + 1}. {text_to_read}")
+            if end < len(self.document):
+                self.read_next_page = end
+                self.sp.speak_text(f"Say continue reading for page {end + 1}.")
+            else:
+                self.read_next_page = None
+                self.sp.speak_text("End of document.")
+
         # --- Content Actions ---
         elif intent in ["SUMMARIZE", "EXPLAIN", "TRANSLATE", "QUIZ"]:
-            context_chunk = get_text_chunk(self.doc_structure, self.current_page, self.current_chunk)
+            context_chunk = get_text_chunk(self.document, self.current_page, self.current_chunk)
             if not context_chunk:
                 self.sp.speak_text("No content available on the current page or chunk to process.")
                 return
@@ -147,6 +206,15 @@ class DialogueManager:
                 self.sp.speak_text(self.last_response)
             else:
                 self.sp.speak_text("Nothing to repeat.")
+        elif intent == "SET_SPEED":
+            if entities.get("target_speed") is not None:
+                target = entities["target_speed"]
+            elif entities.get("step"):
+                target = self.sp.speed + entities["step"] * SPEED_STEP
+            else:
+                target = 1.0
+            self.sp.speed = normalize_speed(target) or self.sp.speed
+            self.sp.speak_text("Normal speed." if self.sp.speed == 1.0 else f"Speed set to {self.sp.speed:g} times.")
         elif intent == "UNKNOWN":
             self.sp.speak_text("Sorry, I didn't understand that command. Please try again.")
         else:
@@ -155,8 +223,9 @@ class DialogueManager:
 
 # --- Helper function to clean up temporary audio files ---
 def cleanup_temp_audio():
+    # Only the CLI's own files: the web app's cached replies share this directory (modules.storage_gc expires those)
     for filename in os.listdir(TEMP_AUDIO_DIR):
-        if filename.endswith(".mp3"):
+        if filename.startswith("temp_output_") and filename.endswith(".mp3"):
             file_path = os.path.join(TEMP_AUDIO_DIR, filename)
             try:
                 os.remove(file_path)
@@ -1,19 +1,152 @@
 import os
 import json
 import uuid
-from typing import Dict, Any
-from config import DOCS_DIR
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Optional, Tuple, Union
+from config import DOCS_DIR, DOC_CACHE_MAX_BYTES
+from modules.document import Document
+from modules import metrics
 
-def save(doc_structure: Dict[Any, Any], custom_id: str = None) -> str:
+# In-process LRU of parsed documents: doc_id -> (mtime_ns, size, footprint, doc).
+# Entries are validated against the file's mtime/size on every load so edits made
+# by another process (or worker) are picked up.
+_cache = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def _path(doc_id: str) -> str:
+    return os.path.join(DOCS_DIR, f"{doc_id}.json")
+
+def _evict(doc_id):
+    global _cache_bytes
+    entry = _cache.pop(doc_id, None)
+    if entry:
+        _cache_bytes -= entry[2]
+
+def _put(doc_id, st, doc):
+    global _cache_bytes
+    footprint = doc.footprint()
+    _evict(doc_id)
+    if footprint > DOC_CACHE_MAX_BYTES:
+        return  # Too large to cache without flushing everything else
+    _cache[doc_id] = (st.st_mtime_ns, st.st_size, footprint, doc)
+    _cache_bytes += footprint
+    while _cache_bytes > DOC_CACHE_MAX_BYTES and _cache:
+        oldest = next(iter(_cache))
+        _evict(oldest)
+        _stats["evictions"] += 1
+
+def save(doc_structure: Union[Document, Dict[Any, Any]], custom_id: str = None) -> str:
+    doc = Document.coerce(doc_structure)
     doc_id = custom_id if custom_id else uuid.uuid4().hex
-    path = os.path.join(DOCS_DIR, f"{doc_id}.json")
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(doc_structure, f, ensure_ascii=False)
+    path = _path(doc_id)
+    # Write to a temp file and swap it in so concurrent readers never see a partial file
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(doc.to_dict(), f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    # Write-through so the next load is a cache hit
+    st = os.stat(path)
+    with _lock:
+        _put(doc_id, st, doc)
     return doc_id
 
-def load(doc_id: str) -> Dict[Any, Any]:
-    path = os.path.join(DOCS_DIR, f"{doc_id}.json")
-    if not os.path.exists(path):
-        return {}
+def save_pages(pages: Iterable[Iterable[str]], custom_id: str = None) -> Tuple[str, int]:
+    """
+    Writes pages (each an iterable of chunks) to the store as they are produced,
+    in the same JSON layout as save(), without building the document in memory.
+    Returns (doc_id, page_count). The document is read back on its first load.
+    """
+    doc_id = custom_id if custom_id else uuid.uuid4().hex
+    path = _path(doc_id)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    count = 0
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("{")
+            for chunks in pages:
+                f.write(f'{", " if count else ""}"{count}": ')
+                json.dump([chunks] if isinstance(chunks, str) else list(chunks), f, ensure_ascii=False)
+                count += 1
+            f.write("}")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    with _lock:
+        _evict(doc_id)
+    return doc_id, count
+
+def load(doc_id: str) -> Optional[Document]:
+    """Loads a document, served from the in-process cache when the file is unchanged.
+
+    Returns None if the document does not exist.
+    """
+    path = _path(doc_id)
+    try:
+        st = os.stat(path)
+    except OSError:
+        with _lock:
+            _evict(doc_id)
+        return None
+    with _lock:
+        entry = _cache.get(doc_id)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            _cache.move_to_end(doc_id)
+            _stats["hits"] += 1
+            metrics.DOC_LOADS.inc(source="cache")
+            return entry[3]
+        _stats["misses"] += 1
     with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+        doc = Document.from_structure(json.load(f))
+    metrics.DOC_LOADS.inc(source="disk")
+    metrics.DOC_LOAD_BYTES.inc(st.st_size)
+    with _lock:
+        _put(doc_id, st, doc)
+    return doc
+
+def version(doc_id: str) -> Optional[Tuple[int, int]]:
+    """Returns (mtime_ns, size) of the stored document without loading it, or None if missing.
+
+    Documents are replaced atomically on save, so this changes whenever the content does.
+    """
+    try:
+        st = os.stat(_path(doc_id))
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def delete(doc_id: str) -> int:
+    """Removes a stored document; returns the bytes freed (0 if it didn't exist)."""
+    path = _path(doc_id)
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except FileNotFoundError:
+        size = 0
+    with _lock:
+        _evict(doc_id)
+    return size
+
+def invalidate(doc_id: str = None):
+    """Drops one document (or the whole cache when doc_id is None)."""
+    global _cache_bytes
+    with _lock:
+        if doc_id is None:
+            _cache.clear()
+            _cache_bytes = 0
+        else:
+            _evict(doc_id)
+
+def cache_stats() -> Dict[str, int]:
+    with _lock:
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "evictions": _stats["evictions"],
+            "entries": len(_cache),
+            "bytes": _cache_bytes,
+            "max_bytes": DOC_CACHE_MAX_BYTES,
+        }
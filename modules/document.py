@@ -0,0 +1,74 @@
+import sys
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+
+class Document:
+    """
+    Normalized, read-only view of an extracted PDF.
+
+    Pages are stored in order as tuples of chunks, and the joined text of every
+    page is computed once at construction so request handlers never rebuild it.
+    Accepts both the parser's ``{int: [chunks]}`` output and the
+    ``{"0": [chunks]}`` form produced by a JSON round trip.
+    """
+
+    __slots__ = ("pages", "texts")
+
+    def __init__(self, pages: Iterable[Iterable[str]]):
+        self.pages: Tuple[Tuple[str, ...], ...] = tuple(
+            (chunks,) if isinstance(chunks, str) else tuple(chunks) for chunks in pages
+        )
+        self.texts: Tuple[str, ...] = tuple(" ".join(chunks) for chunks in self.pages)
+
+    @classmethod
+    def from_structure(cls, doc_structure: Dict[Any, Any]) -> "Document":
+        """Builds a Document from a page-number-keyed dict, ordering pages numerically."""
+        if not doc_structure:
+            return cls(())
+        keyed = {int(k): v for k, v in doc_structure.items()}
+        return cls(keyed.get(i, ()) for i in range(max(keyed) + 1))
+
+    @classmethod
+    def coerce(cls, doc) -> "Document":
+        """Returns doc unchanged if it is already a Document, otherwise normalizes it."""
+        if isinstance(doc, cls):
+            return doc
+        if isinstance(doc, dict):
+            return cls.from_structure(doc)
+        return cls(doc or ())
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def has_page(self, page_num: int) -> bool:
+        return 0 <= page_num < len(self.pages)
+
+    def page_text(self, page_num: int) -> Optional[str]:
+        """Returns the full text of a page, or None if the page does not exist."""
+        if not self.has_page(page_num):
+            return None
+        return self.texts[page_num]
+
+    def display_text(self, page_num: int) -> Optional[str]:
+        """Returns a page's chunks one per line, as the page view shows them, or None if the page does not exist."""
+        if not self.has_page(page_num):
+            return None
+        return "\n".join(self.pages[page_num])
+
+    def chunks(self, page_num: int) -> Optional[Tuple[str, ...]]:
+        """Returns the chunks of a page, or None if the page does not exist."""
+        if not self.has_page(page_num):
+            return None
+        return self.pages[page_num]
+
+    def to_dict(self) -> Dict[str, list]:
+        """Serializable form matching the on-disk JSON layout."""
+        return {str(i): list(chunks) for i, chunks in enumerate(self.pages)}
+
+    def footprint(self) -> int:
+        """Approximate in-memory size in bytes (used to bound caches)."""
+        total = sys.getsizeof(self.pages) + sys.getsizeof(self.texts)
+        for chunks, text in zip(self.pages, self.texts):
+            total += sys.getsizeof(chunks) + sys.getsizeof(text)
+            total += sum(sys.getsizeof(c) for c in chunks)
+        return total
@@ -1,19 +1,49 @@
-import google.generativeai as genai
+import json
 import logging
+import time
 from config import GEMINI_API_KEY
+from modules import metrics
+from modules.llm_router import ModelRouter, DeadlineExceeded
 
 logger = logging.getLogger(__name__)
 
+# Relax safety settings to prevent blocking educational content
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+TIMEOUT_MESSAGE = "Sorry, that is taking too long. Please try again in a moment."
+
 class GeminiClient:
     def __init__(self):
+        if not GEMINI_API_KEY:
+            raise ValueError("GEMINI_API_KEY environment variable not set. Please set it before running the application.")
+        # Deferred: the SDK pulls in gRPC and protobuf stubs, over half a second of import time
+        import google.generativeai as genai
         genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-flash-latest')
+        self._genai = genai
+        self._models = {}
+        self.router = ModelRouter(self._send)
         logger.info("Gemini client initialized.")
 
-    def _build_prompt(self, intent, context_text, user_question=None, target_language=None, difficulty="medium"):
+    def _send(self, model_name, prompt, timeout):
+        """One generate request to model_name, abandoned after timeout seconds."""
+        model = self._models.get(model_name)
+        if model is None:
+            model = self._models[model_name] = self._genai.GenerativeModel(model_name)
+        return model.generate_content(prompt, safety_settings=SAFETY_SETTINGS, request_options={"timeout": timeout})
+
+    def stats(self):
+        return self.router.stats()
+
+    def _build_prompt(self, intent, context_text, user_question=None, target_language=None, difficulty="medium", history=None):
         """Builds a specific prompt for the Gemini model based on intent."""
         
         system_instruction = "You are an AI Voice Tutor. Your goal is to explain things directly, simply, and briefly. Keep answers short (2-3 sentences max) unless asked otherwise. Use simple vocabulary. Do not use markdown."
+        if history:
+            system_instruction += f"\nCONVERSATION SO FAR (use it to resolve follow-ups like 'that' or 'more simply'):\n{history}"
         
         if intent == "SUMMARIZE":
             return f"""
@@ -63,54 +93,94 @@ class GeminiClient:
              USER REQUEST: The user has a command related to this content: {intent}. Respond appropriately.
              """
 
-    def generate_response(self, intent, context_text, user_question=None, target_language=None, difficulty="medium"):
-        """Generates a response from Gemini based on the intent and context."""
-        try:
-            prompt = self._build_prompt(intent, context_text, user_question, target_language, difficulty)
-            logger.debug(f"Sending prompt to Gemini: {prompt[:100]}...") 
+    def generate_response(self, intent, context_text, user_question=None, target_language=None, difficulty="medium", history=None):
+        """Generates a response from Gemini based on the intent and context.
 
-            # Relax safety settings to prevent blocking educational content
-            safety_settings = [
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-            ]
+        history is an optional rendered ConversationMemory for multi-turn follow-ups.
+        """
+        try:
+            prompt = self._build_prompt(intent, context_text, user_question, target_language, difficulty, history)
+            model_name = self.router.route(intent, len(context_text or ""))
+            logger.debug(f"Sending prompt to {model_name}: {prompt[:100]}...")
+            # One deadline covers the whole call, 429 retries included
+            deadline = time.monotonic() + self.router.deadline
 
             # Retry logic for 429 errors
-            import time
             max_retries = 3
             base_delay = 2
 
             for attempt in range(max_retries):
                 try:
-                    response = self.model.generate_content(prompt, safety_settings=safety_settings)
+                    with metrics.stage("gemini"):
+                        response = self.router.call(model_name, prompt, deadline)
                     
                     # Safe access to text
                     if response.candidates and response.candidates[0].content.parts:
                         generated_text = response.text
-                        logger.info(f"Gemini response received for intent '{intent}'.")
+                        logger.info(f"Gemini response received for intent '{intent}' from {model_name}.")
+                        metrics.GEMINI_CALLS.inc(intent=intent, outcome="ok")
                         return generated_text
                     else:
                          # If empty but NO exception, it might be safety blocked. Don't retry this loop.
+                         metrics.GEMINI_CALLS.inc(intent=intent, outcome="blocked")
                          logger.warning(f"Gemini returned no text. Finish reason: {response.candidates[0].finish_reason if response.candidates else 'Unknown'}")
                          return "I couldn't generate a response. The content might be flagged or empty."
 
                 except Exception as e:
                     if "429" in str(e):
-                        if attempt < max_retries - 1:
-                            wait_time = base_delay * (2 ** attempt)
+                        metrics.GEMINI_RATE_LIMITED.inc()
+                        wait_time = base_delay * (2 ** attempt)
+                        if attempt < max_retries - 1 and time.monotonic() + wait_time < deadline:
                             logger.warning(f"Gemini 429 Rate Limit. Retrying in {wait_time}s... (Attempt {attempt + 1}/{max_retries})")
-                            time.sleep(wait_time)
+                            metrics.GEMINI_RETRIES.inc()
+                            with metrics.stage("gemini_backoff"):
+                                time.sleep(wait_time)
                             continue
                         else:
                             logger.error("Gemini 429 Rate Limit persisted after retries.")
+                            metrics.GEMINI_CALLS.inc(intent=intent, outcome="rate_limited")
                             return "I'm currently overwhelmed with requests. Please wait a moment and try again."
                     else:
                         raise e # Re-raise other errors to be caught by outer block or just break
 
         except Exception as e:
+            if isinstance(e, DeadlineExceeded) or _is_sdk_timeout(e):
+                logger.error(f"Gemini call for intent '{intent}' timed out after {self.router.deadline:g}s.")
+                metrics.GEMINI_CALLS.inc(intent=intent, outcome="timeout")
+                return TIMEOUT_MESSAGE
             logger.error(f"Error generating response from Gemini: {e}")
+            metrics.GEMINI_CALLS.inc(intent=intent, outcome="error")
             if "429" in str(e): # Fallback if retry loop failed
                 return "I'm currently overwhelmed with requests. Please wait a moment and try again."
             return f"Sorry, I encountered an error: {e}"
+
+def _is_sdk_timeout(e):
+    """True for the SDK's own DeadlineExceeded, raised when request_options' timeout runs out before the router's deadline."""
+    try:
+        from google.api_core.exceptions import DeadlineExceeded as SDKDeadlineExceeded
+    except ImportError:
+        return False
+    return isinstance(e, SDKDeadlineExceeded)
+
+class StubGeminiClient:
+    """
+    Offline stand-in for GeminiClient used for load testing.
+
+    Sleeps for ``latency`` seconds to mimic the network round trip and returns
+    canned text (valid quiz JSON for QUIZ).
+    """
+
+    def __init__(self, latency=0.5):
+        self.latency = latency
+        logger.info(f"Stub Gemini client initialized ({latency}s latency).")
+
+    def stats(self):
+        return {"stub_latency": self.latency}
+
+    def generate_response(self, intent, context_text, user_question=None, target_language=None, difficulty="medium", history=None):
+        with metrics.stage("gemini"):
+            time.sleep(self.latency)
+        metrics.GEMINI_CALLS.inc(intent=intent, outcome="ok")
+        if intent == "QUIZ":
+            return json.dumps([{"question": "What is this page about?", "options": ["a", "b", "c", "d"], "answer": "a"}])
+        return f"Stub {intent.lower()} response for {len(context_text or '')} characters of context."
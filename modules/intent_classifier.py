@@ -0,0 +1,138 @@
+import json
+import logging
+import math
+import os
+import threading
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; without it the classifier stays disabled
+    np = None
+
+logger = logging.getLogger(__name__)
+
+PHRASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_phrases.json")
+
+# Label for open questions and small talk, which should still go to the LLM
+QUESTION_LABEL = "QUESTION"
+# Intents whose handlers call Gemini; everything else is answered locally
+LLM_INTENTS = {"SUMMARIZE", "EXPLAIN", "EXPLAIN_LINE", "TRANSLATE", "QUIZ"}
+
+def _char_ngrams(text, n_min=2, n_max=4):
+    padded = f" {' '.join(text.lower().split())} "
+    return [padded[i:i + n] for n in range(n_min, n_max + 1) for i in range(len(padded) - n + 1)]
+
+class IntentClassifier:
+    """
+    Offline second-stage intent classifier for paraphrased commands.
+
+    TF-IDF over character 2-4 grams feeds a multinomial logistic regression
+    trained with NumPy on the bundled phrase corpus (intent_phrases.json) when
+    the classifier is constructed (well under a second). The corpus
+    includes a QUESTION class so open questions are recognized as such rather
+    than forced onto the nearest command.
+    """
+
+    def __init__(self, phrases_path=PHRASES_PATH, epochs=150, learning_rate=8.0, l2=1e-4):
+        if np is None:
+            raise ImportError("numpy is required for IntentClassifier")
+        with open(phrases_path, "r", encoding="utf-8") as f:
+            corpus = json.load(f)
+        self.labels = sorted(corpus)
+        texts = [t for label in self.labels for t in corpus[label]]
+        y = np.array([i for i, label in enumerate(self.labels) for _ in corpus[label]])
+
+        doc_freq = Counter(g for t in texts for g in set(_char_ngrams(t)))
+        self.vocab = {g: i for i, g in enumerate(sorted(doc_freq))}
+        n_docs = len(texts)
+        self.idf = np.array([math.log((1 + n_docs) / (1 + doc_freq[g])) + 1.0 for g in sorted(doc_freq)])
+
+        X = np.vstack([self._vectorize(t) for t in texts])
+        self.W, self.b = self._train(X, y, epochs, learning_rate, l2)
+        logger.info(f"Intent classifier trained on {n_docs} phrases, {len(self.vocab)} features, {len(self.labels)} classes.")
+
+    def _vectorize(self, text):
+        vec = np.zeros(len(self.vocab))
+        for g, count in Counter(_char_ngrams(text)).items():
+            idx = self.vocab.get(g)
+            if idx is not None:
+                vec[idx] = 1.0 + math.log(count)  # Sublinear tf
+        vec *= self.idf
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _train(self, X, y, epochs, learning_rate, l2):
+        n, d = X.shape
+        k = len(self.labels)
+        W = np.zeros((d, k))
+        b = np.zeros(k)
+        Y = np.eye(k)[y]
+        for _ in range(epochs):
+            probs = self._softmax(X @ W + b)
+            grad = probs - Y
+            W -= learning_rate * (X.T @ grad / n + l2 * W)
+            b -= learning_rate * grad.mean(axis=0)
+        return W, b
+
+    @staticmethod
+    def _softmax(z):
+        z = z - z.max(axis=-1, keepdims=True)
+        e = np.exp(z)
+        return e / e.sum(axis=-1, keepdims=True)
+
+    def predict(self, text):
+        """Returns (label, probability) for the most likely class."""
+        x = self._vectorize(text)
+        if not x.any():
+            return QUESTION_LABEL, 0.0
+        probs = self._softmax(x @ self.W + self.b)
+        best = int(probs.argmax())
+        return self.labels[best], float(probs[best])
+
+class LazyClassifier:
+    """
+    Stands in for IntentClassifier and trains it on the first predict().
+
+    Training takes a few hundred milliseconds, so entry points build this
+    instead and call warm() from a background thread, keeping the cost out of
+    startup. If training fails every prediction is a zero-confidence QUESTION,
+    which the recognizer treats as "no match".
+    """
+
+    def __init__(self, factory=IntentClassifier):
+        self._factory = factory
+        self._model = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def warm(self):
+        """Trains the classifier now if it hasn't been; returns it (None if training failed)."""
+        if self._model is None and not self._failed:
+            with self._lock:
+                if self._model is None and not self._failed:
+                    try:
+                        self._model = self._factory()
+                    except Exception as e:
+                        logger.error(f"Failed to build intent classifier: {e}")
+                        self._failed = True
+        return self._model
+
+    def predict(self, text):
+        model = self.warm()
+        if model is None:
+            return QUESTION_LABEL, 0.0
+        return model.predict(text)
+
+def load_default_classifier(lazy=False):
+    """Builds the bundled classifier (deferred to first use if lazy), or returns None if numpy is unavailable."""
+    if np is None:
+        logger.warning("numpy not installed; local intent classifier disabled.")
+        return None
+    if lazy:
+        return LazyClassifier()
+    try:
+        return IntentClassifier()
+    except Exception as e:
+        logger.error(f"Failed to build intent classifier: {e}")
+        return None
@@ -1,86 +1,213 @@
 import re
 import logging
+import threading
+from functools import lru_cache
+from config import INTENT_CACHE_SIZE, INTENT_CLASSIFIER_MIN_CONFIDENCE
+from modules.intent_classifier import QUESTION_LABEL, LLM_INTENTS
 
 logger = logging.getLogger(__name__)
 
+# Single-word commands ("next", "stop", "slower") only count as commands when the utterance
+# is the command: they may follow filler like "okay" / "please" and be followed by "please",
+# but "what is the next step" or "I feel slower today" are not commands.
+_LEAD = r"^(?:(?:ok(?:ay)?|please|now|just|and|so|then|hey|um|uh),? )*"
+_END = r"(?: please| now)?[.!?]*$"
+# Question openers at the start of an utterance ("what is", "can you explain")
+_ASK = _LEAD + r"(?:(?:can|could|would|will) you (?:please )?)?"
+
+# (intent, priority, patterns). All patterns are compiled into one alternation and
+# matched in a single scan. When several intents match, the highest priority wins;
+# among equal priorities the longest match (the most specific phrase) wins.
+# A pattern may capture one slot as (?P<value>...).
+INTENT_RULES = [
+    ("EXPLAIN_LINE", 90, [r"explain line (?P<value>\d+)", r"explain sentence (?P<value>\d+)", r"detail line (?P<value>\d+)"]),
+    ("NAVIGATE_PAGE", 80, [r"(?:go|jump|skip|turn|move) to page (?P<value>\d+)", r"read page (?P<value>\d+)", r"open page (?P<value>\d+)",
+                           r"what(?:'s| is) on page (?P<value>\d+)", r"tell me about page (?P<value>\d+)"]),
+    # "Read from page 5" starts reading aloud there; above NAVIGATE_PAGE, which would only turn the page
+    ("READ_ALOUD", 85, [r"(?:(?:continue|keep|resume|start) )?read(?:ing)? (?:on )?(?:from|at) page (?P<value>\d+)"]),
+    ("SET_SPEED", 75, [r"(?:set |change )?(?:the )?(?:playback |reading |speaking )?(?:speed|rate) (?:to )?(?P<value>\d+(?:\.\d+)?)",
+                       r"(?:read|speak|talk|play)(?: it)? at (?P<value>\d+(?:\.\d+)?) ?(?:x|times)",
+                       r"(?P<value>\d+(?:\.\d+)?) ?(?:x|times) speed", r"normal speed", r"reset (?:the )?speed",
+                       r"(?:speak|talk) (?:a (?:bit|little) )?(?:faster|slower|more slowly)", r"speed up"]),
+    ("READ_PARAGRAPH", 80, [r"read paragraph (?P<value>\d+)", r"paragraph (?P<value>\d+)"]),
+    ("REPEAT", 70, [r"repeat that", r"say (?:that |it |this )?again", _LEAD + r"repeat", r"repeat" + _END,
+                    r"(?:say|read|repeat) (?:that |it |this )?(?:again )?(?:a (?:bit|little) )?(?:slower|more slowly|faster)",
+                    _LEAD + r"slow(?:er)? down", _LEAD + r"(?:a (?:bit|little) )?(?:slower|faster)" + _END]),
+    # Continuous reading across pages; above SUMMARIZE/READ_PAGE so "read the whole document" isn't a summary
+    ("READ_ALOUD", 65, [r"read from here", r"(?:continue|keep|resume|start) reading", r"read on",
+                        r"read (?:the )?(?:whole|entire|rest of the) (?:document|book|pdf|file)", r"read (?:everything|it all)"]),
+    ("SUMMARIZE", 60, [r"summari[sz]e", r"summary of", r"what is the summary"]),
+    ("TRANSLATE", 60, [r"translate", r"translation", r"change language", r"speak in", r"convert to"]),
+    ("READ_PAGE", 60, [r"read (?:this |the )?(?:current )?page", r"read (?:it|this) (?:out|aloud)", r"read aloud"]),
+    # An utterance that opens with a question is a question, even about "the next step" or "the stop codon"
+    ("EXPLAIN", 58, [_ASK + r"(?:explain|what is|what's|what does|define|describe|tell me about|meaning of)"]),
+    ("QUIZ", 55, [r"quiz(?:zes)?", r"test me", r"ask me", r"(?:give|make) me (?:a |an |some )?(?:\w+ )?questions",
+                  _LEAD + r"questions?" + _END]),
+    ("NAVIGATE_NEXT", 50, [r"next page", r"go to (?:the )?next", _LEAD + r"(?:go |move |skip )?(?:to )?(?:the )?next(?: one)?" + _END]),
+    ("NAVIGATE_PREV", 50, [r"previous page", r"go to (?:the )?previous", r"(?:go|take me|turn|move) back", r"back a page",
+                           _LEAD + r"back" + _END, _LEAD + r"previous(?: one)?" + _END]),
+    ("STOP", 45, [_LEAD + r"(?:stop|exit|quit)", r"end (?:the )?session", r"(?:i want|i'd like|let's|let us) (?:to )?(?:stop|quit|exit)"]),
+    ("HELP", 40, [r"what can you do", r"(?:what are )?your capabilities", r"(?:list|show|what are)(?: me)?(?: the| your)? commands",
+                  _LEAD + r"(?:i need |i want )?help(?: me)?" + _END]),
+    ("EXPLAIN", 30, [r"explain", r"what is", r"what does", r"define", r"describe", r"tell me about", r"meaning of"]),
+    # A bare page number only navigates when no action matched; "summarize page 3" is a summary of page 3
+    ("NAVIGATE_PAGE", 25, [r"page (?P<value>\d+)"]),
+    # Above the content intents so "load the quiz notes" opens a document; "open the next page" / "open page 7" stay navigation
+    ("OPEN_DOCUMENT", 85, [r"(?:open|load|switch to) (?!(?:the )?(?:next|previous|last|first|page|a|an|this|that|it)\b)(?:the )?(?P<value>.+)"]),
+]
+
+# Intents that act on a page; "<action> page N" carries the page as target_page (0-indexed)
+PAGE_INTENTS = frozenset({"SUMMARIZE", "EXPLAIN", "TRANSLATE", "QUIZ", "READ_PAGE", "READ_ALOUD"})
+
+_LANGUAGE_RE = re.compile(r"(?:to|in|into)\s+(\w+)")
+_PAGE_RE = re.compile(r"\bpage (\d+)")
+
+def _compile_rules(rules):
+    """
+    Builds one regex for all rules.
+
+    Each pattern becomes a named group ``r<k>`` inside a zero-width lookahead, so
+    ``finditer`` reports a match at every word start where any pattern matches
+    instead of letting an earlier, lower-priority match swallow a later one.
+    Patterns always begin at a word start and end at a word end, so "back" fires
+    neither inside "feedback" nor inside "backpropagation"; inflections a command
+    accepts ("questions") are spelled out in its pattern. The fallback classifier
+    scores character n-grams and is kept off such words by the near-misses in
+    the QUESTION class of intent_phrases.json.
+    """
+    alternatives = []
+    table = {}
+    k = 0
+    for intent, priority, patterns in rules:
+        # Longer patterns first so the most specific phrase wins at a given position
+        for pattern in sorted(patterns, key=len, reverse=True):
+            body = pattern.replace("(?P<value>", f"(?P<v{k}>")
+            alternatives.append(f"(?P<r{k}>{body}(?!\\w))")
+            table[f"r{k}"] = (intent, priority, f"v{k}" if body != pattern else None)
+            k += 1
+    # Order alternatives by priority so the leftmost-first rule prefers higher priorities
+    order = sorted(range(k), key=lambda i: -table[f"r{i}"][1])
+    combined = r"\b(?=\w)(?=(?:" + "|".join(alternatives[i] for i in order) + "))"
+    return re.compile(combined), table
+
 class IntentRecognizer:
-    def __init__(self):
-        self.intents = {
-            "SUMMARIZE": [r"summarize", r"summary of", r"what is the summary"],
-            "EXPLAIN": [r"explain", r"what is", r"what does", r"define", r"describe", r"tell me about", r"meaning of"],
-            "TRANSLATE": [r"translate", r"translation", r"change language", r"speak in", r"convert to"],
-            "EXPLAIN_LINE": [r"explain line (\d+)", r"explain sentence (\d+)", r"detail line (\d+)"],
-            "QUIZ": [r"quiz", r"question", r"test me", r"ask me"],
-            "NAVIGATE_NEXT": [r"next page", r"go to next", r"next"],
-            "NAVIGATE_PREV": [r"previous page", r"go to previous", r"back", r"previous"],
-            "NAVIGATE_PAGE": [r"go to page (\d+)", r"read page (\d+)", r"page (\d+)"],
-            "READ_PARAGRAPH": [r"read paragraph (\d+)", r"paragraph (\d+)"],
-            "REPEAT": [r"repeat", r"say again", r"repeat that"],
-            "STOP": [r"stop", r"exit", r"quit", r"end session"],
-            "HELP": [r"help", r"what can you do", r"capabilities", r"commands"]
-        }
+    """
+    Maps utterances to intents with the compiled pattern matcher, falling back to
+    an optional IntentClassifier for paraphrases the patterns miss ("flip forward",
+    "sum it up"). Only classifier predictions above min_confidence are used;
+    anything else stays UNKNOWN and is answered by the LLM.
+    """
+
+    def __init__(self, cache_size=INTENT_CACHE_SIZE, classifier=None, min_confidence=INTENT_CLASSIFIER_MIN_CONFIDENCE):
+        self.intents = {}
+        for intent, _, patterns in INTENT_RULES:
+            self.intents.setdefault(intent, []).extend(patterns)
+        self._matcher, self._rules = _compile_rules(INTENT_RULES)
+        self.classifier = classifier
+        self.min_confidence = min_confidence
+        self.stats = {"recognized": 0, "classified": 0, "llm_calls_avoided": 0, "unknown": 0}
+        self._stats_lock = threading.Lock()
+        # Voice users repeat a small set of commands, so recent utterances are memoized
+        self._cached_match = lru_cache(maxsize=cache_size)(self._match)
+
+    def _match(self, command_text_lower):
+        intent, entities = self._match_patterns(command_text_lower)
+        if intent != "UNKNOWN" or self.classifier is None:
+            return intent, entities, "patterns"
+        label, confidence = self.classifier.predict(command_text_lower)
+        if label == QUESTION_LABEL or confidence < self.min_confidence:
+            return "UNKNOWN", (), "patterns"
+        logger.info(f"Classifier mapped '{command_text_lower}' to {label} ({confidence:.2f}).")
+        return label, tuple(self._extract_entities(label, None, command_text_lower).items()), "classifier"
+
+    def _match_patterns(self, command_text_lower):
+        best = None
+        for m in self._matcher.finditer(command_text_lower):
+            group = m.lastgroup
+            intent, priority, value_group = self._rules[group]
+            start, end = m.span(group)
+            rank = (priority, end - start, -start)
+            if best is None or rank > best[0]:
+                best = (rank, intent, m.group(value_group) if value_group else None)
+        if best is None:
+            return "UNKNOWN", ()
+        _, intent, value = best
+        return intent, tuple(self._extract_entities(intent, value, command_text_lower).items())
+
+    def _extract_entities(self, intent, value, command_text_lower):
+        entities = {}
+        if intent in ("NAVIGATE_PAGE", "READ_ALOUD") and value:
+            entities["target_page"] = int(value) - 1 # Convert to 0-indexed
+
+        elif intent == "EXPLAIN_LINE" and value:
+            entities["target_line"] = int(value) - 1
+
+        elif intent == "READ_PARAGRAPH" and value:
+            entities["target_paragraph"] = int(value) - 1 # Convert to 0-indexed
+
+        elif intent == "TRANSLATE":
+            # Dynamic language extraction from the original command
+            lang_match = _LANGUAGE_RE.search(command_text_lower)
+            entities["target_language"] = lang_match.group(1).capitalize() if lang_match else "English"
+
+        elif intent == "OPEN_DOCUMENT" and value:
+            # "open phravin", "load phravin pdf"
+            # "open pdf" names no document; the handler asks which one
+            filename = value.replace("pdf", "").strip()
+            if filename:
+                entities["filename"] = filename
+
+        elif intent == "REPEAT":
+            # "say it slower" / "faster": replay at a different speed
+            if "slow" in command_text_lower:
+                entities["rate"] = "slow"
+            elif "fast" in command_text_lower:
+                entities["rate"] = "fast"
+
+        elif intent == "SET_SPEED":
+            # "speed 1.5" sets it; "speak faster" / "slower" step it; "normal speed" resets it
+            if value:
+                entities["target_speed"] = float(value)
+            elif "fast" in command_text_lower or "speed up" in command_text_lower:
+                entities["step"] = 1
+            elif "slow" in command_text_lower:
+                entities["step"] = -1
+
+        elif intent == "QUIZ":
+            if "hard" in command_text_lower:
+                entities["difficulty"] = "hard"
+            elif "easy" in command_text_lower:
+                entities["difficulty"] = "easy"
+            else:
+                entities["difficulty"] = "medium"
+
+        if intent in PAGE_INTENTS and "target_page" not in entities:
+            page_match = _PAGE_RE.search(command_text_lower)
+            if page_match and int(page_match.group(1)) > 0:
+                entities["target_page"] = int(page_match.group(1)) - 1
+        return entities
 
     def recognize_intent(self, command_text):
         """Recognizes the intent and extracts entities from the command text."""
         command_text_lower = command_text.lower().strip()
         if not command_text_lower:
             return {"intent": "UNKNOWN", "entities": {}}
-        
-        logger.info(f"Recognizing intent for: '{command_text_lower}'")
 
-        for intent, patterns in self.intents.items():
-            for pattern in patterns:
-                match = re.search(pattern, command_text_lower)
-                if match:
-                    entities = {}
-                    
-                    if intent == "NAVIGATE_PAGE":
-                        try:
-                            page_num = int(match.group(1))
-                            entities["target_page"] = page_num - 1 # Convert to 0-indexed
-                        except (IndexError, ValueError):
-                            pass # Or fallback
-                    
-                    elif intent == "EXPLAIN_LINE":
-                         try:
-                            line_num = int(match.group(1))
-                            entities["target_line"] = line_num - 1
-                         except:
-                             pass
-
-                    elif intent == "TRANSLATE":
-                        # Dynamic language extraction using regex from the original command
-                        lang_match = re.search(r"(?:to|in|into)\s+(\w+)", command_text_lower)
-                        if lang_match:
-                            entities["target_language"] = lang_match.group(1).capitalize()
-                        else:
-                            entities["target_language"] = "English"
-
-                    elif intent == "OPEN_DOCUMENT":
-                        # Capture filename: "open phravin", "load phravin pdf"
-                        # Regex to capture everything after open/load/switch to
-                        name_match = re.search(r"(?:open|load|switch to|read)\s+(?:the\s+)?(.+)", command_text_lower)
-                        if name_match:
-                            raw_name = name_match.group(1).replace("pdf", "").strip()
-                            entities["filename"] = raw_name
-
-                    elif intent == "READ_PARAGRAPH":
-                        try:
-                            para_num = int(match.group(1))
-                            entities["target_paragraph"] = para_num - 1 # Convert to 0-indexed
-                        except:
-                            pass
-                            
-                    elif intent == "QUIZ":
-                        if "hard" in command_text_lower:
-                            entities["difficulty"] = "hard"
-                        elif "easy" in command_text_lower:
-                            entities["difficulty"] = "easy"
-                        else:
-                            entities["difficulty"] = "medium"
-
-                    logger.info(f"Recognized intent: {intent}, Entities: {entities}")
-                    return {"intent": intent, "entities": entities}
-
-        logger.info("Intent not recognized, defaulting to UNKNOWN.")
-        return {"intent": "UNKNOWN", "entities": {}}
\ No newline at end of file
+        logger.info(f"Recognizing intent for: '{command_text_lower}'")
+        intent, entities, source = self._cached_match(command_text_lower)
+        with self._stats_lock:
+            if intent == "UNKNOWN":
+                self.stats["unknown"] += 1
+            elif source == "classifier":
+                self.stats["classified"] += 1
+                # Without the classifier this utterance would have gone to Gemini as EXPLAIN
+                if intent not in LLM_INTENTS:
+                    self.stats["llm_calls_avoided"] += 1
+            else:
+                self.stats["recognized"] += 1
+        if intent == "UNKNOWN":
+            logger.info("Intent not recognized, defaulting to UNKNOWN.")
+        else:
+            logger.info(f"Recognized intent: {intent}, Entities: {dict(entities)}")
+        # Fresh dict per call: cached results are shared and must stay immutable
+        return {"intent": intent, "entities": dict(entities)}
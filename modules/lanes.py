@@ -0,0 +1,107 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from modules import metrics
+
+logger = logging.getLogger(__name__)
+
+class LaneBusy(Exception):
+    """Raised when a lane refuses work because its queue or the client's share is full."""
+
+    def __init__(self, lane, reason):
+        super().__init__(f"{lane} lane busy ({reason})")
+        self.lane = lane
+        self.reason = reason
+
+class Lane:
+    """
+    Bounded execution lane for one cost class of work (e.g. LLM calls).
+
+    At most ``workers`` calls run at once and at most ``queue_size`` more wait;
+    each client may hold at most ``per_client`` of those slots. Work beyond
+    that is refused immediately with LaneBusy instead of queueing, so expensive
+    requests can't pile up and hold every server thread while cheap commands
+    (navigation, stop) wait behind them. ``workers=0`` disables the lane: calls
+    run inline on the caller's thread without admission control.
+    """
+
+    def __init__(self, name, workers, queue_size, per_client, timeout=None):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self.per_client = per_client
+        self.timeout = timeout
+        self._executor = None
+        self._in_use = 0
+        self._by_client = {}
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Pool threads and slot counts belong to the parent
+        self._executor = None
+        self._in_use = 0
+        self._by_client = {}
+        self._lock = threading.Lock()
+
+    def _admit(self, client_id):
+        with self._lock:
+            if self._in_use >= self.workers + self.queue_size:
+                reason = "queue full"
+            elif self._by_client.get(client_id, 0) >= self.per_client:
+                reason = "client limit"
+            else:
+                self._in_use += 1
+                self._by_client[client_id] = self._by_client.get(client_id, 0) + 1
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"lane-{self.name}")
+                return self._executor
+        metrics.LANE_REJECTED.inc(lane=self.name, reason=reason)
+        logger.warning(f"Rejected work for client {client_id}: {self.name} lane {reason}.")
+        raise LaneBusy(self.name, reason)
+
+    def _release(self, client_id):
+        with self._lock:
+            self._in_use -= 1
+            left = self._by_client.get(client_id, 1) - 1
+            if left:
+                self._by_client[client_id] = left
+            else:
+                self._by_client.pop(client_id, None)
+
+    def call(self, client_id, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) in the lane and returns its result; raises LaneBusy if refused."""
+        if self.workers <= 0:
+            return fn(*args, **kwargs)
+        executor = self._admit(client_id)
+        submitted = time.perf_counter()
+        started = []
+
+        def run():
+            started.append(time.perf_counter())
+            return fn(*args, **kwargs)
+
+        try:
+            # Run in a copy of the caller's context so per-request stage timings still reach the request
+            future = executor.submit(contextvars.copy_context().run, run)
+        except Exception:
+            self._release(client_id)
+            raise
+        # The slot is held until the work finishes, even if the caller stops waiting
+        future.add_done_callback(lambda _: self._release(client_id))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            metrics.LANE_REJECTED.inc(lane=self.name, reason="timeout")
+            raise LaneBusy(self.name, "timeout")
+        finally:
+            if started:
+                metrics.record_stage(f"{self.name}_queue", started[0] - submitted)
+
+    def stats(self):
+        with self._lock:
+            return {"workers": self.workers, "queue_size": self.queue_size, "in_use": self._in_use, "clients": len(self._by_client)}
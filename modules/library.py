@@ -0,0 +1,232 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+_DOC_ID_RE = re.compile(r"^PDF_(\d+)$")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def _normalize(name):
+    """Lowercases, drops the .pdf extension and the filler word 'pdf', and splits into words."""
+    name = name.lower()
+    if name.endswith(".pdf"):
+        name = name[:-4]
+    return [w for w in _WORD_RE.findall(name) if w != "pdf"]
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class LibraryCatalog:
+    """
+    In-memory index of uploaded PDFs.
+
+    Keeps one entry per stored file (``PDF_n.pdf`` or legacy uuid names) with the
+    user's original filename, allocates new ``PDF_n`` ids, and answers spoken
+    lookups ("open biology notes") with a ranked fuzzy match over word and
+    character-trigram postings, so a search only touches documents that share
+    at least one trigram with the query.
+
+    The uploads directory's mtime is checked on each read, so files added or
+    removed by another worker process trigger a rescan. A file found before its
+    pdfs record exists (another worker is still saving the upload) is indexed
+    under its stored name and looked up again, at most every resolve_interval
+    seconds for resolve_window seconds, until the record gives its real title.
+    """
+
+    def __init__(self, uploads_dir, original_names=None, resolve_interval=1.0, resolve_window=600.0):
+        self.uploads_dir = uploads_dir
+        self._original_names = original_names  # callable -> {stored basename: original filename}
+        self.resolve_interval = resolve_interval
+        self.resolve_window = resolve_window
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._words = defaultdict(set)
+        self._trigrams = defaultdict(set)
+        self._max_index = 0
+        self._dir_mtime = None
+        self._unresolved = {}  # doc_id -> when it was indexed without its original filename
+        self._next_resolve = 0.0
+
+    # --- Index maintenance ---
+    def _index(self, doc_id, title):
+        words = _normalize(title) + _normalize(doc_id)
+        trigrams = _trigrams(" ".join(words))
+        for w in words:
+            self._words[w].add(doc_id)
+        for t in trigrams:
+            self._trigrams[t].add(doc_id)
+        return words, len(trigrams)
+
+    def _unindex(self, entry):
+        doc_id = entry["id"]
+        words = entry["words"]
+        for w in words:
+            self._words[w].discard(doc_id)
+            if not self._words[w]:
+                del self._words[w]
+        for t in _trigrams(" ".join(words)):
+            self._trigrams[t].discard(doc_id)
+            if not self._trigrams[t]:
+                del self._trigrams[t]
+
+    def _put(self, doc_id, title, path):
+        old = self._entries.get(doc_id)
+        if old:
+            self._unindex(old)
+        m = _DOC_ID_RE.match(doc_id)
+        index = int(m.group(1)) if m else 0
+        self._max_index = max(self._max_index, index)
+        words, n_trigrams = self._index(doc_id, title)
+        self._entries[doc_id] = {
+            "id": doc_id,
+            "filename": f"{doc_id}.pdf",
+            "title": title,
+            "path": path,
+            "index": index,
+            "words": words,
+            "n_trigrams": n_trigrams,
+        }
+
+    def _dir_changed(self):
+        try:
+            mtime = os.stat(self.uploads_dir).st_mtime_ns
+        except OSError:
+            return False
+        return mtime != self._dir_mtime
+
+    def _load_originals(self):
+        try:
+            return self._original_names()
+        except Exception as e:
+            logger.warning(f"Could not load original filenames: {e}")
+            return {}
+
+    def _resolve_pending(self):
+        """Gives entries indexed before their pdfs record existed the uploaded filename, once it does."""
+        now = time.monotonic()
+        if now < self._next_resolve:
+            return
+        self._next_resolve = now + self.resolve_interval
+        originals = self._load_originals()
+        for doc_id, since in list(self._unresolved.items()):
+            entry = self._entries.get(doc_id)
+            title = originals.get(f"{doc_id}.pdf")
+            if entry and title:
+                self._put(doc_id, title, entry["path"])
+            elif entry and now - since < self.resolve_window:
+                continue  # Legacy files never get a record; stop asking after the window
+            del self._unresolved[doc_id]
+
+    def refresh(self, force=False):
+        """Rescans the uploads directory if it changed since the last scan."""
+        with self._lock:
+            if not force and self._dir_mtime is not None and not self._dir_changed():
+                if self._unresolved:
+                    self._resolve_pending()
+                return
+            try:
+                self._dir_mtime = os.stat(self.uploads_dir).st_mtime_ns
+                on_disk = {f[:-4] for f in os.listdir(self.uploads_dir) if f.lower().endswith(".pdf")}
+            except OSError as e:
+                logger.error(f"Library scan failed: {e}")
+                return
+            for doc_id in list(self._entries):
+                if doc_id not in on_disk:
+                    self._unindex(self._entries.pop(doc_id))
+                    self._unresolved.pop(doc_id, None)
+            new_ids = on_disk - set(self._entries)
+            originals = {}
+            if new_ids and self._original_names:
+                originals = self._load_originals()
+                self._next_resolve = time.monotonic() + self.resolve_interval  # Just asked
+            for doc_id in new_ids:
+                fname = f"{doc_id}.pdf"
+                self._put(doc_id, originals.get(fname, fname), os.path.join(self.uploads_dir, fname))
+                if fname not in originals and self._original_names:
+                    self._unresolved[doc_id] = time.monotonic()
+            if self._unresolved:
+                self._resolve_pending()
+            logger.info(f"Library catalog holds {len(self._entries)} documents.")
+
+    # --- Public API ---
+    def reserve(self):
+        """
+        Allocates the next ``PDF_n`` id and creates its file exclusively.
+
+        Returns (doc_id, path). O_EXCL creation makes the allocation safe across
+        worker processes sharing the uploads directory.
+        """
+        self.refresh()
+        with self._lock:
+            while True:
+                self._max_index += 1
+                doc_id = f"PDF_{self._max_index}"
+                path = os.path.join(self.uploads_dir, f"{doc_id}.pdf")
+                try:
+                    os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                    return doc_id, path
+                except FileExistsError:
+                    continue
+
+    def add(self, doc_id, title, path):
+        with self._lock:
+            self._put(doc_id, title, path)
+            self._unresolved.pop(doc_id, None)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._unresolved.pop(doc_id, None)
+            entry = self._entries.pop(doc_id, None)
+            if entry:
+                self._unindex(entry)
+            return entry is not None
+
+    def get(self, doc_id):
+        self.refresh()
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            return self._public(entry) if entry else None
+
+    def list(self):
+        """All documents, newest upload first."""
+        self.refresh()
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: (e["index"], e["id"]), reverse=True)
+            return [self._public(e) for e in entries]
+
+    def search(self, query, limit=5, min_score=0.3):
+        """
+        Returns up to ``limit`` documents best matching a spoken name, best first.
+
+        Score blends trigram overlap (Dice coefficient, tolerant of speech-to-text
+        misspellings) with the share of query words that appear exactly in the name.
+        """
+        words = _normalize(query or "")
+        if not words:
+            return []
+        self.refresh()
+        q_trigrams = _trigrams(" ".join(words))
+        with self._lock:
+            shared = defaultdict(int)
+            for t in q_trigrams:
+                for doc_id in self._trigrams.get(t, ()):
+                    shared[doc_id] += 1
+            results = []
+            for doc_id, n_shared in shared.items():
+                entry = self._entries[doc_id]
+                dice = 2.0 * n_shared / (len(q_trigrams) + entry["n_trigrams"])
+                word_hits = sum(1 for w in words if doc_id in self._words.get(w, ()))
+                score = 0.6 * dice + 0.4 * (word_hits / len(words))
+                if score >= min_score:
+                    results.append((score, entry["index"], entry))
+            results.sort(key=lambda r: (r[0], r[1]), reverse=True)
+            return [dict(self._public(e), score=round(s, 3)) for s, _, e in results[:limit]]
+
+    @staticmethod
+    def _public(entry):
+        return {"id": entry["id"], "filename": entry["filename"], "title": entry["title"]}
@@ -0,0 +1,148 @@
+import os
+import math
+import time
+import logging
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from modules import metrics
+from config import (GEMINI_MODEL, GEMINI_FAST_MODEL, GEMINI_FAST_INTENTS, GEMINI_FAST_MAX_CHARS, GEMINI_DEADLINE,
+                    GEMINI_HEDGE, GEMINI_HEDGE_MIN_DELAY, GEMINI_HEDGE_MIN_SAMPLES, GEMINI_LATENCY_WINDOW, LLM_WORKERS)
+
+logger = logging.getLogger(__name__)
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when no request for a call answered before its deadline."""
+
+_routers = weakref.WeakSet()  # Live routers, whose request pools a forked child must not reuse
+
+class ModelRouter:
+    """
+    Picks a model per intent and sends each call with a deadline and hedging.
+
+    ``send(model, prompt, timeout)`` makes one request. Short requests whose
+    intent is in GEMINI_FAST_INTENTS go to the fast model, everything else to
+    the standard one. Recent answer latencies are kept per model; a call still
+    unanswered after its model's p90 gets one duplicate request and returns
+    whichever answer arrives first, which cuts the tail that single slow
+    requests cause without doubling the load (about one call in ten hedges).
+    """
+
+    def __init__(self, send, models=None, deadline=GEMINI_DEADLINE, hedge=GEMINI_HEDGE, workers=None):
+        self.send = send
+        self.models = models or {"fast": GEMINI_FAST_MODEL, "standard": GEMINI_MODEL}
+        self.deadline = deadline
+        self.hedge = hedge
+        # A hedge must never wait for a thread, so there is room for two requests per LLM lane worker
+        self.workers = workers or max(4, 2 * LLM_WORKERS)
+        self._latencies = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        _routers.add(self)
+
+    def _after_fork(self):
+        # Pool threads belong to the parent
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="llm-request")
+            return self._executor
+
+    def route(self, intent, context_len=0):
+        """Returns the model name for a call."""
+        if intent in GEMINI_FAST_INTENTS and context_len <= GEMINI_FAST_MAX_CHARS:
+            return self.models["fast"]
+        return self.models["standard"]
+
+    def _record(self, model, seconds):
+        metrics.GEMINI_MODEL_SECONDS.observe(seconds, model=model)
+        with self._lock:
+            window = self._latencies.get(model)
+            if window is None:
+                window = self._latencies[model] = deque(maxlen=GEMINI_LATENCY_WINDOW)
+            window.append(seconds)
+
+    def percentile(self, model, q):
+        """Latency at quantile q (0-1) of the model's recent answers, or None before GEMINI_HEDGE_MIN_SAMPLES."""
+        with self._lock:
+            samples = sorted(self._latencies.get(model, ()))
+        if len(samples) < GEMINI_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+    def hedge_delay(self, model):
+        """Seconds to wait for the primary request before hedging, or None to not hedge."""
+        if not self.hedge:
+            return None
+        p90 = self.percentile(model, 0.9)
+        return None if p90 is None else max(p90, GEMINI_HEDGE_MIN_DELAY)
+
+    def _timed_send(self, model, prompt, deadline):
+        start = time.monotonic()
+        result = self.send(model, prompt, max(deadline - start, 0.1))
+        self._record(model, time.monotonic() - start)
+        return result
+
+    def call(self, model, prompt, deadline=None):
+        """
+        Sends prompt to model and returns the first answer. deadline is a
+        time.monotonic() value (default: GEMINI_DEADLINE from now); raises
+        DeadlineExceeded when it passes, or the last error if every request failed.
+        """
+        start = time.monotonic()
+        if deadline is None:
+            deadline = start + self.deadline
+        executor = self._get_executor()
+        pending = {executor.submit(self._timed_send, model, prompt, deadline)}
+        hedge = None
+        delay = self.hedge_delay(model)
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                logger.warning(f"{model} gave no answer within {deadline - start:.1f}s.")
+                raise DeadlineExceeded(f"{model} gave no answer in time")
+            timeout = deadline - now
+            if hedge is None and delay is not None:
+                timeout = min(timeout, max(start + delay - now, 0))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    if hedge is not None:
+                        metrics.GEMINI_HEDGES.inc(model=model, outcome="won" if fut is hedge else "lost")
+                    return fut.result()
+                error = fut.exception()
+            if done and not pending:
+                raise error  # Every request failed (a failed primary isn't hedged: errors like 429 need backoff, not a duplicate)
+            if hedge is None and delay is not None and time.monotonic() - start >= delay:
+                logger.debug(f"{model} slower than {delay:.2f}s, sending a hedged request.")
+                hedge = executor.submit(self._timed_send, model, prompt, deadline)
+                pending.add(hedge)
+
+    def stats(self):
+        """Per-model answer count, p50/p90 latency and hedges won/lost in this process."""
+        with self._lock:
+            models = sorted(set(self.models.values()) | set(self._latencies))
+        stats = {}
+        for model in models:
+            p50, p90 = self.percentile(model, 0.5), self.percentile(model, 0.9)
+            with self._lock:
+                samples = len(self._latencies.get(model, ()))
+            stats[model] = {
+                "samples": samples,
+                "p50": round(p50, 3) if p50 is not None else None,
+                "p90": round(p90, 3) if p90 is not None else None,
+                "hedges_won": metrics.GEMINI_HEDGES.value(model=model, outcome="won"),
+                "hedges_lost": metrics.GEMINI_HEDGES.value(model=model, outcome="lost"),
+            }
+        return {"hedge": self.hedge, "deadline": self.deadline, "models": stats}
+
+def _after_fork():
+    for router in list(_routers):
+        router._after_fork()
+
+if hasattr(os, "register_at_fork"):  # POSIX only; Windows servers never fork
+    os.register_at_fork(after_in_child=_after_fork)
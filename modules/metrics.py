@@ -0,0 +1,166 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Minimal Prometheus-style metrics (counters and histograms with labels) rendered in the
+# text exposition format by render(). Values are per process: under gunicorn each worker
+# reports its own, so scrape every worker or sum them downstream.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_items(items))
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_items(self, items):
+        for key, value in items:
+            yield f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}"
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def _render_items(self, items):
+        for key, (counts, total, count) in items:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                yield f"{self.name}_bucket{_format_labels(pairs + [('le', _format_value(bound))])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(pairs)} {count}"
+
+def render():
+    """Returns all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- Metrics ---
+REQUEST_SECONDS = Histogram("http_request_seconds", "API request latency.", ("endpoint", "status"))
+STAGE_SECONDS = Histogram("voice_stage_seconds", "Time spent per processing stage of a request.", ("stage", "intent", "outcome"))
+GEMINI_CALLS = Counter("gemini_calls_total", "Gemini generate calls by result.", ("intent", "outcome"))
+GEMINI_RETRIES = Counter("gemini_retries_total", "Gemini calls retried after a 429.")
+GEMINI_RATE_LIMITED = Counter("gemini_rate_limited_total", "Gemini 429 responses received.")
+GEMINI_HEDGES = Counter("gemini_hedges_total", "Hedged Gemini requests by model and whether the duplicate answered first.", ("model", "outcome"))
+GEMINI_MODEL_SECONDS = Histogram("gemini_model_seconds", "Latency of each Gemini request by model, hedges included.", ("model",))
+TTS_SYNTHESES = Counter("tts_syntheses_total", "TTS syntheses by outcome.", ("outcome",))
+TTS_BYTES = Counter("tts_bytes_total", "Bytes of MP3 audio synthesized.")
+TTS_STRETCHES = Counter("tts_stretches_total", "Speed variants derived from cached audio by outcome.", ("outcome",))
+TTS_TRANSCODES = Counter("tts_transcodes_total", "Compact audio variants encoded by format and outcome.", ("format", "outcome"))
+AUDIO_BYTES_SAVED = Counter("audio_bytes_saved_total", "Bytes not sent by serving compact audio instead of the MP3.", ("format",))
+DOC_LOADS = Counter("doc_loads_total", "Document loads by source.", ("source",))
+DOC_LOAD_BYTES = Counter("doc_load_bytes_total", "Bytes of document JSON read from disk.")
+LANE_REJECTED = Counter("lane_rejected_total", "Work refused by admission control.", ("lane", "reason"))
+STORAGE_RECLAIMED_BYTES = Counter("storage_reclaimed_bytes_total", "Bytes deleted by the storage collector by reason.", ("reason",))
+STORAGE_RECLAIMED_FILES = Counter("storage_reclaimed_files_total", "Files and records deleted by the storage collector by reason.", ("reason",))
+
+# --- Per-request stage timing ---
+# begin_request() starts collecting stage() timings for the current request (thread/context);
+# end_request() observes them labelled with the request's intent and outcome. Stages run
+# outside a request (e.g. background TTS prefetch) are observed immediately.
+_timings = contextvars.ContextVar("metrics_timings", default=None)
+
+def begin_request():
+    _timings.set([])
+
+@contextmanager
+def stage(name):
+    """Times the enclosed block as processing stage ``name``."""
+    start = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        record_stage(name, time.perf_counter() - start, ok)
+
+def record_stage(name, elapsed, ok=True):
+    """Records a stage measured elsewhere (e.g. time spent queued for a worker)."""
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, elapsed, ok))
+    else:
+        STAGE_SECONDS.observe(elapsed, stage=name, intent="none", outcome="ok" if ok else "error")
+
+def end_request(intent="none", failed=False):
+    """Observes the current request's stages and returns them as [(stage, seconds, ok)]."""
+    timings = _timings.get() or []
+    _timings.set(None)
+    for name, elapsed, ok in timings:
+        outcome = "ok" if ok and not failed else "error"
+        STAGE_SECONDS.observe(elapsed, stage=name, intent=intent, outcome=outcome)
+    return timings
+
+def server_timing(timings, total=None):
+    """Formats stage timings as a Server-Timing header value (repeated stages are summed)."""
+    durations = {}
+    for name, elapsed, _ in timings:
+        durations[name] = durations.get(name, 0.0) + elapsed
+    if total is not None:
+        durations["total"] = total
+    return ", ".join(f"{name};dur={1000 * seconds:.1f}" for name, seconds in durations.items())
@@ -1,9 +1,6 @@
+import os
 import logging
 import pdfplumber
-import pytesseract
-from PIL import Image
-import io
-import PyPDF2
 from config import CHUNK_SIZE, TESSERACT_CMD, POPPLER_PATH
 
 logger = logging.getLogger(__name__)
@@ -31,86 +28,118 @@ def _is_scanned_pdf(pdf_path):
         logger.error(f"Error checking if PDF is scanned: {e}")
         return True # Assume scanned if check fails
 
+def _has_text(chunks):
+    return any(c.strip() for c in chunks)
+
+def iter_pages(pdf_path):
+    """
+    Yields each page's chunks in order, preferring native extraction and falling
+    back to OCR when no page has text. Pages are extracted and released one at a
+    time, so memory use doesn't grow with the page count. Always yields at least
+    one page.
+    """
+    logger.info(f"Starting PDF processing for: {pdf_path}")
+    # Leading empty pages are only counted until a page with text shows the PDF is native
+    empty = 0
+    native = False
+    for chunks in _iter_pages_native(pdf_path):
+        if native:
+            yield chunks
+        elif _has_text(chunks):
+            logger.info("Using native text extraction.")
+            native = True
+            for _ in range(empty):
+                yield [""]
+            yield chunks
+        else:
+            empty += 1
+    if native:
+        return
+    logger.info("Native extraction yielded little/no text, attempting OCR...")
+    # OCR output is checked the same way; its pages are usable as soon as one has text
+    ocr_empty = 0
+    found = False
+    for chunks in _iter_pages_scanned(pdf_path):
+        if found:
+            yield chunks
+        elif _has_text(chunks):
+            logger.info("Using OCR extraction.")
+            found = True
+            for _ in range(ocr_empty):
+                yield [""]
+            yield chunks
+        else:
+            ocr_empty += 1
+    if not found:
+        logger.warning("OCR also yielded little/no text; returning native structure as fallback.")
+        for _ in range(max(empty, 1)):
+            yield [""]
+
 def extract_text_from_pdf(pdf_path):
     """
     Extracts text from a PDF, preferring native extraction and falling back to OCR.
     Returns a dict: {page_num: [chunks]} and never returns None.
+    Use iter_pages() to avoid holding the whole document in memory.
     """
-    logger.info(f"Starting PDF processing for: {pdf_path}")
-    native = _extract_text_native(pdf_path)
-    has_text = any(chunks and any(c.strip() for c in chunks) for chunks in native.values())
-    if has_text:
-        logger.info("Using native text extraction.")
-        return native
-    logger.info("Native extraction yielded little/no text, attempting OCR...")
-    ocr = _extract_text_scanned(pdf_path)
-    if ocr and any(chunks and any(c.strip() for c in chunks) for chunks in ocr.values()):
-        logger.info("Using OCR extraction.")
-        return ocr
-    logger.warning("OCR also yielded little/no text; returning native structure as fallback.")
-    return native if native else {0: [""]}
+    return dict(enumerate(iter_pages(pdf_path)))
 
-def _extract_text_native(pdf_path):
-    """Extracts text from a native PDF using pdfplumber."""
-    doc_structure = {}
+def _iter_pages_native(pdf_path):
+    """Yields each page's chunks from a native PDF using pdfplumber, releasing the page's caches after it."""
     try:
         with pdfplumber.open(pdf_path) as pdf:
-            for i, page in enumerate(pdf.pages):
-                page_text = page.extract_text()
+            for page in pdf.pages:
+                try:
+                    page_text = page.extract_text()
+                finally:
+                    page.close()  # pdfplumber keeps every extracted page's layout objects until closed
                 if page_text:
-                    clean_text = page_text.strip()
-                    chunks = _split_text_chunks(clean_text)
-                    doc_structure[i] = chunks
+                    yield _split_text_chunks(page_text.strip())
                 else:
-                    doc_structure[i] = [""] # Handle empty pages
+                    yield [""] # Handle empty pages
     except Exception as e:
         logger.error(f"Error extracting text from native PDF: {e}")
-    return doc_structure
 
-def _extract_text_scanned(pdf_path):
-    """Extracts text from a scanned PDF using OCR."""
-    doc_structure = {}
+def _poppler_path():
+    # Accept both root and bin path; if root, append common bin subfolder
+    poppler_candidate = POPPLER_PATH
+    if os.path.isdir(poppler_candidate):
+        bin_path = os.path.join(poppler_candidate, "Library", "bin")
+        if os.path.isdir(bin_path):
+            poppler_candidate = bin_path
+        else:
+            alt_bin = os.path.join(poppler_candidate, "bin")
+            if os.path.isdir(alt_bin):
+                poppler_candidate = alt_bin
+    return poppler_candidate
+
+def _iter_pages_scanned(pdf_path):
+    """Yields each page's chunks from a scanned PDF using OCR, rasterizing one page at a time."""
+    try:
+        # OCR libraries are only needed for scanned PDFs, so they are imported here rather than at startup
+        import pytesseract
+        import PyPDF2
+        # pdf2image requires poppler on the system
+        from pdf2image import convert_from_path
+    except ImportError:
+        logger.error("pdf2image not found. Please install it: pip install pdf2image")
+        logger.error("Also ensure poppler is installed on your system.")
+        return
     try:
         if TESSERACT_CMD:
             pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
-        # Use PyPDF2 to get the number of pages and convert pages to images
         with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            num_pages = len(reader.pages)
-
-        # Use pdf2image if available, otherwise, we'll need to install it or find an alternative
-        # For this implementation, we'll assume pdf2image is available or handled separately
-        # A common way is to use pdf2image with Pillow for conversion
-        # pip install pdf2image # This requires poppler on the system
-        from pdf2image import convert_from_path
+            num_pages = len(PyPDF2.PdfReader(file).pages)
         kwargs = {"dpi": 200}
         if POPPLER_PATH:
-            # Accept both root and bin path; if root, append common bin subfolder
-            poppler_candidate = POPPLER_PATH
-            if os.path.isdir(poppler_candidate):
-                bin_path = os.path.join(poppler_candidate, "Library", "bin")
-                if os.path.isdir(bin_path):
-                    poppler_candidate = bin_path
-                else:
-                    alt_bin = os.path.join(poppler_candidate, "bin")
-                    if os.path.isdir(alt_bin):
-                        poppler_candidate = alt_bin
-            kwargs["poppler_path"] = poppler_candidate
-        pages = convert_from_path(pdf_path, **kwargs)
-
-        for i, page_image in enumerate(pages):
-            # Convert PIL image to bytes for pytesseract if needed, or pass directly
-            text = pytesseract.image_to_string(page_image)
+            kwargs["poppler_path"] = _poppler_path()
+        for page_num in range(1, num_pages + 1):
+            # Converting the whole file at once would hold every page image (~4 MB each at 200 dpi) in memory
+            images = convert_from_path(pdf_path, first_page=page_num, last_page=page_num, **kwargs)
+            text = pytesseract.image_to_string(images[0]) if images else ""
+            del images
             if text.strip():
-                clean_text = text.strip()
-                chunks = _split_text_chunks(clean_text)
-                doc_structure[i] = chunks
+                yield _split_text_chunks(text.strip())
             else:
-                doc_structure[i] = [""] # Handle pages where OCR finds no text
-    except ImportError:
-        logger.error("pdf2image not found. Please install it: pip install pdf2image")
-        logger.error("Also ensure poppler is installed on your system.")
-        return {}
+                yield [""] # Handle pages where OCR finds no text
     except Exception as e:
         logger.error(f"Error extracting text from scanned PDF: {e}")
-    return doc_structure
@@ -0,0 +1,117 @@
+import re
+import json
+import time
+import base64
+import logging
+from collections import deque
+from typing import Iterator, Optional, Tuple
+from modules import tts_tokens, audio_codec, metrics
+from modules.document import Document
+from modules.text_processor import split_sentences
+from config import READ_LOOKAHEAD
+
+logger = logging.getLogger(__name__)
+
+_POSITION_RE = re.compile(r"^(\d+):(\d+)$")
+CHARS_PER_SECOND = 15.0  # Speaking-rate estimate for audio whose length is unknown (e.g. the TTS stub)
+KEEPALIVE_SECONDS = 15.0
+
+def parse_position(value) -> Optional[Tuple[int, int]]:
+    """Parses a "page:sentence" position (the SSE event id), or returns None."""
+    m = _POSITION_RE.match((value or "").strip())
+    return (int(m.group(1)), int(m.group(2))) if m else None
+
+def sentences(doc: Document, page: int, sentence: int = 0, last_page: Optional[int] = None) -> Iterator[Tuple[int, int, str]]:
+    """Yields (page, index, text) from page/sentence onward, through last_page (default: the end)."""
+    last_page = len(doc) - 1 if last_page is None else min(last_page, len(doc) - 1)
+    for p in range(page, last_page + 1):
+        for i, text in enumerate(split_sentences(doc.page_text(p) or "")):
+            if p > page or i >= sentence:
+                yield p, i, text
+
+def _event(name, data, event_id=None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {name}\ndata: {json.dumps(data)}\n\n"
+
+def stream(doc: Document, page: int = 0, sentence: int = 0, last_page: Optional[int] = None,
+           speed: float = 1.0, lookahead: int = READ_LOOKAHEAD, fmt: str = "mp3") -> Iterator[str]:
+    """
+    Reads a document aloud as Server-Sent Events, one sentence at a time.
+
+    Events: ``start``, then ``page`` whenever a new page begins (with its
+    text), ``sentence`` (id "page:sentence", with the sentence's audio as base64
+    and its MIME type) and finally ``end``. Audio is MP3, or compact format
+    ``fmt`` ("opus", "mp3-low") when tts_tokens.compact can produce it. A client that reconnects with Last-Event-ID resumes
+    after the last sentence it received.
+
+    Synthesis runs on the TTS prefetch pool and stays ``lookahead`` sentences
+    ahead of the listener: the stream keeps a playback clock from the audio
+    durations it has sent and waits for it before synthesizing further, so
+    stopping early doesn't leave the rest of the document being synthesized.
+    Sentence audio is shared by text, so re-reading a page costs no TTS calls.
+    """
+    stretched = speed != 1.0 and tts_tokens.can_stretch()
+    # Without server-side stretching the client changes the rate, which also shortens playback
+    rate = 1.0 if stretched else speed
+    start = {"page": page, "sentence": sentence, "total_pages": len(doc), "lookahead": lookahead}
+    if not stretched and speed != 1.0:
+        start["playback_rate"] = speed
+    yield "retry: 2000\n\n"
+    yield _event("start", start)
+
+    upcoming = sentences(doc, page, sentence, last_page)
+    item = next(upcoming, None)  # Next sentence not yet registered for synthesis
+    queued = deque()  # (page, index, text, fname) registered for synthesis, not yet sent
+    playing = deque()  # Playback end times of sent sentences that haven't finished playing
+    clock = time.monotonic()  # When the last sent sentence finishes playing
+    current_page = None
+    last = (page, sentence)
+    while True:
+        now = time.monotonic()
+        while playing and playing[0] <= now:
+            playing.popleft()
+        # Top up: the sentence playing now plus `lookahead` more may be synthesized or in flight
+        while item is not None and len(queued) + max(0, len(playing) - 1) < lookahead:
+            queued.append(item + (tts_tokens.register(item[2], prefetch=True, speed=speed, shared=True),))
+            item = next(upcoming, None)
+        if not queued:
+            break
+
+        p, i, text, fname = queued.popleft()
+        if p != current_page:
+            current_page = p
+            yield _event("page", {"page": p, "total_pages": len(doc), "text": doc.page_text(p) or ""})
+        path = tts_tokens.resolve(fname, speed) if fname else None
+        audio = sent = b""
+        mime = "audio/mpeg"
+        if path:
+            with open(path, "rb") as f:
+                audio = sent = f.read()
+            served = tts_tokens.compact(path, fmt) if fmt != "mp3" else path
+            if served != path:
+                with open(served, "rb") as f:
+                    sent = f.read()
+                mime = audio_codec.COMPACT_FORMATS[fmt][0]
+                metrics.AUDIO_BYTES_SAVED.inc(len(audio) - len(sent), format=fmt)
+        else:
+            logger.warning(f"Read-aloud: no audio for page {p} sentence {i}; sending text only.")
+        # Timed from the MP3 (compact encodings keep its length)
+        duration = (audio_codec.mp3_duration(audio) or len(text) / CHARS_PER_SECOND) / rate
+        clock = max(clock, time.monotonic()) + duration
+        playing.append(clock)
+        last = (p, i)
+        yield _event("sentence", {"page": p, "sentence": i, "text": text, "duration": round(duration, 3),
+                                  "audio": base64.b64encode(sent).decode("ascii") if sent else None, "mime": mime},
+                     event_id=f"{p}:{i}")
+
+        # The listener already has `lookahead` sentences queued: wait for the current one to finish
+        # (unless everything has been sent; the stream can end while the client plays the rest)
+        while len(playing) > lookahead and (queued or item is not None):
+            wait = playing[0] - time.monotonic()
+            if wait > 0:
+                time.sleep(min(wait, KEEPALIVE_SECONDS))
+                yield ": keep-alive\n\n"  # Also surfaces a closed connection so the stream stops
+            while playing and playing[0] <= time.monotonic():
+                playing.popleft()
+
+    yield _event("end", {"page": last[0], "sentence": last[1]})
@@ -0,0 +1,73 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from config import SESSION_TTL, SESSION_MAX
+
+class SessionStore:
+    """
+    Bounded, TTL-evicting map of session id -> dialogue state (a plain dict).
+
+    Holds what the web API needs to answer follow-ups without upstream calls:
+    the last reply's text, audio file and payload, the page and quiz state.
+    Sessions idle for ``ttl`` seconds expire; beyond ``max_sessions`` the least
+    recently used session is dropped. State is per process, so under several
+    gunicorn workers a follow-up routed to another worker starts fresh.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX, ttl: float = SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._data = OrderedDict()  # sid -> (last_access, state)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    def _expire(self, now):
+        # Oldest-accessed entries sit at the front, so stop at the first live one
+        while self._data:
+            sid, (accessed, _) = next(iter(self._data.items()))
+            if now - accessed < self.ttl:
+                break
+            del self._data[sid]
+            self._stats["expired"] += 1
+
+    def get(self, sid: str) -> Optional[Dict[str, Any]]:
+        """Returns a copy of the session's state, or None if unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._data.get(sid)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._data[sid] = (now, entry[1])
+            self._data.move_to_end(sid)
+            self._stats["hits"] += 1
+            return dict(entry[1])
+
+    def update(self, sid: str, **fields):
+        """Merges fields into the session's state, creating the session if needed."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._data.pop(sid, None)
+            state = entry[1] if entry else {}
+            state.update(fields)
+            self._data[sid] = (now, state)
+            while len(self._data) > self.max_sessions:
+                self._data.popitem(last=False)
+                self._stats["evicted"] += 1
+
+    def audio_files(self) -> set:
+        """Reply audio files that live sessions can still replay (see storage_gc.add_references)."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return {state["audio"] for _, state in self._data.values() if state.get("audio")}
+
+    def clear(self, sid: str):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, sessions=len(self._data), max_sessions=self.max_sessions)
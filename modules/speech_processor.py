@@ -1,38 +1,58 @@
 import speech_recognition as sr
 import logging
 import os
-from gtts import gTTS
+import time
 # Import the new AudioHandler
 from modules.audio_handler import AudioHandler
-from config import STT_TIMEOUT, TTS_LANGUAGE, TEMP_AUDIO_DIR
+from modules.stt import create_stt_backend
+from modules.vad import Endpointer, WakeWordGate
+from config import STT_TIMEOUT, STT_PHRASE_LIMIT, TTS_LANGUAGE, TEMP_AUDIO_DIR, STT_BACKEND, VOSK_MODEL_PATH, WAKE_WORDS, WAKE_WINDOW, TTS_SPEED
 
 logger = logging.getLogger(__name__)
 
 class SpeechProcessor:
-    def __init__(self):
-        self.recognizer = sr.Recognizer()
+    def __init__(self, stt_backend=None, wake_words=WAKE_WORDS):
         self.microphone = sr.Microphone()
+        self.stt = stt_backend or create_stt_backend(STT_BACKEND, VOSK_MODEL_PATH)
+        logger.info(f"Using '{self.stt.name}' speech recognition backend.")
         # Optional: Create an AudioHandler instance if needed for more control
         # self.audio_handler = AudioHandler()
-        
-        # Adjust for ambient noise once at startup
-        logger.info("Calibrating microphone for ambient noise...")
-        with self.microphone as source:
-            self.recognizer.adjust_for_ambient_noise(source, duration=1.0)
-        logger.info("Microphone calibration complete.")
+
+        # Without a wake word every detected utterance is treated as a command
+        self.wake_gate = None
+        if wake_words:
+            try:
+                self.wake_gate = WakeWordGate(self.stt, wake_words)
+            except ValueError as e:
+                logger.warning(f"WAKE_WORDS ignored ({e}); set STT_BACKEND=vosk to use a wake word.")
+        self._awake_until = 0.0
+        self.speed = TTS_SPEED  # Playback speed; != 1.0 time-stretches each line before playing (needs ffmpeg)
+        # No ambient-noise calibration needed: the VAD endpointer tracks the noise floor itself
 
     def listen_for_command(self):
         """Listens for a voice command and returns the recognized text."""
-        logger.info("Listening for command...")
         try:
+            if self.wake_gate and time.monotonic() > self._awake_until:
+                logger.info(f"Standing by for wake word ({', '.join(self.wake_gate.wake_words)})...")
+                with self.microphone as source:
+                    self._wait_for_wake_word(source)
+                logger.info("Wake word detected.")
+                self.speak_text("Yes?")
+
+            logger.info("Listening for command...")
             with self.microphone as source:
                 # Play a short beep using pygame or print an indicator
                 # For simplicity here, just log.
                 logger.info("Beep! (Listening now)")
-                audio_data = self.recognizer.listen(source, timeout=STT_TIMEOUT)
-            logger.info("Audio captured, attempting recognition...")
-            # Using Google Web Speech API
-            text = self.recognizer.recognize_google(audio_data)
+                utterance, text = self._capture(source, timeout=STT_TIMEOUT, stream_to_stt=True)
+                if utterance is not None and not self.stt.streaming:
+                    logger.info("Audio captured, attempting recognition...")
+                    text = self.stt.transcribe(utterance.pcm, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+            if self.wake_gate:
+                self._awake_until = time.monotonic() + WAKE_WINDOW
+            if not text:
+                logger.warning("Could not understand the audio.")
+                return None
             logger.info(f"Recognized command: {text}")
             return text
         except sr.WaitTimeoutError:
@@ -45,6 +65,66 @@ class SpeechProcessor:
             logger.error(f"Could not request results from speech recognition service; {e}")
             return None
 
+    def _capture(self, source, timeout=None, stream_to_stt=False):
+        """
+        Reads microphone audio through the VAD endpointer until one utterance ends.
+
+        With stream_to_stt and a streaming backend, speech frames are decoded as
+        they arrive, so only the final flush remains when the endpointer closes
+        the utterance. Returns (utterance, transcript or None).
+        """
+        ep = Endpointer(source.SAMPLE_RATE, max_utterance_s=STT_PHRASE_LIMIT)
+        chunk_seconds = source.CHUNK / source.SAMPLE_RATE
+        stream = stream_to_stt and self.stt.streaming
+        session = None
+        waited = 0.0
+        while True:
+            buf = source.stream.read(source.CHUNK)
+            if not buf:
+                return None, None
+            for kind, payload in ep.feed(buf):
+                if kind == "start" and stream:
+                    session = self.stt.start(source.SAMPLE_RATE)
+                    session.accept(payload)
+                elif kind == "audio" and session is not None:
+                    session.accept(payload)
+                elif kind == "end":
+                    if payload is None:
+                        session = None  # Too short to be speech (click, cough)
+                        continue
+                    if session is None:
+                        return payload, None
+                    end_of_speech = time.perf_counter()
+                    text = session.finish()
+                    logger.info(f"Streaming transcript finalized {1000 * (time.perf_counter() - end_of_speech):.0f} ms after end of speech.")
+                    return payload, text
+            if not ep.in_speech:
+                waited += chunk_seconds
+                if timeout is not None and waited > timeout:
+                    raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+
+    def _wait_for_wake_word(self, source, max_wake_seconds=2.5):
+        """Blocks until an utterance containing a wake phrase is heard. STT never sees other speech."""
+        while True:
+            utterance, _ = self._capture(source)
+            if utterance is None:
+                raise sr.WaitTimeoutError("audio stream ended while waiting for the wake word")
+            # Wake phrases are short; skip the spotter entirely for longer speech
+            if utterance.duration <= max_wake_seconds and self.wake_gate.detect(utterance.pcm, source.SAMPLE_RATE):
+                return
+
+    def _stretch(self, filepath):
+        """Returns a pitch-preserving copy of filepath at self.speed, or filepath itself if that fails."""
+        stretched = f"{filepath[:-4]}_x{round(self.speed * 100)}.mp3"
+        try:
+            from modules.time_stretch import stretch_file
+            stretch_file(filepath, stretched, self.speed)
+        except Exception as e:
+            logger.warning(f"Playing at normal speed; time-stretch failed: {e}")
+            return filepath
+        os.remove(filepath)
+        return stretched
+
     def speak_text(self, text, lang=TTS_LANGUAGE):
         """Converts text to speech and plays it using AudioHandler."""
         if not text:
@@ -53,12 +133,15 @@ class SpeechProcessor:
 
         try:
             logger.debug(f"Generating speech for text: {text[:50]}...") # Log first 50 chars
+            from gtts import gTTS  # Imported on first use to keep CLI startup fast
             tts = gTTS(text=text, lang=lang, slow=False)
             # Generate a unique filename to avoid conflicts if multiple speak calls happen
             import uuid
             unique_filename = f"temp_output_{uuid.uuid4().hex}.mp3"
             filepath = os.path.join(TEMP_AUDIO_DIR, unique_filename)
             tts.save(filepath)
+            if self.speed != 1.0:
+                filepath = self._stretch(filepath)
 
             # Use the AudioHandler to play the file
             audio_handler = AudioHandler() # Create instance for this playback
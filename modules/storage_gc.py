@@ -0,0 +1,248 @@
+import os
+import re
+import ntpath
+import time
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+from modules import db, doc_store, metrics, tts_tokens
+from config import (TEMP_AUDIO_DIR, UPLOADS_DIR, DOCS_DIR, DATA_DIR, STORAGE_GC_INTERVAL, AUDIO_TTL, AUDIO_MAX_BYTES,
+                    AUDIO_KEEP_RECENT, ORPHAN_GRACE, PROJECT_QUOTA_BYTES)
+
+logger = logging.getLogger(__name__)
+
+# Background reconciler for everything the app writes to disk:
+#   uploads/PDF_n.pdf   <->  data/docs/PDF_n.json  <->  pdfs records (matched by the file's name)
+#   temp_audio/resp_<hex>.mp3 with its .txt sidecar, speed variants (_x150) and compact copies (.webm, _lo.mp3)
+# A document missing any of its parts for longer than ORPHAN_GRACE is removed entirely. Audio is removed
+# per reply (the base MP3 and everything derived from it go together) once older than AUDIO_TTL, oldest
+# first while the directory is over AUDIO_MAX_BYTES. Audio younger than AUDIO_KEEP_RECENT, still being
+# produced, or referenced by a source registered with add_references (the web app registers its live
+# sessions' last replies, which REPEAT serves) is never touched. Sessions are per process, so under
+# several gunicorn workers only the sweeping worker's references are known; a replay of audio another
+# worker's session pointed to finds it gone (tts_tokens.available) and synthesizes it again.
+# Stored chat messages name their reply's audio too, but nothing serves it again from there.
+_AUDIO_RE = re.compile(r"^(resp_[0-9a-f]{32})(?:_x\d+)?(?:_lo)?\.(?:mp3|webm|txt)$")
+_last_report = None
+_missing_since = {}  # pdfs record id -> when a sweep first found its upload missing
+_reference_sources = []
+_thread_pid = None
+_lock = threading.Lock()
+
+def _files(directory):
+    """(name, path, stat) of the regular files in directory."""
+    found = []
+    try:
+        entries = list(os.scandir(directory))
+    except OSError as e:
+        logger.error(f"Storage scan of {directory} failed: {e}")
+        return found
+    for entry in entries:
+        try:
+            if entry.is_file():
+                found.append((entry.name, entry.path, entry.stat()))
+        except OSError:
+            pass  # Removed while scanning
+    return found
+
+def _remove(path) -> int:
+    """Deletes path; returns the bytes freed (0 if it was already gone or is in use)."""
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+    except FileNotFoundError:
+        return 0
+    except OSError as e:
+        logger.warning(f"Could not delete {path}: {e}")  # e.g. open for playback on Windows
+        return 0
+
+def _doc_id(path) -> str:
+    """Document id stored under an upload's name (.../PDF_1.pdf -> PDF_1)."""
+    return os.path.splitext(ntpath.basename(path))[0]  # ntpath splits on both / and \ (records made on Windows)
+
+def _doc_size(doc_id) -> int:
+    ver = doc_store.version(doc_id)
+    return ver[1] if ver else 0
+
+def _reclaim(report, reason, freed, files=1):
+    report["by_reason"][reason] = report["by_reason"].get(reason, 0) + freed
+    report["files"] += files
+    report["bytes"] += freed
+    metrics.STORAGE_RECLAIMED_BYTES.inc(freed, reason=reason)
+    metrics.STORAGE_RECLAIMED_FILES.inc(files, reason=reason)
+
+def delete_document(doc_id: str) -> int:
+    """Removes an uploaded document everywhere: the PDF, its parsed text and its pdfs records. Returns bytes freed."""
+    upload = os.path.join(UPLOADS_DIR, f"{doc_id}.pdf")
+    freed = (os.path.getsize(upload) if os.path.exists(upload) else 0) + _doc_size(doc_id)
+    for record in db.list_pdfs():
+        if record.get("path") and _doc_id(record["path"]) == doc_id:
+            db.delete_pdf(record["id"])
+    _remove(upload)
+    doc_store.delete(doc_id)
+    return freed
+
+def project_usage() -> Dict[str, int]:
+    """Bytes of uploaded PDFs and parsed text per project id."""
+    usage = defaultdict(int)
+    for record in db.list_pdfs():
+        if not record.get("path"):
+            continue
+        doc_id = _doc_id(record["path"])
+        upload = os.path.join(UPLOADS_DIR, f"{doc_id}.pdf")
+        usage[str(record.get("project_id"))] += (os.path.getsize(upload) if os.path.exists(upload) else 0) + _doc_size(doc_id)
+    return dict(usage)
+
+def quota_remaining(project_id) -> Optional[int]:
+    """Bytes the project may still store under PROJECT_QUOTA_BYTES (None when quotas are off)."""
+    if PROJECT_QUOTA_BYTES <= 0:
+        return None
+    return max(0, PROJECT_QUOTA_BYTES - project_usage().get(str(project_id), 0))
+
+def sweep_documents(report, now):
+    """Removes documents that lost their upload, parsed text or record, and stale partial writes."""
+    uploads = {name[:-4]: st for name, _, st in _files(UPLOADS_DIR) if name.lower().endswith(".pdf")}
+    docs = {}
+    extracting = set()
+    for name, path, st in _files(DOCS_DIR):
+        if name.endswith(".tmp"):
+            if now - st.st_mtime > ORPHAN_GRACE:
+                _reclaim(report, "stale_tmp", _remove(path))  # A save that crashed before its rename
+            else:
+                extracting.add(name.split(".json.", 1)[0])  # <id>.json.<hex>.tmp: pages still being written
+        elif name.endswith(".json"):
+            docs[name[:-5]] = st
+    missing = {}
+    for record in db.list_pdfs():
+        doc_id = _doc_id(record["path"]) if record.get("path") else None
+        if doc_id not in uploads and not (doc_id and os.path.exists(os.path.join(UPLOADS_DIR, f"{doc_id}.pdf"))):
+            # Records carry no reliable age across backends, so the grace runs from the first sweep that missed the upload
+            since = missing[record["id"]] = _missing_since.get(record["id"], now)
+            if now - since <= ORPHAN_GRACE:
+                continue
+            # db.delete_pdf also removes the parsed text stored under the upload's name
+            freed = _doc_size(doc_id) if doc_id else 0
+            db.delete_pdf(record["id"])
+            del missing[record["id"]]
+            docs.pop(doc_id, None)
+            _reclaim(report, "record_without_upload", freed)
+    _missing_since.clear()
+    _missing_since.update(missing)
+    for doc_id, st in docs.items():
+        if doc_id not in uploads and now - st.st_mtime > ORPHAN_GRACE:
+            _reclaim(report, "doc_without_upload", doc_store.delete(doc_id))
+    for doc_id, st in uploads.items():
+        if doc_id not in docs and doc_id not in extracting and now - st.st_mtime > ORPHAN_GRACE:
+            # Extraction never finished (crash or failed upload); the file can't be opened as a document
+            _reclaim(report, "upload_without_doc", delete_document(doc_id))
+
+def add_references(source):
+    """Registers a callable returning audio filenames still in use; sweeps keep them and their variants."""
+    _reference_sources.append(source)
+
+def _referenced() -> set:
+    keys = set()
+    for source in _reference_sources:
+        try:
+            names = source()
+        except Exception as e:
+            logger.warning(f"Audio reference source failed: {e}")
+            continue
+        for name in names:
+            m = _AUDIO_RE.match(os.path.basename(name))
+            keys.add(m.group(1) if m else name)
+    return keys
+
+def sweep_audio(report, now):
+    """Expires reply audio by age and by the directory's total size, oldest first."""
+    groups = defaultdict(list)
+    for name, path, st in _files(TEMP_AUDIO_DIR):
+        if name.endswith(".tmp"):
+            if now - st.st_mtime > ORPHAN_GRACE:
+                _reclaim(report, "stale_tmp", _remove(path))
+            continue
+        m = _AUDIO_RE.match(name)
+        groups[m.group(1) if m else name].append((path, st))
+    busy = tts_tokens.in_flight()
+    referenced = _referenced()
+    # A reply's age is that of its newest file, so a variant made today keeps yesterday's base with it
+    entries = sorted((max(st.st_mtime for _, st in files), key, files) for key, files in groups.items())
+    total = sum(st.st_size for files in groups.values() for _, st in files)
+    for newest, key, files in entries:
+        if now - newest > AUDIO_TTL:
+            reason = "audio_expired"
+        elif total > AUDIO_MAX_BYTES:
+            reason = "audio_over_size"
+        else:
+            break  # Everything after this is newer
+        if now - newest < AUDIO_KEEP_RECENT or key in referenced or any(name.startswith(key) for name in busy):
+            continue
+        freed = sum(_remove(path) for path, _ in files)
+        total -= sum(st.st_size for _, st in files)
+        _reclaim(report, reason, freed, len(files))
+    report["audio_bytes"] = total
+    if total > AUDIO_MAX_BYTES:
+        logger.warning(f"Audio cache holds {total / 2**20:.0f} MB of recent audio, over AUDIO_MAX_BYTES.")
+
+def collect(now: float = None) -> dict:
+    """
+    Runs one full sweep over documents and audio. Returns a report with the
+    files and bytes reclaimed (in total and by reason), the audio cache size,
+    per-project usage and the projects over PROJECT_QUOTA_BYTES.
+    """
+    global _last_report
+    start = time.perf_counter()
+    now = time.time() if now is None else now
+    report = {"files": 0, "bytes": 0, "by_reason": {}, "audio_bytes": 0}
+    sweep_documents(report, now)
+    sweep_audio(report, now)
+    usage = project_usage()
+    report["projects"] = usage
+    report["over_quota"] = sorted(p for p, used in usage.items() if 0 < PROJECT_QUOTA_BYTES < used)
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    report["finished_at"] = now
+    if report["files"]:
+        logger.info(f"Storage sweep reclaimed {report['bytes'] / 2**20:.1f} MB in {report['files']} files {report['by_reason']}.")
+    _last_report = report
+    return report
+
+def _sweep_locked():
+    """Runs collect() unless another process is sweeping the same DATA_DIR."""
+    try:
+        import fcntl
+    except ImportError:
+        return collect()  # Windows: served by one process (serve.py), nothing to coordinate
+    with open(os.path.join(DATA_DIR, ".storage_gc.lock"), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return None  # Another gunicorn worker is sweeping
+        try:
+            return collect()
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _loop():
+    while True:
+        time.sleep(STORAGE_GC_INTERVAL)
+        try:
+            _sweep_locked()
+        except Exception as e:
+            logger.error(f"Storage sweep failed: {e}")
+
+def start():
+    """Starts the background sweeper for this process (idempotent; STORAGE_GC_INTERVAL=0 disables it)."""
+    global _thread_pid
+    if STORAGE_GC_INTERVAL <= 0:
+        return
+    with _lock:
+        if _thread_pid == os.getpid():
+            return
+        threading.Thread(target=_loop, name="storage-gc", daemon=True).start()
+        _thread_pid = os.getpid()
+
+def stats() -> dict:
+    """The last sweep's report in this process (None before the first one)."""
+    return _last_report
@@ -0,0 +1,147 @@
+import json
+import logging
+import time
+import wave
+
+logger = logging.getLogger(__name__)
+
+class STTBackend:
+    """
+    Speech-to-text engine used by SpeechProcessor.
+
+    Batch backends implement ``transcribe`` on a finished utterance. Streaming
+    backends (``streaming = True``) also implement ``start``, returning a session
+    that decodes audio while it is still being captured, so the transcript is
+    ready almost as soon as the speaker stops.
+    """
+
+    name = "base"
+    streaming = False
+
+    def transcribe(self, pcm, sample_rate, sample_width=2):
+        """Returns the transcript of 16-bit mono PCM audio, or None if nothing was recognized."""
+        raise NotImplementedError
+
+    def start(self, sample_rate):
+        raise NotImplementedError(f"{self.name} backend does not support streaming")
+
+class GoogleSTTBackend(STTBackend):
+    """Google Web Speech API via speech_recognition (network round trip per utterance)."""
+
+    name = "google"
+
+    def __init__(self):
+        import speech_recognition as sr
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+
+    def transcribe(self, pcm, sample_rate, sample_width=2):
+        audio_data = self._sr.AudioData(pcm, sample_rate, sample_width)
+        try:
+            return self._recognizer.recognize_google(audio_data) or None
+        except self._sr.UnknownValueError:
+            return None
+
+class VoskStream:
+    """Incremental decoding session over a single utterance."""
+
+    def __init__(self, recognizer):
+        self._recognizer = recognizer
+        self._final_parts = []
+
+    def accept(self, pcm):
+        """Feeds a chunk of 16-bit mono PCM. Returns the running partial transcript."""
+        if self._recognizer.AcceptWaveform(pcm):
+            # Vosk finalized a segment (internal pause); keep it and continue
+            text = json.loads(self._recognizer.Result()).get("text", "")
+            if text:
+                self._final_parts.append(text)
+            return " ".join(self._final_parts)
+        partial = json.loads(self._recognizer.PartialResult()).get("partial", "")
+        return " ".join(self._final_parts + ([partial] if partial else []))
+
+    def finish(self):
+        """Flushes the decoder and returns the full transcript, or None if empty."""
+        text = json.loads(self._recognizer.FinalResult()).get("text", "")
+        if text:
+            self._final_parts.append(text)
+        return " ".join(self._final_parts).strip() or None
+
+class VoskSTTBackend(STTBackend):
+    """Offline CPU recognizer (Vosk/Kaldi) that decodes while audio is captured."""
+
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path):
+        try:
+            from vosk import Model, KaldiRecognizer, SetLogLevel
+        except ImportError:
+            raise ImportError("vosk is not installed. Install it with: pip install vosk")
+        if not model_path:
+            raise ValueError("VOSK_MODEL_PATH must point to an unpacked Vosk model directory.")
+        SetLogLevel(-1)
+        self._KaldiRecognizer = KaldiRecognizer
+        logger.info(f"Loading Vosk model from {model_path}...")
+        self._model = Model(model_path)
+        logger.info("Vosk model loaded.")
+
+    def start(self, sample_rate, grammar=None):
+        """Starts a decoding session; ``grammar`` optionally restricts the vocabulary (list of phrases)."""
+        if grammar:
+            recognizer = self._KaldiRecognizer(self._model, sample_rate, json.dumps(list(grammar) + ["[unk]"]))
+        else:
+            recognizer = self._KaldiRecognizer(self._model, sample_rate)
+        return VoskStream(recognizer)
+
+    def transcribe(self, pcm, sample_rate, sample_width=2):
+        stream = self.start(sample_rate)
+        stream.accept(pcm)
+        return stream.finish()
+
+def create_stt_backend(name, model_path=None):
+    name = (name or "google").lower()
+    if name == "google":
+        return GoogleSTTBackend()
+    if name == "vosk":
+        return VoskSTTBackend(model_path)
+    raise ValueError(f"Unknown STT_BACKEND '{name}'. Expected 'google' or 'vosk'.")
+
+def read_wav(path):
+    """Reads a 16-bit mono WAV file. Returns (pcm_bytes, sample_rate)."""
+    with wave.open(path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16-bit mono PCM, got {wf.getnchannels()} channel(s), {8 * wf.getsampwidth()}-bit")
+        return wf.readframes(wf.getnframes()), wf.getframerate()
+
+def transcribe_wav(backend, path, chunk_ms=100):
+    """
+    Transcribes a WAV fixture the way the microphone loop would, feeding it in
+    ``chunk_ms`` pieces to streaming backends.
+
+    Returns (text, stats) where stats holds the audio duration, total decode
+    time, real-time factor (decode time / audio time) and the finalization
+    latency: the time between the last chunk and the final transcript, i.e.
+    what the user waits after they stop talking.
+    """
+    pcm, sample_rate = read_wav(path)
+    audio_seconds = len(pcm) / (2 * sample_rate)
+    step = max(2, int(sample_rate * chunk_ms / 1000) * 2)
+    start = time.perf_counter()
+    if backend.streaming:
+        stream = backend.start(sample_rate)
+        for i in range(0, len(pcm), step):
+            stream.accept(pcm[i:i + step])
+        last_chunk = time.perf_counter()
+        text = stream.finish()
+    else:
+        last_chunk = time.perf_counter()
+        text = backend.transcribe(pcm, sample_rate)
+    end = time.perf_counter()
+    decode_seconds = end - start
+    return text, {
+        "audio_seconds": round(audio_seconds, 3),
+        "decode_seconds": round(decode_seconds, 3),
+        "rtf": round(decode_seconds / audio_seconds, 3) if audio_seconds else None,
+        "finalize_seconds": round(end - last_chunk, 3),
+    }
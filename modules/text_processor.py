@@ -1,5 +1,7 @@
 import logging
 import re
+from modules.document import Document
+from config import READ_SENTENCE_CHARS
 
 logger = logging.getLogger(__name__)
 
@@ -11,14 +13,25 @@ def clean_text(text):
     cleaned = re.sub(r'\s+', ' ', text)
     return cleaned.strip()
 
-def get_text_chunk(doc_structure, page_num, chunk_index=0):
-    """Retrieves a specific text chunk from the document structure."""
-    # Support dict keys that may be strings (due to session JSON serialization)
-    key_int = page_num
-    key_str = str(page_num)
-    page_chunks = doc_structure.get(key_int)
-    if page_chunks is None:
-        page_chunks = doc_structure.get(key_str)
+_SENTENCE_RE = re.compile(r"(?<=[.!?;:])\s+(?=[\"'(\[]?[A-Z0-9])")
+
+def split_sentences(text, max_chars=READ_SENTENCE_CHARS):
+    """Splits text into sentences for reading aloud; sentences over max_chars are split at word boundaries."""
+    sentences = []
+    for sentence in _SENTENCE_RE.split(clean_text(text)):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            sentences.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+def get_text_chunk(doc, page_num, chunk_index=0):
+    """Retrieves a specific text chunk from a Document (or raw page dict)."""
+    page_chunks = Document.coerce(doc).chunks(page_num)
     if page_chunks is None:
         logger.warning(f"Page number {page_num} not found in document structure.")
         return None
@@ -27,21 +40,8 @@ def get_text_chunk(doc_structure, page_num, chunk_index=0):
         return None
     return page_chunks[chunk_index]
 
-def combine_doc_text(doc_structure, max_chars=None):
-    pages = []
-    # Normalize ordering: sort by numeric page index when possible
-    def _to_int(k):
-        try:
-            return int(k)
-        except Exception:
-            return k
-    for i in sorted(doc_structure.keys(), key=_to_int):
-        chunks = doc_structure.get(i)
-        if chunks is None:
-            chunks = doc_structure.get(str(i))
-        if chunks:
-            pages.append(" ".join([c for c in chunks if c]))
-    full = "\n\n".join(pages)
+def combine_doc_text(doc, max_chars=None):
+    full = "\n\n".join(t for t in Document.coerce(doc).texts if t)
     if max_chars is not None and len(full) > max_chars:
         return full[:max_chars]
     return full
@@ -0,0 +1,118 @@
+import os
+import io
+import re
+import base64
+import logging
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from modules import audio_codec
+from modules.text_processor import split_sentences
+from config import TTS_LANGUAGE, TTS_SEGMENT_WORKERS, TTS_REQUEST_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# gTTS sends one HTTP request per ~100 characters, one after another, each on a new
+# connection. For long texts this module builds the same requests (gTTS's own
+# tokenizer, applied per sentence), sends them concurrently over one pooled
+# session, and joins the returned MP3 frames in order.
+# Building and reading those requests relies on gTTS internals (_prepare_requests and
+# the response format below; checked against the gTTS version in requirements.txt).
+# When either is missing or changed, the affected sentences are synthesized with the
+# public gTTS API instead, still one sentence per pool thread.
+_AUDIO_RE = re.compile(r'jQ1olc","\[\\"(.*?)\\"]')
+_fallback_logged = False
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+def _get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            import requests  # gTTS's HTTP stack, loaded with it
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, TTS_SEGMENT_WORKERS))
+            session.mount("https://", adapter)
+            _session = session
+    return _session
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, TTS_SEGMENT_WORKERS), thread_name_prefix="tts-segment")
+    return _executor
+
+class UnrecognizedResponse(RuntimeError):
+    """A gTTS response this module can't read the audio from (gTTS changed its format)."""
+
+def _fall_back(reason):
+    global _fallback_logged
+    if not _fallback_logged:
+        _fallback_logged = True
+        logger.warning(f"Parallel TTS unavailable ({reason}); using gTTS's public API per sentence.")
+
+def _prepare(sentence):
+    """gTTS's HTTP requests for one sentence, or None when its private request builder is unavailable."""
+    from gtts import gTTS
+    try:
+        return gTTS(text=sentence, lang=TTS_LANGUAGE, timeout=TTS_REQUEST_TIMEOUT)._prepare_requests()
+    except (AttributeError, TypeError) as e:
+        _fall_back(f"gTTS._prepare_requests: {e}")
+        return None
+
+def prepare_requests(text: str) -> list:
+    """gTTS's HTTP requests for text, in playback order. Segments break at sentence ends first."""
+    return [r for sentence in split_sentences(text) for r in (_prepare(sentence) or ())]
+
+def fetch(request) -> bytes:
+    """Sends one prepared gTTS request and returns its MP3 bytes."""
+    resp = _get_session().send(request, proxies=urllib.request.getproxies(), timeout=TTS_REQUEST_TIMEOUT)
+    resp.raise_for_status()
+    match = _AUDIO_RE.search(resp.text)
+    if not match:
+        raise UnrecognizedResponse("TTS response contained no audio")
+    return base64.b64decode(match.group(1))
+
+def synthesize_public(sentence: str) -> bytes:
+    """MP3 bytes for one sentence through gTTS's public API (its requests run one after another)."""
+    from gtts import gTTS
+    buf = io.BytesIO()
+    gTTS(text=sentence, lang=TTS_LANGUAGE, timeout=TTS_REQUEST_TIMEOUT).write_to_fp(buf)
+    return buf.getvalue()
+
+def _fetch_or_none(request):
+    try:
+        return fetch(request)
+    except UnrecognizedResponse as e:
+        _fall_back(e)
+        return None
+
+def synthesize(text: str, path: str, parallel: bool = True):
+    """Synthesizes text to an MP3 at path, sending its gTTS requests concurrently (or in order with parallel=False)."""
+    sentences = split_sentences(text)
+    plan = [_prepare(sentence) for sentence in sentences]
+    jobs = [(i, r) for i, requests in enumerate(plan) if requests for r in requests]
+    run = _get_executor().map if parallel and TTS_SEGMENT_WORKERS > 1 else map
+    fetched = list(run(_fetch_or_none, [r for _, r in jobs]))
+    by_sentence = [[] for _ in sentences]
+    for (i, _), audio in zip(jobs, fetched):
+        by_sentence[i].append(audio)
+    # Sentences the private path couldn't build or read go through the public API on the same pool
+    redo = [i for i, requests in enumerate(plan) if not requests or None in by_sentence[i]]
+    for i, audio in zip(redo, run(synthesize_public, [sentences[i] for i in redo])):
+        by_sentence[i] = [audio]
+    with open(path, "wb") as f:
+        f.write(audio_codec.join_mp3([part for parts in by_sentence for part in parts]))
+    logger.debug(f"Synthesized {len(text)} chars in {len(jobs)} requests ({len(redo)} sentences through the public API).")
+
+def _after_fork():
+    # Pooled connections and executor threads belong to the parent
+    global _session, _executor, _lock
+    _session = None
+    _executor = None
+    _lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
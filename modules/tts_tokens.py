@@ -0,0 +1,258 @@
+import os
+import re
+import math
+import hashlib
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+from modules import metrics
+from config import TEMP_AUDIO_DIR, TTS_LANGUAGE, TTS_STUB_LATENCY, TTS_PREFETCH_WORKERS, SPEED_MIN, SPEED_MAX, AUDIO_COMPACT, TTS_PARALLEL_MIN_CHARS
+
+logger = logging.getLogger(__name__)
+
+# Deferred TTS: register() returns an audio filename immediately and stores the text in a
+# sidecar file (resp_<hex>.txt) next to where the MP3 will be written. The MP3 is synthesized
+# on the first fetch, or right away in the background with prefetch=True. Keeping the text on
+# disk (not in memory) lets any worker process resolve a token issued by another.
+# Speed variants (resp_<hex>_x150.mp3 for 1.5x) are time-stretched from the base MP3 on
+# first request and cached next to it, so changing speed never calls TTS again. Compact
+# encodings (resp_<hex>.webm, resp_<hex>_lo.mp3) are cached the same way.
+_TOKEN_RE = re.compile(r"^resp_[0-9a-f]{32}\.mp3$")
+_inflight = {}  # fname -> Future resolving to the MP3 path (None on failure)
+_lock = threading.Lock()
+_executor = None
+_stats = {"registered": 0, "prefetched": 0, "synthesized": 0, "failed": 0, "stretched": 0, "stretch_failed": 0,
+          "transcoded": 0, "transcode_failed": 0}
+
+def _text_path(fname: str) -> str:
+    return os.path.join(TEMP_AUDIO_DIR, fname[:-4] + ".txt")
+
+def normalize_speed(speed) -> Optional[float]:
+    """Clamps a playback speed to [SPEED_MIN, SPEED_MAX] in 0.05 steps (bounding the variant cache); None if invalid."""
+    try:
+        speed = float(speed)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(speed):
+        return None
+    return min(SPEED_MAX, max(SPEED_MIN, round(speed * 20) / 20))
+
+def variant_name(fname: str, speed: float) -> str:
+    return f"{fname[:-4]}_x{round(speed * 100)}.mp3"
+
+def can_stretch() -> bool:
+    """True if speed variants can be made here (ffmpeg is installed)."""
+    from modules import audio_codec
+    return audio_codec.available()
+
+def synthesize(text: str, fpath: str):
+    """Synthesizes text to an MP3 at fpath (atomically; readers never see a partial file)."""
+    tmp_path = f"{fpath}.{uuid.uuid4().hex}.tmp"
+    try:
+        with metrics.stage("tts"):
+            if TTS_STUB_LATENCY is not None:
+                time.sleep(TTS_STUB_LATENCY)
+                open(tmp_path, "wb").close()
+            elif len(text) >= TTS_PARALLEL_MIN_CHARS:
+                from modules import tts_parallel  # Long replies: gTTS requests sent concurrently
+                tts_parallel.synthesize(text, tmp_path)
+            else:
+                from gtts import gTTS  # Deferred so importing the web app doesn't load gTTS and its HTTP stack
+                gTTS(text=text, lang=TTS_LANGUAGE).save(tmp_path)
+    except Exception:
+        metrics.TTS_SYNTHESES.inc(outcome="error")
+        raise
+    metrics.TTS_SYNTHESES.inc(outcome="ok")
+    metrics.TTS_BYTES.inc(os.path.getsize(tmp_path))
+    os.replace(tmp_path, fpath)
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=TTS_PREFETCH_WORKERS, thread_name_prefix="tts-prefetch")
+    return _executor
+
+def _synthesize_token(fname):
+    fpath = os.path.join(TEMP_AUDIO_DIR, fname)
+    try:
+        with open(_text_path(fname), encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        # Another worker finished it (and removed the sidecar) first
+        return fpath if os.path.exists(fpath) else None
+    synthesize(text, fpath)
+    try:
+        os.remove(_text_path(fname))
+    except FileNotFoundError:
+        pass
+    return fpath
+
+def _stretch(base_path, vpath, speed):
+    from modules.time_stretch import stretch_file
+    try:
+        with metrics.stage("stretch"):
+            stretch_file(base_path, vpath, speed)
+    except Exception:
+        metrics.TTS_STRETCHES.inc(outcome="error")
+        raise
+    metrics.TTS_STRETCHES.inc(outcome="ok")
+    return vpath
+
+def _transcode(path, cpath, fmt):
+    from modules import audio_codec
+    try:
+        with metrics.stage("transcode"):
+            audio_codec.transcode(path, cpath, fmt)
+    except Exception:
+        metrics.TTS_TRANSCODES.inc(format=fmt, outcome="error")
+        raise
+    metrics.TTS_TRANSCODES.inc(format=fmt, outcome="ok")
+    return cpath
+
+def _run(fname, fut, job=None, outcomes=("synthesized", "failed")):
+    """Runs job (default: synthesize fname's text) and resolves fut with the resulting path, None on failure."""
+    ok, failed = outcomes
+    try:
+        path = job() if job else _synthesize_token(fname)
+        with _lock:
+            _stats[ok if path else failed] += 1
+    except Exception as e:
+        logger.error(f"TTS Error for {fname}: {e}")
+        with _lock:
+            _stats[failed] += 1
+        path = None
+    fut.set_result(path)
+    with _lock:
+        _inflight.pop(fname, None)
+
+def _claim(fname):
+    """Returns (future, owner); owner is True if the caller must run the synthesis."""
+    with _lock:
+        fut = _inflight.get(fname)
+        if fut is not None:
+            return fut, False
+        fut = _inflight[fname] = Future()
+        return fut, True
+
+def _prefetch(fname, fut, speed):
+    _run(fname, fut)
+    if speed != 1.0:
+        resolve(fname, speed)
+
+def register(text: str, prefetch: bool = False, speed: float = 1.0, shared: bool = False) -> Optional[str]:
+    """
+    Returns the audio filename for text without waiting for synthesis (None for
+    empty text). With prefetch, synthesis (and the variant for speed) starts now.
+    shared=True names the token after the text, so identical text (e.g. a page
+    read aloud again) reuses audio that was already synthesized.
+    """
+    if not text:
+        return None
+    if shared:
+        fname = f"resp_{hashlib.sha256(f'{TTS_LANGUAGE}:{text}'.encode()).hexdigest()[:32]}.mp3"
+    else:
+        fname = f"resp_{uuid.uuid4().hex}.mp3"
+    with _lock:
+        _stats["registered"] += 1
+    if os.path.exists(os.path.join(TEMP_AUDIO_DIR, fname)):
+        if prefetch and speed != 1.0:
+            _get_executor().submit(resolve, fname, speed)
+        return fname
+    with open(_text_path(fname), "w", encoding="utf-8") as f:
+        f.write(text)
+    if prefetch:
+        fut, owner = _claim(fname)
+        if owner:
+            with _lock:
+                _stats["prefetched"] += 1
+            _get_executor().submit(_prefetch, fname, fut, speed)
+    return fname
+
+def available(fname: str) -> bool:
+    """True if fname's audio exists or can still be synthesized."""
+    return os.path.exists(os.path.join(TEMP_AUDIO_DIR, fname)) or os.path.exists(_text_path(fname))
+
+def _resolve_base(fname):
+    fpath = os.path.join(TEMP_AUDIO_DIR, fname)
+    if os.path.exists(fpath):
+        return fpath
+    if not _TOKEN_RE.match(fname):
+        return None
+    with _lock:
+        known = fname in _inflight
+    if not known and not os.path.exists(_text_path(fname)):
+        return None
+    fut, owner = _claim(fname)
+    if owner:
+        _run(fname, fut)  # On the request thread, so on-demand fetches never queue behind prefetches
+        return fut.result()
+    with metrics.stage("tts_wait"):
+        return fut.result()
+
+def resolve(fname: str, speed: float = 1.0) -> Optional[str]:
+    """Returns the MP3 path for fname at speed, synthesizing and stretching first if needed.
+
+    Waits for an in-flight prefetch instead of doing the work twice. Returns
+    None for unknown tokens or failed synthesis, and the normal-speed audio if
+    the variant can't be made (e.g. no ffmpeg).
+    """
+    base = _resolve_base(fname)
+    speed = normalize_speed(speed) or 1.0
+    if base is None or speed == 1.0 or not _TOKEN_RE.match(fname) or not can_stretch():
+        return base
+    vname = variant_name(fname, speed)
+    vpath = os.path.join(TEMP_AUDIO_DIR, vname)
+    if os.path.exists(vpath):
+        return vpath
+    fut, owner = _claim(vname)
+    if owner:
+        _run(vname, fut, lambda: _stretch(base, vpath, speed), ("stretched", "stretch_failed"))
+        return fut.result() or base
+    with metrics.stage("tts_wait"):
+        return fut.result() or base
+
+def compact(path: str, fmt: str) -> str:
+    """Returns the audio at path (an MP3) in compact format fmt, encoding and caching it on first request.
+
+    Falls back to path itself when compact audio is off, ffmpeg is missing,
+    encoding fails, or the result isn't smaller than the MP3.
+    """
+    from modules import audio_codec
+    if not AUDIO_COMPACT or fmt not in audio_codec.COMPACT_FORMATS or not audio_codec.available():
+        return path
+    if os.path.getsize(path) == 0:
+        return path  # Nothing to shrink (e.g. the TTS stub's empty files)
+    cname = audio_codec.compact_name(os.path.basename(path), fmt)
+    cpath = os.path.join(os.path.dirname(path), cname)
+    if not os.path.exists(cpath):
+        fut, owner = _claim(cname)
+        if owner:
+            _run(cname, fut, lambda: _transcode(path, cpath, fmt), ("transcoded", "transcode_failed"))
+        else:
+            with metrics.stage("tts_wait"):
+                fut.result()
+    if not os.path.exists(cpath) or os.path.getsize(cpath) >= os.path.getsize(path):
+        return path
+    return cpath
+
+def in_flight() -> set:
+    """Names of audio files being synthesized, stretched or encoded in this process right now."""
+    with _lock:
+        return set(_inflight)
+
+def stats():
+    with _lock:
+        return dict(_stats, pending=len(_inflight))
+
+def _after_fork():
+    # Executor threads and in-flight futures belong to the parent
+    global _executor, _lock
+    _executor = None
+    _lock = threading.Lock()
+    _inflight.clear()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
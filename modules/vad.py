@@ -0,0 +1,205 @@
+import logging
+import wave
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+class Utterance:
+    __slots__ = ("pcm", "start", "end")
+
+    def __init__(self, pcm, start, end):
+        self.pcm = pcm
+        self.start = start  # Seconds from the start of the stream
+        self.end = end
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+def frame_features(samples, frame_len):
+    """
+    Per-frame energy (mean power) and zero-crossing rate for int16 samples.
+
+    Trailing samples that do not fill a frame are ignored.
+    """
+    import numpy as np  # Deferred so importing the speech stack stays cheap until the microphone is used
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.zeros(0), np.zeros(0)
+    frames = samples[:n_frames * frame_len].astype(np.float32).reshape(n_frames, frame_len) / 32768.0
+    energy = np.mean(frames * frames, axis=1)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+    return energy, zcr
+
+class Endpointer:
+    """
+    Frame-level voice activity detector and utterance endpointer.
+
+    Each 20 ms frame is classified from its energy relative to an adaptive noise
+    floor and its zero-crossing rate (voiced speech is loud with a low ZCR;
+    fricatives like the "s" in "stop" are quieter with a high ZCR). The floor
+    is seeded from the first 100 ms of audio and then tracks the background level
+    during non-speech frames, falling quickly and rising slowly, so no separate
+    calibration step is needed.
+
+    The end-of-utterance hangover grows with utterance length: a one-word
+    command like "next" is closed after ~300 ms of silence, while longer
+    sentences tolerate the longer pauses of slow speakers.
+
+    ``feed`` returns events: ("start", pcm) with pre-roll audio, ("audio", pcm)
+    while speech continues, and ("end", Utterance) when it is closed.
+    """
+
+    def __init__(self, sample_rate, frame_ms=20, speech_ratio=4.0, start_ms=60, min_speech_ms=150,
+                 min_hangover_ms=300, max_hangover_ms=900, hangover_growth=0.25, pre_roll_ms=200,
+                 max_utterance_s=15.0, seed_ms=100):
+        import numpy as np  # Deferred like frame_features: loaded when the microphone is first used, not per chunk
+        self._np = np
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.frame_s = self.frame_len / sample_rate
+        self.speech_ratio = speech_ratio
+        self.start_frames = max(1, int(start_ms / frame_ms))
+        self.min_speech_s = min_speech_ms / 1000
+        self.min_hangover_s = min_hangover_ms / 1000
+        self.max_hangover_s = max_hangover_ms / 1000
+        self.hangover_growth = hangover_growth
+        self.max_utterance_s = max_utterance_s
+        self.noise_floor = None
+        self._seed_frames = max(1, int(seed_ms / frame_ms))
+        self._seed = []
+        self._pre_roll = deque(maxlen=max(1, int(pre_roll_ms / frame_ms)))
+        self._pending = b""
+        self._t = 0.0
+        self._reset()
+
+    def _reset(self):
+        self.in_speech = False
+        self._run = 0
+        self._silence_s = 0.0
+        self._speech_s = 0.0
+        self._start_t = 0.0
+        self._frames = []
+
+    def _is_speech(self, energy, zcr):
+        ratio = energy / self.noise_floor
+        if ratio >= self.speech_ratio:
+            return True
+        # Unvoiced consonants: weaker, but noisy-looking (high ZCR) and clearly above the floor
+        return ratio >= self.speech_ratio / 2 and 0.3 <= zcr <= 0.7
+
+    def _update_floor(self, energy):
+        rate = 0.3 if energy < self.noise_floor else 0.02
+        self.noise_floor += rate * (energy - self.noise_floor)
+
+    def hangover(self):
+        """Silence needed to close the current utterance."""
+        return min(self.max_hangover_s, self.min_hangover_s + self.hangover_growth * self._speech_s)
+
+    def feed(self, pcm):
+        events = []
+        data = self._pending + pcm
+        usable = len(data) - len(data) % (2 * self.frame_len)
+        self._pending = data[usable:]
+        samples = self._np.frombuffer(data[:usable], dtype=self._np.int16)
+        energies, zcrs = frame_features(samples, self.frame_len)
+        frame_bytes = 2 * self.frame_len
+        for i in range(len(energies)):
+            frame = data[i * frame_bytes:(i + 1) * frame_bytes]
+            self._t += self.frame_s
+            if self.noise_floor is None:
+                self._seed.append(energies[i])
+                self._pre_roll.append(frame)
+                if len(self._seed) >= self._seed_frames:
+                    self.noise_floor = max(float(min(self._seed)), 1e-8)
+                continue
+            speech = self._is_speech(energies[i], zcrs[i])
+            if not self.in_speech:
+                if not speech:
+                    self._update_floor(energies[i])
+                self._pre_roll.append(frame)
+                self._run = self._run + 1 if speech else 0
+                if self._run >= self.start_frames:
+                    self.in_speech = True
+                    self._start_t = self._t - len(self._pre_roll) * self.frame_s
+                    self._frames = list(self._pre_roll)
+                    self._speech_s = self._run * self.frame_s
+                    self._silence_s = 0.0
+                    events.append(("start", b"".join(self._pre_roll)))
+                    self._pre_roll.clear()
+                continue
+            self._frames.append(frame)
+            events.append(("audio", frame))
+            if speech:
+                self._speech_s += self.frame_s
+                self._silence_s = 0.0
+            else:
+                self._silence_s += self.frame_s
+            if self._silence_s >= self.hangover() or self._t - self._start_t >= self.max_utterance_s:
+                events.append(("end", self._close()))
+        return events
+
+    def _close(self):
+        # Trim the trailing silence (kept in the audio stream for decoders) from the utterance bounds
+        end_t = self._t - self._silence_s
+        utterance = Utterance(b"".join(self._frames), self._start_t, end_t)
+        too_short = self._speech_s < self.min_speech_s
+        self._reset()
+        return None if too_short else utterance
+
+    def flush(self):
+        """Closes an utterance still open at the end of the stream."""
+        if self.in_speech:
+            self._silence_s = 0.0
+            return self._close()
+        return None
+
+def segment_pcm(pcm, sample_rate, chunk_ms=100, **params):
+    """Runs the endpointer over a PCM buffer in microphone-sized chunks. Returns the utterances."""
+    ep = Endpointer(sample_rate, **params)
+    step = int(sample_rate * chunk_ms / 1000) * 2
+    utterances = []
+    for i in range(0, len(pcm), step):
+        for kind, payload in ep.feed(pcm[i:i + step]):
+            if kind == "end" and payload is not None:
+                utterances.append(payload)
+    last = ep.flush()
+    if last is not None:
+        utterances.append(last)
+    return utterances
+
+def segment_wav(path, **params):
+    """Splits a 16-bit mono WAV recording into utterances."""
+    with wave.open(path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16-bit mono PCM")
+        pcm = wf.readframes(wf.getnframes())
+        sample_rate = wf.getframerate()
+    return segment_pcm(pcm, sample_rate, **params), sample_rate
+
+class WakeWordGate:
+    """
+    Cheap keyword spotter that decides whether an utterance addresses the tutor.
+
+    Uses a streaming STT backend with its vocabulary restricted to the wake
+    phrases (a tiny grammar decodes far faster than open dictation), so the full
+    recognizer only runs once the user has said the wake word. Backends that
+    can't stream (Google) would have to upload every overheard utterance, so
+    they are refused with a ValueError.
+    """
+
+    def __init__(self, backend, wake_words):
+        if not backend.streaming:
+            raise ValueError(f"wake words need a streaming STT backend, not '{backend.name}'")
+        self.backend = backend
+        self.wake_words = [w.strip().lower() for w in wake_words if w.strip()]
+        vocab = sorted({word for phrase in self.wake_words for word in phrase.split()})
+        self._grammar = self.wake_words + [w for w in vocab if w not in self.wake_words]
+
+    def detect(self, pcm, sample_rate):
+        """Returns True if the utterance contains a wake phrase."""
+        session = self.backend.start(sample_rate, grammar=self._grammar)
+        session.accept(pcm)
+        text = (session.finish() or "").lower()
+        return any(w in text for w in self.wake_words)
@@ -0,0 +1,37 @@
+"""
+Production entry point for the web app using waitress (works on Windows).
+
+    python serve.py
+
+Runs one process with WEB_THREADS request threads. On Linux/macOS, use
+gunicorn for multiple worker processes instead:
+
+    gunicorn -c gunicorn.conf.py web_app:app
+"""
+import logging
+import signal
+import sys
+from waitress import serve
+from config import WEB_HOST, WEB_PORT, WEB_THREADS
+from web_app import app, start_warm_up, shutdown_services
+
+logger = logging.getLogger(__name__)
+
+def _handle_sigterm(signum, frame):
+    # Turn SIGTERM into a normal exit so the finally block flushes pending writes
+    raise SystemExit(0)
+
+def main():
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    # Clients are created on the first request; warm-up (STARTUP_WARMUP) does it in the background meanwhile
+    start_warm_up()
+    logger.info(f"Serving on http://{WEB_HOST}:{WEB_PORT} with {WEB_THREADS} threads")
+    try:
+        serve(app, host=WEB_HOST, port=WEB_PORT, threads=WEB_THREADS)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_services()
+
+if __name__ == "__main__":
+    sys.exit(main())
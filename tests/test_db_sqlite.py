@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import threading
+import pytest
+from modules.db_sqlite import SQLiteBackend
+
+def _open_in_threads(backend, n):
+    conns = []
+    barrier = threading.Barrier(n + 1)
+
+    def worker():
+        conns.append(backend._conn())
+        backend.list_projects()
+        barrier.wait()  # Keep the thread (and its thread-local connection) alive until close()
+        barrier.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    return conns, threads, barrier
+
+def test_close_closes_every_threads_connection(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "app.db"))
+    backend.init_db()
+    conns, threads, barrier = _open_in_threads(backend, 3)
+    conns.append(backend._conn())
+
+    try:
+        backend.close()
+        for conn in conns:
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+    finally:
+        barrier.wait()
+        for t in threads:
+            t.join()
+    assert backend.list_projects() == []  # Reopens on next use
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="POSIX only")
+def test_forked_child_releases_inherited_connections(tmp_path):
+    from modules import db
+    backend = SQLiteBackend(str(tmp_path / "app.db"))
+    backend.init_db()
+    backend.create_project("Biology")
+    db.set_backend(backend)
+    try:
+        pid = os.fork()
+        if pid == 0:
+            ok = db._backend is None and not backend._conns
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
+        assert [p["name"] for p in backend.list_projects()] == ["Biology"]  # The parent's connection still works
+    finally:
+        db.set_backend(None)
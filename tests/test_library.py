@@ -0,0 +1,33 @@
+from modules.library import LibraryCatalog
+
+def test_worker_scanning_mid_upload_picks_up_the_real_title(tmp_path):
+    records = {}  # The shared pdfs table: stored basename -> uploaded filename
+    uploader = LibraryCatalog(str(tmp_path), original_names=lambda: dict(records), resolve_interval=0)
+    other = LibraryCatalog(str(tmp_path), original_names=lambda: dict(records), resolve_interval=0)
+
+    doc_id, path = uploader.reserve()
+    # Another worker rescans between reserve() and add_pdf(): the file exists, its record doesn't
+    assert other.get(doc_id)["title"] == f"{doc_id}.pdf"
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4")  # Rewriting the reserved file leaves the directory's mtime alone
+    records[f"{doc_id}.pdf"] = "Biology Notes.pdf"
+    uploader.add(doc_id, "Biology Notes.pdf", path)
+
+    assert other.get(doc_id)["title"] == "Biology Notes.pdf"
+    assert [d["id"] for d in other.search("biology notes")] == [doc_id]
+
+def test_files_without_a_record_stop_being_looked_up(tmp_path):
+    lookups = []
+
+    def original_names():
+        lookups.append(1)
+        return {}
+
+    (tmp_path / "PDF_1.pdf").write_bytes(b"%PDF-1.4")
+    catalog = LibraryCatalog(str(tmp_path), original_names=original_names, resolve_interval=0, resolve_window=0)
+    assert catalog.get("PDF_1")["title"] == "PDF_1.pdf"
+    asked = len(lookups)
+    catalog.list()
+    catalog.list()
+    assert len(lookups) == asked
@@ -0,0 +1,30 @@
+import os
+import time
+from modules import storage_gc
+from modules.session_store import SessionStore
+
+def _reply(directory, key, age, now):
+    names = [f"{key}.mp3", f"{key}.txt", f"{key}_x150.mp3"]
+    for name in names:
+        path = directory / name
+        path.write_bytes(b"\0" * 1024)
+        os.utime(path, (now - age, now - age))
+    return names
+
+def test_audio_a_live_session_can_replay_survives_the_sweep(tmp_path, monkeypatch):
+    now = time.time()
+    replayable = _reply(tmp_path, "resp_" + "a" * 32, storage_gc.AUDIO_TTL + 60, now)
+    abandoned = _reply(tmp_path, "resp_" + "b" * 32, storage_gc.AUDIO_TTL + 60, now)
+    sessions = SessionStore()
+    sessions.update("sid-1", text="Photosynthesis turns light into sugar.", audio=replayable[0])
+    monkeypatch.setattr(storage_gc, "TEMP_AUDIO_DIR", str(tmp_path))
+    monkeypatch.setattr(storage_gc, "_reference_sources", [sessions.audio_files])
+
+    report = {"files": 0, "bytes": 0, "by_reason": {}}
+    storage_gc.sweep_audio(report, now)
+
+    assert report["files"] == len(abandoned)
+    assert sorted(os.listdir(tmp_path)) == sorted(replayable)
+    sessions.clear("sid-1")
+    storage_gc.sweep_audio(report, now)
+    assert os.listdir(tmp_path) == []
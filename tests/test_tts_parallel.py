@@ -0,0 +1,54 @@
+import gtts
+import pytest
+
+from modules import tts_parallel
+
+SENTENCES = ["First sentence here.", "Second sentence here.", "Third sentence here."]
+TEXT = " ".join(SENTENCES)
+
+def frame(tag):
+    """One MPEG-1 Layer III frame (128 kbps, 44.1 kHz) whose payload bytes are all tag."""
+    return bytes.fromhex("fffb9064") + bytes([tag]) * 413
+
+@pytest.fixture
+def public_calls(monkeypatch):
+    calls = []
+
+    def synthesize_public(sentence):
+        calls.append(sentence)
+        return frame(10 + SENTENCES.index(sentence))
+    monkeypatch.setattr(tts_parallel, "synthesize_public", synthesize_public)
+    return calls
+
+def payloads(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    return [data[i + 4] for i in range(0, len(data), 417)]
+
+def test_unreadable_responses_fall_back_to_the_public_api(tmp_path, monkeypatch, public_calls):
+    # Two requests per sentence; gTTS "changed" the response format of the second sentence's
+    monkeypatch.setattr(tts_parallel, "_prepare", lambda sentence: [(sentence, 0), (sentence, 1)])
+
+    def fetch(request):
+        sentence, part = request
+        if sentence.startswith("Second"):
+            raise tts_parallel.UnrecognizedResponse("TTS response contained no audio")
+        return frame(1 if sentence.startswith("First") else 3)
+    monkeypatch.setattr(tts_parallel, "fetch", fetch)
+
+    path = tmp_path / "out.mp3"
+    tts_parallel.synthesize(TEXT, str(path))
+    assert public_calls == ["Second sentence here."]
+    assert payloads(path) == [1, 1, 11, 3, 3]
+
+def test_missing_private_request_builder_falls_back_for_every_sentence(tmp_path, monkeypatch, public_calls):
+    class PublicOnly:
+        def __init__(self, text, lang="en", timeout=None):
+            self.text = text
+    monkeypatch.setattr(gtts, "gTTS", PublicOnly)
+    monkeypatch.setattr(tts_parallel, "fetch", lambda request: pytest.fail("no private requests expected"))
+
+    path = tmp_path / "out.mp3"
+    tts_parallel.synthesize(TEXT, str(path), parallel=False)
+    assert public_calls == SENTENCES
+    assert payloads(path) == [10, 11, 12]
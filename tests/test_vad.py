@@ -0,0 +1,19 @@
+import pytest
+from modules.vad import WakeWordGate
+
+class Backend:
+    name = "fake"
+
+    def __init__(self, streaming):
+        self.streaming = streaming
+        self.uploads = 0
+
+    def transcribe(self, pcm, sample_rate, sample_width=2):
+        self.uploads += 1
+        return "wake up"
+
+def test_wake_gate_refuses_a_backend_that_would_upload_every_utterance():
+    backend = Backend(streaming=False)
+    with pytest.raises(ValueError):
+        WakeWordGate(backend, ["wake"])
+    assert backend.uploads == 0
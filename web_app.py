@@ -1,18 +1,28 @@
 import logging
+import ntpath
 import os
 import sys
+import threading
 import uuid
 import json
-from flask import Flask, request, session, jsonify, send_from_directory, make_response
+import hashlib
+import hmac
+import importlib
+import time
+from datetime import datetime, timezone
+from flask import Flask, request, session, jsonify, send_from_directory, make_response, g, Response, stream_with_context
 from flask_cors import CORS
-from gtts import gTTS
-from modules.pdf_parser import extract_text_from_pdf
-from modules.intent_recognizer import IntentRecognizer
-from modules.gemini_client import GeminiClient
-from modules.text_processor import get_text_chunk, combine_doc_text
-from modules.doc_store import save as save_doc, load as load_doc
-from config import LOGS_DIR, UPLOADS_DIR, TEMP_AUDIO_DIR, TTS_LANGUAGE
-from modules.db import init_db, ensure_default_project, list_projects, create_project, get_project, list_project_pdfs, add_pdf, get_pdf, delete_pdf, create_chat, list_chats, add_message, list_messages
+from modules.intent_recognizer import IntentRecognizer, PAGE_INTENTS
+from modules.intent_classifier import load_default_classifier
+from modules.gemini_client import GeminiClient, StubGeminiClient
+from modules.doc_store import save_pages, load as load_doc, version as doc_version, cache_stats as doc_cache_stats
+from modules.library import LibraryCatalog
+from modules.session_store import SessionStore
+from modules.conversation import ConversationMemory
+from modules.lanes import Lane, LaneBusy
+from modules import tts_tokens, metrics, read_aloud, storage_gc
+from config import LOGS_DIR, UPLOADS_DIR, TEMP_AUDIO_DIR, INTENT_CLASSIFIER_ENABLED, GEMINI_STUB_LATENCY, STARTUP_WARMUP, PAGE_RANGE_MAX, REPEAT_SLOW_RATE, REPEAT_FAST_RATE, TTS_SPEED, SPEED_STEP, MEMORY_REBUILD_MESSAGES, LLM_WORKERS, LLM_QUEUE, LLM_PER_CLIENT, LLM_TIMEOUT, READ_STREAMS
+from modules.db import init_db, close_db, ensure_default_project, list_projects, create_project, get_project, list_project_pdfs, add_pdf, get_pdf, list_pdfs, delete_pdf, create_chat, list_chats, get_chat, add_message, list_messages
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,22 +38,205 @@ app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "dev-secret")
 CORS(app, supports_credentials=True) # Enable CORS for frontend
 
-ir = IntentRecognizer()
-gc = GeminiClient()
-init_db()
-DEFAULT_PROJECT_ID = ensure_default_project()
+# The classifier trains on first use (or in warm_up()); gunicorn warms it in the master so workers share it copy-on-write
+ir = IntentRecognizer(classifier=load_default_classifier(lazy=True) if INTENT_CLASSIFIER_ENABLED else None)
+
+# Network clients are created per process: gRPC channels and DB connections are not fork-safe.
+# init_services() opens the database; gemini() creates the Gemini client on the first LLM call
+gc = None
+DEFAULT_PROJECT_ID = None
+_services_pid = None
+_services_lock = threading.Lock()
+_gc_pid = None
+_gc_lock = threading.Lock()
+
+def init_services():
+    """Opens the database connection and starts the storage sweeper for the current process (idempotent)."""
+    global DEFAULT_PROJECT_ID, _services_pid
+    if _services_pid == os.getpid():
+        return
+    with _services_lock:
+        if _services_pid == os.getpid():
+            return
+        init_db()
+        DEFAULT_PROJECT_ID = ensure_default_project()
+        storage_gc.start()
+        _services_pid = os.getpid()
+        logger.info(f"Services initialized in process {_services_pid}.")
+
+def gemini():
+    """Returns this process's Gemini client, creating it on first use (the SDK takes about half a second to import)."""
+    global gc, _gc_pid
+    if _gc_pid != os.getpid():
+        with _gc_lock:
+            if _gc_pid != os.getpid():
+                gc = StubGeminiClient(GEMINI_STUB_LATENCY) if GEMINI_STUB_LATENCY is not None else GeminiClient()
+                _gc_pid = os.getpid()
+    return gc
+
+def shutdown_services():
+    """Flushes buffered chat messages and closes the database connection."""
+    try:
+        close_db()
+        logger.info(f"Services shut down in process {os.getpid()}.")
+    except Exception as e:
+        logger.error(f"Shutdown Error: {e}")
+
+def warm_up(services=True):
+    """
+    Pays one-off startup costs before the first request needs them: trains the
+    intent classifier, imports the PDF parser, gTTS and the Gemini SDK, and with
+    services=True opens the database and creates the Gemini client. Everything here also happens
+    lazily on first use, so warm-up only moves the cost off the request path.
+    """
+    start = time.perf_counter()
+    if ir.classifier is not None:
+        ir.classifier.warm()
+    heavy = ["modules.pdf_parser", "gtts"] + (["google.generativeai"] if GEMINI_STUB_LATENCY is None else [])
+    for name in heavy:
+        importlib.import_module(name)
+    if services:
+        init_services()
+        gemini()
+    logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s.")
+
+def _warm_up_in_background():
+    try:
+        warm_up()
+    except Exception as e:
+        # Not fatal: whatever failed is retried (and reported) by the first request that needs it
+        logger.error(f"Warm-up failed: {e}")
+
+def start_warm_up():
+    """Runs warm_up() in a daemon thread if STARTUP_WARMUP is on, so the server starts listening right away."""
+    if STARTUP_WARMUP:
+        threading.Thread(target=_warm_up_in_background, name="warm-up", daemon=True).start()
+
+@app.before_request
+def _start_timing():
+    g.request_start = time.perf_counter()
+    metrics.begin_request()
+
+@app.after_request
+def _record_timing(response):
+    """Observes stage/request latency and reports the breakdown in a Server-Timing header."""
+    total = time.perf_counter() - g.get("request_start", time.perf_counter())
+    failed = response.status_code >= 400 or g.get("outcome") == "error"
+    timings = metrics.end_request(intent=g.get("intent", "none"), failed=failed)
+    metrics.REQUEST_SECONDS.observe(total, endpoint=request.endpoint or "unknown", status=response.status_code)
+    response.headers["Server-Timing"] = metrics.server_timing(timings, total)
+    return response
+
+@app.before_request
+def _ensure_services():
+    # Servers that don't call init_services() after fork (dev server, waitress) initialize on first request
+    init_services()
+
+def _original_pdf_names():
+    """Maps stored upload basenames (PDF_n.pdf) to the filename the user uploaded."""
+    # ntpath.basename splits on both / and \ so records written on Windows still match
+    return {ntpath.basename(p["path"]): p["filename"] for p in list_pdfs() if p.get("path") and p.get("filename")}
+
+library = LibraryCatalog(UPLOADS_DIR, original_names=_original_pdf_names)
+sessions = SessionStore()
+storage_gc.add_references(sessions.audio_files)  # The last reply of a live session stays replayable
+
+# Cost classes: navigation, stop, help, read and repeat run inline on the request thread;
+# Gemini calls go through the bounded LLM lane and are refused fast when it is full.
+llm_lane = Lane("llm", LLM_WORKERS, LLM_QUEUE, LLM_PER_CLIENT, timeout=LLM_TIMEOUT)
+BUSY_MESSAGE = "I'm busy helping other people right now. Please ask again in a moment."
+_busy_audio = None
+# Each read-aloud stream holds a request thread for as long as the listener keeps listening
+_read_streams = threading.BoundedSemaphore(READ_STREAMS)
+
+def _llm(*args, **kwargs):
+    """gemini().generate_response() through the LLM lane (raises LaneBusy when refused)."""
+    return llm_lane.call(g.get("client_id") or request.remote_addr, gemini().generate_response, *args, **kwargs)
+
+@app.errorhandler(LaneBusy)
+def _lane_busy(e):
+    """Fast spoken "busy" reply instead of queueing behind other users' LLM work."""
+    global _busy_audio
+    if _busy_audio is None or not tts_tokens.available(_busy_audio):
+        _busy_audio = _generate_audio(BUSY_MESSAGE)
+    g.outcome = "error"
+    resp = jsonify({
+        "intent": g.get("intent", "UNKNOWN"),
+        "type": "busy",
+        "payload": {"reason": e.reason},
+        "text_response": BUSY_MESSAGE,
+        "audio_url": f"/audio/{_busy_audio}" if _busy_audio else None,
+        "new_page": (request.get_json(silent=True) or {}).get("page", 0)
+    })
+    resp.status_code = 503
+    resp.headers["Retry-After"] = "2"
+    return resp
+
+def _session_id():
+    """Returns the dialogue session id, from the session cookie or (for cookie-less clients) the request body."""
+    data = request.get_json(silent=True) or {}
+    if data.get("session_id"):
+        return str(data["session_id"])
+    if "sid" not in session:
+        session["sid"] = uuid.uuid4().hex
+    return session["sid"]
+
+def _chat_token(sid, chat_id):
+    """Handle for chat_id given to the client, signed so only the session it was issued to can use it."""
+    mac = hmac.new(app.secret_key.encode(), f"{sid}:{chat_id}".encode(), hashlib.sha256).hexdigest()[:32]
+    return f"{chat_id}.{mac}"
+
+def _chat_from_token(sid, token, doc_id):
+    """The chat id in a client's chat token, if it was issued to this session for a chat about doc_id in this project."""
+    chat_id = str(token or "").rpartition(".")[0]
+    if not chat_id or not hmac.compare_digest(_chat_token(sid, chat_id), str(token)):
+        return None
+    try:
+        chat = get_chat(chat_id)
+    except Exception as e:
+        logger.error(f"Chat Load Error: {e}")
+        return None
+    if not chat or str(chat.get("project_id")) != str(DEFAULT_PROJECT_ID) or chat.get("title") != doc_id:
+        return None
+    return chat_id
+
+def _load_conversation(state, doc_id, sid, token):
+    """
+    Returns (chat_id, memory) for this session's chat about doc_id. The chat id and memory
+    live in the session store; if they're gone (restart, other worker) the chat is rebuilt
+    from the client's chat token, which is only honoured for chats issued to this session.
+    """
+    if state and state.get("doc_id") == doc_id and state.get("memory") is not None:
+        return state.get("chat_id"), state["memory"]
+    chat_id = _chat_from_token(sid, token, doc_id) if token else None
+    if chat_id:
+        try:
+            return chat_id, ConversationMemory.from_messages(list_messages(chat_id, limit=MEMORY_REBUILD_MESSAGES))
+        except Exception as e:
+            logger.error(f"Chat Load Error: {e}")
+    return None, ConversationMemory()
+
+def _record_turn(chat_id, doc_id, memory, user_text, reply_text, audio):
+    """Adds a turn to memory and persists it as chat messages; returns the (possibly new) chat id."""
+    memory.add_turn(user_text, reply_text)
+    try:
+        if chat_id is None:
+            chat_id = create_chat(DEFAULT_PROJECT_ID, doc_id)
+        add_message(chat_id, "user", user_text)
+        add_message(chat_id, "assistant", reply_text, audio)
+    except Exception as e:
+        logger.error(f"Chat Save Error: {e}")
+    return chat_id
 
 # --- Helper Functions ---
-def _generate_audio(text):
-    """Generates TTS audio and returns the filename."""
-    if not text:
-        return None
-    fname = f"resp_{uuid.uuid4().hex}.mp3"
-    fpath = os.path.join(TEMP_AUDIO_DIR, fname)
+# Reply types the client will almost certainly play in full; their audio is synthesized in the
+# background right away. Navigation, stop and error replies are only synthesized if fetched.
+_PREFETCH_TYPES = {"summary", "explanation", "translation", "quiz", "help", "conversation"}
+
+def _generate_audio(text, prefetch=True, speed=1.0):
+    """Returns an audio filename for text; the MP3 is synthesized lazily (see modules.tts_tokens)."""
     try:
-        tts = gTTS(text=text, lang=TTS_LANGUAGE)
-        tts.save(fpath)
-        return fname
+        return tts_tokens.register(text, prefetch=prefetch, speed=speed)
     except Exception as e:
         logger.error(f"TTS Error: {e}")
         return None
@@ -57,52 +250,44 @@ def api_upload():
     if not file or not file.filename.lower().endswith(".pdf"):
         return jsonify({"error": "Invalid file format. Please upload a PDF."}), 400
 
-    fname = f"{uuid.uuid4().hex}.pdf"
-    
-    # Sequential Naming Logic
+    # Save to default project (for now, or pass project_id)
+    project_id = request.form.get("project_id", DEFAULT_PROJECT_ID)
+    remaining = storage_gc.quota_remaining(project_id)
+    if remaining is not None and (request.content_length or 0) > remaining:
+        return jsonify({"error": "This project's storage is full. Delete a document and try again."}), 413
+
+    # Sequential Naming Logic (PDF_1, PDF_2, ...) allocated by the library catalog
     try:
-        existing_files = [f for f in os.listdir(UPLOADS_DIR) if f.startswith("PDF_") and f.endswith(".pdf")]
-        max_index = 0
-        import re
-        for f in existing_files:
-            match = re.search(r"PDF_(\d+).pdf", f)
-            if match:
-                idx = int(match.group(1))
-                if idx > max_index:
-                    max_index = idx
-        
-        new_index = max_index + 1
-        fname = f"PDF_{new_index}.pdf"
+        doc_id_name, fpath = library.reserve()
     except Exception as e:
         logger.error(f"Naming Error: {e}")
         # Fallback to UUID if something breaks
-        fname = f"{uuid.uuid4().hex}.pdf"
+        doc_id_name = uuid.uuid4().hex
+        fpath = os.path.join(UPLOADS_DIR, f"{doc_id_name}.pdf")
 
-    fpath = os.path.join(UPLOADS_DIR, fname)
     file.save(fpath)
 
-    # Save to default project (for now, or pass project_id)
-    project_id = request.form.get("project_id", DEFAULT_PROJECT_ID)
     add_pdf(project_id, file.filename, fpath) # Store original name
+    library.add(doc_id_name, file.filename, fpath)
 
-    doc_structure = extract_text_from_pdf(fpath)
-    if not doc_structure:
+    from modules.pdf_parser import iter_pages  # Deferred: pdfplumber is only needed for uploads
+    # Pages stream from the parser to disk one at a time, so large books don't need memory for the whole text
+    with metrics.stage("extract"):
+        doc_id, page_count = save_pages(iter_pages(fpath), custom_id=doc_id_name) # Use PDF_1 as the doc_id
+    if not page_count:
         return jsonify({"error": "Failed to extract text from PDF."}), 500
-
-    doc_id_name = fname.replace(".pdf", "") # Use PDF_1 as the doc_id
-    doc_id = save_doc(doc_structure, custom_id=doc_id_name)
     
     # Store minimal state in session if needed, but client should track this too
     session["doc_id"] = doc_id
     
     # Generate initial welcome audio?
-    msg = f"Loaded {file.filename}. {len(doc_structure)} pages."
+    msg = f"Loaded {file.filename}. {page_count} pages."
     audio_file = _generate_audio(msg)
 
     return jsonify({
         "pdf_id": doc_id, # Using doc_store ID as reference for active session
         "filename": file.filename,
-        "page_count": len(doc_structure),
+        "page_count": page_count,
         "message": msg,
         "audio_url": f"/audio/{audio_file}" if audio_file else None
     })
@@ -110,27 +295,23 @@ def api_upload():
 @app.route("/api/library", methods=["GET"])
 def api_library():
     """List recently uploaded documents."""
-    files = []
     try:
-        if os.path.exists(UPLOADS_DIR):
-            for f in os.listdir(UPLOADS_DIR):
-                if f.endswith(".pdf"):
-                    files.append({"filename": f, "id": f.replace(".pdf", "")}) 
-        return jsonify({"documents": files})
+        return jsonify({"documents": library.list()})
     except Exception as e:
         logger.error(f"Library Error: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route("/api/library/<doc_id>", methods=["DELETE"])
 def api_delete_document(doc_id):
-    """Delete a document."""
+    """Delete a document with its parsed text and database record."""
     try:
         fname = f"{doc_id}.pdf"
         fpath = os.path.join(UPLOADS_DIR, fname)
         
-        if os.path.exists(fpath):
-            os.remove(fpath)
-            return jsonify({"message": "Document deleted"}), 200
+        if os.path.exists(fpath) or doc_version(doc_id) is not None:
+            freed = storage_gc.delete_document(doc_id)
+            library.remove(doc_id)
+            return jsonify({"message": "Document deleted", "bytes_freed": freed}), 200
         else:
             return jsonify({"error": "File not found"}), 404
             
@@ -149,38 +330,171 @@ def api_tts():
         return jsonify({"error": "TTS failed"}), 500
     return jsonify({"audio_url": f"/audio/{fname}"})
 
+# MP3 is listed first so clients that accept anything (*/*) keep getting it; Opus goes to those that name it
+_AUDIO_TYPES = ["audio/mpeg", "audio/webm"]
+_AUDIO_FORMATS = {"mp3", "opus", "mp3-low"}
+
+def _audio_format():
+    """Encoding for /audio/<fname>: ?format= wins, then Accept (audio/webm gets Opus), then Save-Data (low-bitrate MP3)."""
+    fmt = request.args.get("format")
+    if fmt in _AUDIO_FORMATS:
+        return fmt
+    if request.accept_mimetypes.best_match(_AUDIO_TYPES) == "audio/webm":
+        return "opus"
+    if request.headers.get("Save-Data", "").lower() == "on":
+        return "mp3-low"
+    return "mp3"
+
 @app.route("/audio/<fname>")
 def audio(fname):
-    return send_from_directory(TEMP_AUDIO_DIR, fname)
+    # Pending tokens are synthesized here, on first fetch; ?speed=1.5 serves a cached time-stretched variant
+    path = tts_tokens.resolve(fname, speed=request.args.get("speed", 1.0))
+    fmt = _audio_format()
+    served = tts_tokens.compact(path, fmt) if path and fmt != "mp3" else path
+    compact = served != path
+    resp = send_from_directory(TEMP_AUDIO_DIR, os.path.basename(served) if served else fname,
+                               mimetype="audio/webm" if compact and fmt == "opus" else None)
+    resp.vary.update(["Accept", "Save-Data"])
+    if compact:
+        saved = os.path.getsize(path) - os.path.getsize(served)
+        resp.headers["X-Audio-Bytes-Saved"] = str(saved)
+        # Count whole-file responses only, not 304s or the browser's later range requests
+        if resp.status_code in (200, 206) and (request.range is None or request.range.ranges[0][0] == 0):
+            metrics.AUDIO_BYTES_SAVED.inc(saved, format=fmt)
+    return resp
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Prometheus text-format metrics for this process."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/stats", methods=["GET"])
+def api_stats():
+    """Runtime counters (intent routing, document cache, Gemini model latency, last storage sweep)."""
+    return jsonify({"intent": dict(ir.stats), "doc_cache": doc_cache_stats(), "tts": tts_tokens.stats(), "sessions": sessions.stats(), "llm_lane": llm_lane.stats(), "gemini": gc.stats() if gc else None, "storage": storage_gc.stats()})
+
+def _doc_validators(doc_id, variant):
+    """Returns (strong ETag, Last-Modified) for a view of a document, or None if it doesn't exist."""
+    ver = doc_version(doc_id)
+    if ver is None:
+        return None
+    mtime_ns, size = ver
+    etag = hashlib.sha1(f"{doc_id}:{mtime_ns}:{size}:{variant}".encode()).hexdigest()[:32]
+    return etag, datetime.fromtimestamp(mtime_ns // 1_000_000_000, tz=timezone.utc)
+
+def _not_modified(etag, last_modified):
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    return request.if_modified_since is not None and last_modified <= request.if_modified_since
+
+def _conditional_json(doc_id, variant, build):
+    """
+    Serves build(doc) as JSON with ETag/Last-Modified validators, answering
+    304 Not Modified without loading the document when the client's copy is current.
+    """
+    validators = _doc_validators(doc_id, variant)
+    if validators is None:
+        return jsonify({"error": "Document not found"}), 404
+    etag, last_modified = validators
+    if _not_modified(etag, last_modified):
+        resp = make_response("", 304)
+    else:
+        doc = load_doc(doc_id)
+        if not doc:
+            return jsonify({"error": "Document not found"}), 404
+        body, status = build(doc)
+        resp = make_response(jsonify(body), status)
+        if status != 200:
+            return resp
+    resp.set_etag(etag)
+    resp.last_modified = last_modified
+    resp.cache_control.no_cache = True  # Cacheable, but revalidated on every use
+    return resp
 
 @app.route("/api/doc/<doc_id>/page/<int:page_num>", methods=["GET"])
 def get_page_content(doc_id, page_num):
     """Get text content for a specific page."""
+    def build(doc):
+        if not doc.has_page(page_num):
+            return {"error": "Page out of range"}, 400
+        return {"page": page_num, "text": doc.display_text(page_num), "total_pages": len(doc)}, 200
+    return _conditional_json(doc_id, f"page:{page_num}", build)
+
+def _parse_page_range(spec):
+    """Parses "a..b" (inclusive, 0-based) or a single "a"; returns (first, last) or None."""
+    first, sep, last = (spec or "").partition("..")
+    try:
+        first = int(first)
+        last = int(last) if sep else first
+    except ValueError:
+        return None
+    if first < 0 or last < first:
+        return None
+    return first, min(last, first + PAGE_RANGE_MAX - 1)
+
+@app.route("/api/doc/<doc_id>/pages", methods=["GET"])
+def get_page_range(doc_id):
+    """Get several pages in one response: ?pages=a..b (inclusive, 0-based, clamped to the document)."""
+    page_range = _parse_page_range(request.args.get("pages", "0"))
+    if page_range is None:
+        return jsonify({"error": "Invalid page range. Use pages=a..b"}), 400
+    first, last = page_range
+
+    def build(doc):
+        if not doc.has_page(first):
+            return {"error": "Page out of range"}, 400
+        end = min(last, len(doc) - 1)
+        return {
+            "first": first,
+            "last": end,
+            "pages": [{"page": p, "text": doc.display_text(p)} for p in range(first, end + 1)],
+            "total_pages": len(doc)
+        }, 200
+    return _conditional_json(doc_id, f"pages:{first}..{last}", build)
+
+def _read_url(doc_id, page, sentence=0, pages=None, speed=1.0):
+    url = f"/api/doc/{doc_id}/read?page={page}&sentence={sentence}"
+    if pages:
+        url += f"&pages={pages}"
+    return url + (f"&speed={speed:g}" if speed != 1.0 else "")
+
+@app.route("/api/doc/<doc_id>/read", methods=["GET"])
+def read_document(doc_id):
+    """
+    Reads the document aloud as a Server-Sent Events stream, from ?page=&sentence=
+    through the next ?pages= pages (default: to the end), at ?speed=, with sentence
+    audio in ?format= (see _audio_format). Browsers that reconnect send
+    Last-Event-ID and resume after the last sentence they received.
+    """
+    try:
+        page = int(request.args.get("page", 0))
+        sentence = int(request.args.get("sentence", 0))
+        pages = int(request.args["pages"]) if request.args.get("pages") else None
+    except ValueError:
+        return jsonify({"error": "page, sentence and pages must be integers"}), 400
+    last_page = page + pages - 1 if pages else None  # The range is fixed by the URL, not by a resume point
+    resume = read_aloud.parse_position(request.headers.get("Last-Event-ID"))
+    if resume:
+        page, sentence = resume[0], resume[1] + 1
     doc = load_doc(doc_id)
     if not doc:
-        return jsonify({"error": "Document not found"}), 404
-    if page_num < 0 or page_num >= len(doc):
-        return jsonify({"error": "Page out of range"}), 400
-    
-    # Combine chunks for the page (simplified)
-    # The doc structure is list of pages, each page is list of chunks? 
-    # Let's check pdf_parser.py extract_text_from_pdf output structure.
-    # Assuming doc[page_num] is the text or a list of chunks.
-    # Based on text_processor.py: doc_structure is a list of pages.
-    
-    # JSON keys are always strings
-    page_key = str(page_num)
-    if page_key not in doc:
-         return jsonify({"error": "Page not found"}), 404
-         
-    page_content = doc[page_key]
-    text = page_content if isinstance(page_content, str) else "\n".join(page_content)
-    
-    return jsonify({
-        "page": page_num,
-        "text": text,
-        "total_pages": len(doc)
-    })
+        return jsonify({"error": "Document expired"}), 404
+    if not doc.has_page(page) or sentence < 0 or (pages is not None and pages < 1):
+        return jsonify({"error": "Position out of range"}), 400
+    speed = tts_tokens.normalize_speed(request.args.get("speed")) or 1.0
+    if not _read_streams.acquire(blocking=False):
+        metrics.LANE_REJECTED.inc(lane="read", reason="streams full")
+        resp = jsonify({"error": "Too many documents are being read aloud right now."})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "5"
+        return resp
+    fmt = _audio_format()
+    resp = Response(stream_with_context(read_aloud.stream(doc, page, sentence, last_page, speed, fmt=fmt)), mimetype="text/event-stream")
+    resp.call_on_close(_read_streams.release)  # Runs when the stream ends or the listener disconnects
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"  # Tell nginx-style proxies not to buffer the stream
+    return resp
 
 @app.route("/api/assistant/action", methods=["POST"])
 def assistant_action():
@@ -193,43 +507,57 @@ def assistant_action():
     if not doc_id:
         return jsonify({"error": "No document active"}), 400
     
-    doc_structure = load_doc(doc_id)
-    if not doc_structure:
+    with metrics.stage("load_doc"):
+        doc = load_doc(doc_id)
+    if not doc:
         return jsonify({"error": "Document expired"}), 404
 
     # Recognition
     intent = "UNKNOWN"
     entities = {}
     if user_utterance:
-        parsed = ir.recognize_intent(user_utterance)
+        with metrics.stage("intent"):
+            parsed = ir.recognize_intent(user_utterance)
         intent = parsed["intent"]
         entities = parsed["entities"]
     else:
         # Direct intent invocation (e.g. button click)
         intent = data.get("intent", "UNKNOWN")
         # Ensure entities are passed from request data for direct actions
-        entities = {k: v for k, v in data.items() if k not in ["doc_id", "page", "user_utterance", "intent"]}
+        entities = {k: v for k, v in data.items() if k not in ["doc_id", "page", "user_utterance", "intent", "include_page_text", "session_id", "chat_id", "speed", "read_position"]}
+    # Metric label; client-supplied intents are bounded to known names to keep label cardinality fixed
+    g.intent = intent if intent in ir.intents or intent in ("UNKNOWN", "NEXT_PAGE", "PREVIOUS_PAGE") else "OTHER"
     
     response_text = ""
     response_type = "message"
     next_page = page
     payload = {}
-
-    # Extract text content for the current page (available for any intent)
-    current_text = ""
-    if str(page) in doc_structure:
-        chunk = doc_structure[str(page)]
-        if isinstance(chunk, list):
-            current_text = " ".join(chunk)
-        else:
-            current_text = chunk
+    # Per-client LLM caps key on the caller's existing session (before one is minted for cookie-less clients)
+    g.client_id = str(data.get("session_id") or session.get("sid") or request.remote_addr)
+    sid = _session_id()
+    state = sessions.get(sid)
+    chat_id, memory = _load_conversation(state, doc_id, sid, data.get("chat_id"))
+    history = memory.render()
+    replay_audio = None  # Audio file of a replayed reply (REPEAT)
+    playback_rate = None
+    # Playback speed: the client's copy wins (it survives a hop to another worker), then the session's
+    speed = tts_tokens.normalize_speed(data.get("speed")) or (state or {}).get("speed") or tts_tokens.normalize_speed(TTS_SPEED)
+    reply_speed = speed
+
+    # "Summarize page 3": the action applies to the named page and the client turns to it
+    target = entities.get("target_page")
+    if intent in PAGE_INTENTS and isinstance(target, int) and doc.has_page(target):
+        page = next_page = target
+
+    # Text content for the current page (available for any intent)
+    current_text = doc.page_text(page) or ""
     
     # --- Handlers ---
     if intent == "STOP":
         response_text = "Stopping."
     
     elif intent in ["NAVIGATE_NEXT", "NEXT_PAGE"]: # Add alias
-        if page < len(doc_structure) - 1:
+        if page < len(doc) - 1:
             next_page += 1
             response_text = f"Page {next_page + 1}."
             response_type = "navigation"
@@ -246,7 +574,7 @@ def assistant_action():
 
     elif intent == "NAVIGATE_PAGE":
         target = entities.get("target_page")
-        if target is not None and 0 <= target < len(doc_structure):
+        if target is not None and doc.has_page(target):
             next_page = target
             response_text = f"Page {next_page + 1}."
             response_type = "navigation"
@@ -273,34 +601,30 @@ def assistant_action():
             if wants_full_doc:
                 # Aggregate summary: Optimized for 2-second response
                 # Limit to first 5 pages only for maximum speed
-                full_text = ""
                 max_pages = 5  # Ultra-fast: only 5 pages for 2-second target
-                count = 0
-                for p_num in sorted(doc_structure.keys(), key=lambda x: int(x)):
-                    if count >= max_pages: break
-                    chunk = doc_structure[p_num]
-                    page_content = " ".join(chunk) if isinstance(chunk, list) else chunk
-                    full_text += f"Page {int(p_num)+1}: {page_content[:300]}...\n"
-                    count += 1
+                full_text = "".join(
+                    f"Page {p_num + 1}: {page_content[:300]}...\n"
+                    for p_num, page_content in enumerate(doc.texts[:max_pages])
+                )
                 
-                response_text = gc.generate_response("SUMMARIZE", full_text, user_question="Summarize this entire document based on these excerpts.")
+                response_text = _llm("SUMMARIZE", full_text, user_question="Summarize this entire document based on these excerpts.")
             else:
                 # Default: Page Summary
-                response_text = gc.generate_response("SUMMARIZE", current_text)
+                response_text = _llm("SUMMARIZE", current_text)
             
             response_type = "summary"
         elif intent == "EXPLAIN":
              # Use user utterance as context/question if available
              # Force using utterance to capture details like "11th sentence"
             question = user_utterance if user_utterance else "Explain this page."
-            response_text = gc.generate_response("EXPLAIN", current_text, user_question=question)
+            response_text = _llm("EXPLAIN", current_text, user_question=question, history=history)
             response_type = "explanation"
         elif intent == "TRANSLATE":
             lang = entities.get("target_language", "English")
-            response_text = gc.generate_response("TRANSLATE", current_text, target_language=lang)
+            response_text = _llm("TRANSLATE", current_text, target_language=lang)
             response_type = "translation"
         elif intent == "QUIZ":
-            raw_response = gc.generate_response("QUIZ", current_text)
+            raw_response = _llm("QUIZ", current_text)
             try:
                 # Attempt to clean potential markdown formatting
                 json_str = raw_response
@@ -330,12 +654,7 @@ def assistant_action():
 
     elif intent == "EXPLAIN_LINE":
         target = entities.get("target_line")
-        current_text = get_text_chunk(doc_structure, page, 0)
-        if isinstance(doc_structure[str(page)], list):
-             current_text = " ".join(doc_structure[str(page)])
-        else:
-             current_text = doc_structure[str(page)]
-        
+
         # Split by newlines (assuming PDF text has line breaks)
         # Attempt to be robust to empty lines
         lines = [l.strip() for l in current_text.split('\n') if l.strip()]
@@ -343,24 +662,57 @@ def assistant_action():
         if target is not None and 0 <= target < len(lines):
             line_content = lines[target]
             prompt = f"Explain this specific sentence contextually: '{line_content}'"
-            response_text = gc.generate_response("EXPLAIN", current_text, user_question=prompt)
+            response_text = _llm("EXPLAIN", current_text, user_question=prompt, history=history)
             response_type = "explanation"
         else:
             response_text = f"I couldn't find line {target + 1}."
             response_type = "error"
     
-    elif intent == "READ_PAGE": # Helper for "Read this page"
-        if isinstance(doc_structure[str(page)], list):
-             text_to_read = " ".join(doc_structure[str(page)])
+    elif intent in ("READ_PAGE", "READ_ALOUD"):
+        # The page is streamed sentence by sentence (see read_document), so no reply audio is made here
+        if not current_text.strip():
+            response_text = "I cannot read any text on this page. It might be scanned or empty."
+            response_type = "error"
+        elif intent == "READ_PAGE":
+            response_text = f"Reading page {page + 1}."
+            response_type = "read_stream"
+            payload = {"stream_url": _read_url(doc_id, page, pages=1, speed=speed)}
         else:
-             text_to_read = doc_structure[str(page)]
-        
-        # Limit length?
-        response_text = text_to_read[:500] + "..." if len(text_to_read) > 500 else text_to_read
-        response_type = "read"
+            # Resume at the sentence the listener stopped on if it's on this page, else at the page's start;
+            # "read from page 5" always starts at the top of that page
+            position = None if "target_page" in entities else read_aloud.parse_position(data.get("read_position"))
+            start_page, start_sentence = position if position and position[0] == page else (page, 0)
+            response_text = f"Reading from page {start_page + 1}."
+            response_type = "read_stream"
+            payload = {"stream_url": _read_url(doc_id, start_page, start_sentence, speed=speed)}
+
+    elif intent == "REPEAT":
+        # Replay the stored reply: no Gemini call and, once synthesized, no TTS call
+        last = state
+        if last and last.get("doc_id") == doc_id and last.get("text"):
+            response_text = last["text"]
+            response_type = last.get("type", "message")
+            payload = last.get("payload") or {}
+            replay_audio = last.get("audio")
+            if replay_audio and not tts_tokens.available(replay_audio):
+                replay_audio = None  # Expired by the storage sweeper; synthesized again below
+            rate = entities.get("rate")
+            # "Say it slower" is relative to the session's speed and applies to this replay only
+            factor = REPEAT_SLOW_RATE if rate == "slow" else REPEAT_FAST_RATE if rate == "fast" else 1.0
+            reply_speed = tts_tokens.normalize_speed(speed * factor)
+        else:
+            response_text = "There is nothing to repeat yet."
 
-        response_text = text_to_read[:500] + "..." if len(text_to_read) > 500 else text_to_read
-        response_type = "read"
+    elif intent == "SET_SPEED":
+        if entities.get("target_speed") is not None:
+            target = entities["target_speed"]
+        elif entities.get("step"):
+            target = speed + entities["step"] * SPEED_STEP
+        else:
+            target = 1.0  # "normal speed"
+        speed = reply_speed = tts_tokens.normalize_speed(target) or speed
+        response_text = "Normal speed." if speed == 1.0 else f"Speed set to {speed:g} times."
+        response_type = "settings"
 
     elif intent == "HELP":
         response_text = "I can Summarize the page, Explain specific details, Translate to other languages like Tamil or Hindi, Take a Quiz, or simply Read the text. Just say 'Wake' to start."
@@ -368,21 +720,19 @@ def assistant_action():
 
     elif intent == "OPEN_DOCUMENT":
         target_name = entities.get("filename", "").lower()
-        # Search library for matching file
-        found_id = None
-        if os.path.exists(UPLOADS_DIR):
-            for f in os.listdir(UPLOADS_DIR):
-                if f.endswith(".pdf"):
-                    # Fuzzy match: "phravin" in "phravin.pdf"
-                    f_clean = f.lower().replace(".pdf", "")
-                    if target_name in f_clean:
-                        found_id = f.replace(".pdf", "") # ID is sanitized filename
-                        break
-        
-        if found_id:
-            response_text = f"Opening {found_id}."
+        # Ranked fuzzy match against original filenames: "biology notes" -> "Biology_Notes_v2.pdf"
+        matches = library.search(target_name, limit=1) if target_name else []
+
+        if not target_name:
+            response_text = "Which document should I open? Say open followed by its name."
+        elif matches:
+            found = matches[0]
+            title = found["title"]
+            if title.lower().endswith(".pdf"):
+                title = title[:-4]
+            response_text = f"Opening {title}."
             response_type = "open_document"
-            payload = {"doc_id": found_id} # Tell frontend to switch
+            payload = {"doc_id": found["id"], "filename": found["title"]} # Tell frontend to switch
         else:
             response_text = f"I couldn't find a document named {target_name}."
             response_type = "error"
@@ -395,26 +745,56 @@ def assistant_action():
                  response_text = "Hi there! I'm ready to help you learn. What would you like to do?"
                  response_type = "conversation"
              else:
-                 response_text = gc.generate_response("EXPLAIN", current_text, user_question=user_utterance)
+                 response_text = _llm("EXPLAIN", current_text, user_question=user_utterance, history=history)
                  response_type = "explanation"
          else:
              response_text = ""
 
+    g.outcome = "error" if response_type == "error" else "ok"
+
     # Generate Audio
     audio_url = None
-    if response_text:
-        fname = _generate_audio(response_text)
-        if fname:
-            audio_url = f"/audio/{fname}"
-
-    return jsonify({
+    fname = replay_audio
+    if response_text and not fname and response_type != "read_stream":
+        fname = _generate_audio(response_text, prefetch=response_type in _PREFETCH_TYPES, speed=reply_speed)
+    if fname:
+        audio_url = f"/audio/{fname}"
+        if reply_speed != 1.0:
+            if tts_tokens.can_stretch():
+                audio_url += f"?speed={reply_speed:g}"
+            else:
+                playback_rate = reply_speed  # No ffmpeg here: the browser changes the rate instead
+
+    if response_text and intent not in ("REPEAT", "STOP"):
+        user_text = user_utterance or intent.replace("_", " ").lower()
+        chat_id = _record_turn(chat_id, doc_id, memory, user_text, response_text, fname)
+        new_state = {"doc_id": doc_id, "page": next_page, "text": response_text, "type": response_type,
+                     "audio": fname, "payload": payload, "intent": intent, "chat_id": chat_id, "memory": memory,
+                     "speed": speed}
+        if intent == "QUIZ" and payload.get("quiz"):
+            new_state["quiz"] = {"questions": payload["quiz"], "index": 0}
+        sessions.update(sid, **new_state)
+
+    result = {
         "intent": intent,
         "type": response_type,
         "payload": payload, # Can populate with JSON for Quiz later
         "text_response": response_text,
         "audio_url": audio_url,
-        "new_page": next_page
-    })
+        "new_page": next_page,
+        "chat_id": _chat_token(sid, chat_id) if chat_id else None,
+        "speed": speed
+    }
+    if playback_rate:
+        result["playback_rate"] = playback_rate
+    # Clients that ask for it get the new page inline, saving a follow-up page request
+    if data.get("include_page_text") and next_page != page:
+        result["page_text"] = doc.display_text(next_page) or ""
+        result["total_pages"] = len(doc)
+    return jsonify(result)
 
 if __name__ == "__main__":
+    # Development server only; see serve.py / gunicorn.conf.py for production
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_warm_up()  # Only in the reloader's serving child, not the file-watching parent
     app.run(host="127.0.0.1", port=5000, debug=True)